@@ -0,0 +1,137 @@
+"""
+Aszinkron adatelérés a FastAPI kezelőknek – a db.py függvényeit egy saját, méretezett
+szálkészleten (DB_EXECUTOR_WORKERS, alap: 8) futtatja, így az eseményhurok nem blokkol,
+és a Starlette közös szálkészletét sem foglalja. Minden executor szál saját, nyitva tartott
+kapcsolatot használ (db.use_thread_connection), nem a háttérszálakkal közös poolt.
+A szinkron db.py függvények változatlanul használhatók (pl. seed_test_bookings.py).
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import db
+
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db", initializer=db.use_thread_connection,
+)
+
+
+async def _run(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=True)
+
+
+async def init_db() -> None:
+    await _run(db.init_db)
+
+
+async def get_slots_range(start: date, end: date) -> list[dict]:
+    return await _run(db.get_slots_range, start, end)
+
+
+async def get_schedule_config() -> dict:
+    return await _run(db.get_schedule_config)
+
+
+async def add_schedule_rule(weekday: int, times: list[str], valid_from: str | None = None, valid_to: str | None = None) -> int:
+    return await _run(db.add_schedule_rule, weekday, times, valid_from, valid_to)
+
+
+async def delete_schedule_rule(rule_id: int) -> bool:
+    return await _run(db.delete_schedule_rule, rule_id)
+
+
+async def add_schedule_exception(exc_date: str, kind: str, exc_time: str | None = None, note: str = "") -> int:
+    return await _run(db.add_schedule_exception, exc_date, kind, exc_time, note)
+
+
+async def delete_schedule_exception(exc_id: int) -> bool:
+    return await _run(db.delete_schedule_exception, exc_id)
+
+
+async def booked_slots_on(day: str, slot_time: str | None = None) -> list[dict]:
+    return await _run(db.booked_slots_on, day, slot_time)
+
+
+async def get_slots() -> list[dict]:
+    return await _run(db.get_slots)
+
+
+async def get_slots_snapshot() -> tuple[str, list[dict]]:
+    return await _run(db.get_slots_snapshot)
+
+
+async def get_slot_rows_snapshot() -> tuple[str, list[tuple[int, str, str, str]]]:
+    return await _run(db.get_slot_rows_snapshot)
+
+
+async def get_slot_rows_range(start: date, end: date) -> list[tuple[int, str, str, str]]:
+    return await _run(db.get_slot_rows_range, start, end)
+
+
+async def get_slot(slot_id: int) -> dict | None:
+    return await _run(db.get_slot, slot_id)
+
+
+async def get_booked_slots() -> list[dict]:
+    return await _run(db.get_booked_slots)
+
+
+async def get_bookings_page(
+    date_from: str | None = None,
+    date_to: str | None = None,
+    status: str = "booked",
+    after: tuple[str, str, int] | None = None,
+    limit: int = 200,
+    include_archive: bool = False,
+) -> tuple[list[dict], tuple[str, str, int] | None]:
+    return await _run(db.get_bookings_page, date_from, date_to, status, after, limit, include_archive)
+
+
+async def update_slot_status(slot_id: int, status: str) -> bool:
+    return await _run(db.update_slot_status, slot_id, status)
+
+
+async def book_slot(slot_id: int, booking_name: str, phone: str = "", email: str = "") -> bool:
+    return await _run(db.book_slot, slot_id, booking_name, phone, email)
+
+
+async def update_booking(slot_id: int, booking_name: str, phone: str = "", email: str = "") -> bool:
+    return await _run(db.update_booking, slot_id, booking_name, phone, email)
+
+
+async def cancel_booking(slot_id: int) -> bool:
+    return await _run(db.cancel_booking, slot_id)
+
+
+async def move_booking(old_slot_id: int, new_slot_id: int, booking_name: str, phone: str = "", email: str = "") -> bool:
+    return await _run(db.move_booking, old_slot_id, new_slot_id, booking_name, phone, email)
+
+
+async def apply_batch(operations: list[dict], atomic: bool = True) -> dict:
+    return await _run(db.apply_batch, operations, atomic)
+
+
+async def get_pending_reminders(slot_ids: list[int] | None = None) -> list[tuple[int, int, int | None]]:
+    return await _run(db.get_pending_reminders, slot_ids)
+
+
+async def get_outbox_stats() -> dict[str, int]:
+    return await _run(db.get_outbox_stats)
+
+
+async def search_bookings(
+    q: str,
+    limit: int = 20,
+    before: tuple[str, str, int] | None = None,
+    include_archive: bool = True,
+) -> tuple[list[dict], tuple[str, str, int] | None]:
+    return await _run(db.search_bookings, q, limit, before, include_archive)
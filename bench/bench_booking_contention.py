@@ -0,0 +1,108 @@
+"""
+Foglalási írási út 1, 2 és 4 uvicorn workerrel, két külön méréssel:
+- forró slotok: sok párhuzamos POST /api/book ugyanarra a néhány slotra. Ellenőrzi, hogy egy
+  slotot legfeljebb egy kérés foglalhatott le (nincs dupla foglalás); a mért érték a
+  foglalási kísérlet/mp (szinte mind elutasítás).
+- széles: minden kérés más szabad slotra megy (egy éves ablakból), mind sikeres kell legyen;
+  a mért érték a sikeres foglalás/mp – ez az írási út áteresztőképessége.
+Minden foglalás BEGIN IMMEDIATE tranzakció: az SQLite egyszerre egy írót enged az összes
+folyamat közül, így a foglalás/mp a workerek számával nem nő (az írások sorban futnak).
+
+Futtatás: python3 bench/bench_booking_contention.py [kérések] [forró_slotok] [párhuzamosság] [széles_foglalások]
+"""
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from server_process import ServerProcess  # noqa: E402
+
+
+async def _fire(base_url: str, slot_ids: list[int], requests: int, concurrency: int) -> tuple[Counter, int, float]:
+    """requests darab foglalás a slot_ids slotjaira körbe; (sikeres foglalások slotonként, hibák, idő)."""
+    sem = asyncio.Semaphore(concurrency)
+    wins: Counter = Counter()
+    errors = 0
+
+    async def one(i: int, client: httpx.AsyncClient):
+        nonlocal errors
+        slot_id = slot_ids[i % len(slot_ids)]
+        body = {"slot_id": slot_id, "booking_name": f"Vendég {i}", "phone": "+36 30 123 4567", "email": f"v{i}@example.com"}
+        async with sem:
+            try:
+                r = await client.post(f"{base_url}/api/book", json=body)
+                if r.status_code != 200:
+                    print(f"  HTTP {r.status_code}: {r.text[:200]}")
+                    errors += 1
+                elif r.json().get("ok"):
+                    wins[slot_id] += 1
+            except httpx.HTTPError as e:
+                print(f"  {type(e).__name__}: {e}")
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i, client) for i in range(requests)))
+        elapsed = time.perf_counter() - t0
+    return wins, errors, elapsed
+
+
+def _booked(db_path: Path, slot_ids: list[int]) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM slots WHERE status = 'booked' AND id IN ({','.join('?' * len(slot_ids))})",
+            slot_ids,
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    hot = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    wide = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    failed = False
+    for workers in (1, 2, 4):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "bench.db"
+            with ServerProcess(db_path, workers=workers) as server:
+                today = date.today()
+                slots = httpx.get(
+                    f"{server.base_url}/api/slots",
+                    params={"from": today.isoformat(), "to": (today + timedelta(days=365)).isoformat()},
+                ).json()
+                free = [s["id"] for s in slots if s["status"] == "free"]
+                hot_ids, wide_ids = free[:hot], free[hot:hot + wide]
+                wins, errors, elapsed = asyncio.run(_fire(server.base_url, hot_ids, requests, concurrency))
+                wide_wins, wide_errors, wide_elapsed = asyncio.run(
+                    _fire(server.base_url, wide_ids, len(wide_ids), concurrency)
+                )
+            booked = _booked(db_path, hot_ids)
+            wide_booked = _booked(db_path, wide_ids)
+        doubles = [sid for sid, n in wins.items() if n > 1]
+        ok = (not doubles and sum(wins.values()) == booked == len(hot_ids)
+              and sum(wide_wins.values()) == wide_booked == len(wide_ids))
+        failed |= not ok
+        print(f"workers={workers}: forró {len(hot_ids)} slot: {requests / elapsed:7.1f} kísérlet/mp, "
+              f"sikeres={sum(wins.values())}/{len(hot_ids)}, hiba={errors}, dupla foglalás={len(doubles)} | "
+              f"széles: {sum(wide_wins.values()) / wide_elapsed:7.1f} foglalás/mp, "
+              f"sikeres={sum(wide_wins.values())}/{len(wide_ids)}, hiba={wide_errors} → {'OK' if ok else 'HIBA'}")
+    print("A foglalások az SQLite író zárján sorban futnak: több worker a foglalás/mp-t nem növeli, "
+          "csak a HTTP / JSON feldolgozást osztja szét.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Foglalás-kereső mérése szintetikus előzményen: N (alap: 1 000 000) archivált foglalás
++ néhány ezer élő, véletlen magyar nevekkel, e-mailekkel és vegyes formátumú telefonszámokkal,
+valamint --legacy db régi (id-migráció előtti, kis id-jű) archív foglalás. Ezeket a kereső
+külön, időpont szerint rendezi: egy széles keresés (pl. „freemail”) ára a régi találatok
+számával nő (~1 µs / találat), a slot id-jű foglalások számától nem.
+Összeveti a db.search_bookings (FTS5, bookings_fts) idejét a régi úttal: minden foglalás
+lekérése és szűrés a kliensen (itt: Python, csak az élő táblán – az archívumot a régi út
+nem is látja), illetve egy LIKE-os táblaolvasással. Kilépési kód 1, ha az FTS p95 > --max-ms.
+
+Futtatás: python3 bench/bench_bookings_search.py [--rows 1000000] [--legacy 20000] [--runs 50] [--max-ms 10]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schedule_engine import slot_key  # noqa: E402
+
+SURNAMES = ["Nagy", "Kovács", "Tóth", "Szabó", "Horváth", "Varga", "Kiss", "Molnár", "Németh", "Farkas",
+            "Balogh", "Papp", "Takács", "Juhász", "Lakatos", "Mészáros", "Oláh", "Simon", "Rácz", "Fekete"]
+GIVEN = ["László", "István", "József", "János", "Zoltán", "Sándor", "Gábor", "Ferenc", "Attila", "Péter",
+         "Mária", "Erzsébet", "Katalin", "Éva", "Ilona", "Anna", "Zsuzsanna", "Margit", "Judit", "Ágnes"]
+DOMAINS = ["gmail.com", "freemail.hu", "citromail.hu", "outlook.com"]
+QUERIES = ["kovacs", "Tóth Éva", "jan", "zsuzs", "farkas ilona", "freemail", "30 123", "+36 70 55", "06 20 9", "5551234"]
+
+
+def _phone(rng: random.Random) -> str:
+    area = rng.choice(("20", "30", "70"))
+    number = f"{rng.randrange(10**7):07d}"
+    return rng.choice((f"+36 {area} {number[:3]} {number[3:]}", f"06{area}{number}", f"06-{area}/{number[:3]}-{number[3:]}"))
+
+
+def _ascii(s: str) -> str:
+    return s.lower().translate(str.maketrans("áéíóöőúüű", "aeiooouuu"))
+
+
+def _booking(rng: random.Random, i: int) -> tuple[str, str, str]:
+    """(név, telefon, e-mail) – a _seed INSERT oszlopsorrendjében."""
+    surname, given = rng.choice(SURNAMES), rng.choice(GIVEN)
+    email = f"{_ascii(given)}.{_ascii(surname)}{i % 997}@{rng.choice(DOMAINS)}"
+    return f"{surname} {given}", _phone(rng), email
+
+
+def _slot(start: date, i: int) -> tuple[int, str, str]:
+    """Percenként egy időpont – a sok sor így is néhány év alatt elfér."""
+    d = (start + timedelta(days=i // 1440)).isoformat()
+    t = f"{i % 1440 // 60:02d}:{i % 60:02d}"
+    return slot_key(d, t), d, t
+
+
+def _seed(db, rows: int, live: int, legacy: int) -> None:
+    rng = random.Random(42)
+    start = date(2020, 1, 1)
+    with db.write_transaction() as conn:
+        # Régi AUTOINCREMENT id-k (1..legacy), az időponttól független sorrendben
+        old_rows = [(i + 1, *_slot(date(2015, 1, 1), rng.randrange(legacy * 4))[1:], *_booking(rng, i))
+                    for i in range(legacy)]
+        conn.executemany(
+            """INSERT OR IGNORE INTO slots_archive (id, date, time, status, booking_name, phone, email, archived_at)
+               VALUES (?, ?, ?, 'booked', ?, ?, ?, 0)""", old_rows)
+        batch = []
+        for i in range(rows):
+            batch.append((*_slot(start, i), *_booking(rng, i)))
+            if len(batch) == 50_000:
+                conn.executemany(
+                    """INSERT INTO slots_archive (id, date, time, status, booking_name, phone, email, archived_at)
+                       VALUES (?, ?, ?, 'booked', ?, ?, ?, 0)""", batch)
+                batch = []
+        if batch:
+            conn.executemany(
+                """INSERT INTO slots_archive (id, date, time, status, booking_name, phone, email, archived_at)
+                   VALUES (?, ?, ?, 'booked', ?, ?, ?, 0)""", batch)
+        future = date.today() + timedelta(days=1)
+        live_rows = [(*_slot(future, i), *_booking(rng, i)) for i in range(live)]
+        conn.executemany(
+            """INSERT INTO slots (id, date, time, status, booking_name, phone, email, reminder_sent)
+               VALUES (?, ?, ?, 'booked', ?, ?, ?, 0)""", live_rows)
+
+
+def _timings(func, runs: int) -> tuple[float, float]:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return statistics.median(times), times[min(len(times) - 1, int(len(times) * 0.95))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--live", type=int, default=5_000)
+    parser.add_argument("--legacy", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--max-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = str(Path(tmp) / "search.db")
+        import db
+
+        db.init_db()
+        t0 = time.perf_counter()
+        _seed(db, args.rows, args.live, args.legacy)
+        print(f"Feltöltés: {args.rows} archív + {args.legacy} régi id-jű + {args.live} élő foglalás, "
+              f"{time.perf_counter() - t0:.1f} mp "
+              f"(triggerekkel indexelve)")
+
+        def client_side(q: str):
+            needle = q.lower()
+            return [b for b in db.get_booked_slots()
+                    if needle in (b["booking_name"] or "").lower() or needle in (b["email"] or "").lower()]
+
+        def like_scan(q: str):
+            with db.get_connection() as conn:
+                pattern = f"%{q}%"
+                return conn.execute(
+                    """SELECT id FROM slots_archive WHERE booking_name LIKE ? OR email LIKE ? OR phone LIKE ?
+                       LIMIT 21""", (pattern, pattern, pattern)).fetchall()
+
+        failed = False
+        print(f"{'keresés':<16} {'találat':>8} {'FTS p50':>9} {'FTS p95':>9} {'kliens p50':>11} {'LIKE p50':>9}")
+        for q in QUERIES:
+            items, _ = db.search_bookings(q)
+            fts50, fts95 = _timings(lambda: db.search_bookings(q), args.runs)
+            client50, _ = _timings(lambda: client_side(q), 3)
+            like50, _ = _timings(lambda: like_scan(q), 3)
+            flag = ""
+            if fts95 > args.max_ms:
+                failed = True
+                flag = "  ← lassú"
+            print(f"{q:<16} {len(items):>8} {fts50:>8.2f}ms {fts95:>8.2f}ms {client50:>10.1f}ms {like50:>8.1f}ms{flag}")
+        db.close_pool()
+    print("REGRESSZIÓ" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
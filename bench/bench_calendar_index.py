@@ -0,0 +1,90 @@
+"""
+Mikrobenchmark: egy Messenger menülépés (postback) költsége a foglalási ablak méretének
+függvényében. A régi megoldás minden lépésnél bejárta a teljes slot listát; a
+calendar_index.AvailabilityIndex-szel a lépés szótár-kikeresés, az index pedig
+adatverziónként egyszer épül (az építés ideje külön szerepel).
+
+Futtatás: python3 bench/bench_calendar_index.py
+"""
+import sys
+import timeit
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calendar_index import HONAPOK, AvailabilityIndex  # noqa: E402
+
+TIMES = ["15:15", "16:15", "17:00", "17:45", "18:30"]
+
+
+def _synthetic_slots(days: int) -> list[dict]:
+    start = date(2025, 1, 1)
+    slots = []
+    for i in range(days):
+        d = (start + timedelta(days=i)).isoformat()
+        for t in TIMES:
+            slots.append({"id": len(slots) + 1, "date": d, "time": t, "status": "free"})
+    return slots
+
+
+# --- a régi, lineáris bejárású menüfüggvények (összehasonlításhoz) ---
+
+def _old_weeks_in_month(slots, yyyy_mm):
+    out, seen = [], set()
+    for s in slots:
+        d = s.get("date", "")
+        if d.startswith(yyyy_mm):
+            dt = date.fromisoformat(d)
+            wk_start = dt - timedelta(days=dt.weekday())
+            key = wk_start.isoformat()
+            if key not in seen:
+                seen.add(key)
+                out.append((key, f"{wk_start.day}. {HONAPOK.get(wk_start.strftime('%m'), '')}"))
+    return sorted(out)
+
+
+def _old_days_in_week(slots, week_start):
+    start = date.fromisoformat(week_start)
+    out = []
+    for i in range(7):
+        ds = (start + timedelta(days=i)).isoformat()
+        if any(s.get("date") == ds for s in slots):
+            out.append(ds)
+    return out
+
+
+def _old_slots_for_day(slots, day):
+    return [s for s in slots if s.get("date") == day and s.get("status") == "free"]
+
+
+def main() -> None:
+    print(f"{'ablak (nap)':>12} {'slot':>7} {'régi µs/lépés':>15} {'index µs/lépés':>15} {'index építés ms':>16}")
+    for days in (30, 90, 365, 1095):
+        slots = _synthetic_slots(days)
+        day = slots[len(slots) // 2]["date"]
+        dt = date.fromisoformat(day)
+        week = (dt - timedelta(days=dt.weekday())).isoformat()
+        month = day[:7]
+        n = 200
+
+        def old_step():
+            _old_weeks_in_month(slots, month)
+            _old_days_in_week(slots, week)
+            _old_slots_for_day(slots, day)
+
+        index = AvailabilityIndex(slots)
+
+        def new_step():
+            index.weeks(month)
+            index.days(week)
+            index.slots_for_day(day)
+
+        old_us = min(timeit.repeat(old_step, number=n // 10, repeat=3)) / (n // 10) / 3 * 1e6
+        new_us = min(timeit.repeat(new_step, number=n, repeat=3)) / n / 3 * 1e6
+        build_ms = min(timeit.repeat(lambda: AvailabilityIndex(slots), number=1, repeat=3)) * 1000
+        print(f"{days:>12} {len(slots):>7} {old_us:>15.1f} {new_us:>15.3f} {build_ms:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+get_slots / book_slot késleltetés mérése kapcsolat-poollal és anélkül.
+Ideiglenes adatbázison fut, az app.db-t nem érinti.
+
+Futtatás (a projekt mappából):
+  python3 bench/bench_db_pool.py [ismétlések]
+"""
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+
+
+def _percentiles(samples: list[float]) -> tuple[float, float]:
+    ordered = sorted(samples)
+    p50 = statistics.median(ordered)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return p50 * 1000, p99 * 1000
+
+
+def _measure(label: str, rounds: int) -> None:
+    read_samples: list[float] = []
+    write_samples: list[float] = []
+    free_ids = [s["id"] for s in db.get_slots() if s["status"] == "free"]
+    if not free_ids:
+        print("Nincs szabad időpont a méréshez.")
+        return
+    for i in range(rounds):
+        t0 = time.perf_counter()
+        db.get_slots()
+        read_samples.append(time.perf_counter() - t0)
+
+        slot_id = free_ids[i % len(free_ids)]
+        t0 = time.perf_counter()
+        db.book_slot(slot_id, "Bench", "+36 30 123 4567", "bench@example.com")
+        write_samples.append(time.perf_counter() - t0)
+        db.cancel_booking(slot_id)
+
+    r50, r99 = _percentiles(read_samples)
+    w50, w99 = _percentiles(write_samples)
+    print(f"{label:10s} get_slots p50={r50:7.3f} ms p99={r99:7.3f} ms | "
+          f"book_slot p50={w50:7.3f} ms p99={w99:7.3f} ms")
+
+
+def main() -> None:
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        db.init_db()
+        for enabled in (False, True):
+            db.set_pool_enabled(enabled)
+            _measure("pool=on" if enabled else "pool=off", rounds)
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Messenger Send API kimenő sor mérése helyi mock Graph API-val.
+Összeveti az üzenetenként új httpx.Client-et (régi viselkedés) a messenger_client
+megosztott AsyncClient + címzettenkénti sor megoldásával, és ellenőrzi, hogy
+hibák (429/5xx) és újrapróbálás mellett is megmarad-e a címzettenkénti sorrend.
+
+Futtatás: python3 bench/bench_messenger_send.py [címzettek] [üzenet/címzett] [hibaarány]
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import messenger_client  # noqa: E402
+from graph_standin import GraphStandin  # noqa: E402
+
+
+def _old_style(base_url: str, recipients: int, per_recipient: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(per_recipient):
+        for r in range(recipients):
+            payload = {"recipient": {"id": f"u{r}"}, "messaging_type": "RESPONSE", "message": {"text": str(i)}}
+            with httpx.Client() as client:
+                client.post(f"{base_url}/me/messages?access_token=x", json=payload, timeout=10)
+    return time.perf_counter() - t0
+
+
+async def _new_style(base_url: str, recipients: int, per_recipient: int) -> tuple[float, messenger_client.MessengerSender]:
+    sender = messenger_client.MessengerSender("x", base_url=base_url, backoff_base=0.01)
+    await sender.start()
+    t0 = time.perf_counter()
+    for i in range(per_recipient):
+        for r in range(recipients):
+            sender.enqueue(f"u{r}", {"text": str(i)})
+    await sender.join()
+    elapsed = time.perf_counter() - t0
+    await sender.stop()
+    return elapsed, sender
+
+
+def main() -> None:
+    recipients = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    per_recipient = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    fail_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    total = recipients * per_recipient
+
+    old_srv = GraphStandin(latency=0.005).start()
+    elapsed = _old_style(old_srv.base_url, recipients, per_recipient)
+    print(f"régi (új kliens/üzenet)   {total / elapsed:8.1f} üzenet/mp, {old_srv.connections} TCP kapcsolat")
+    old_srv.shutdown()
+
+    srv = GraphStandin(latency=0.005, fail_rate=fail_rate).start()
+    elapsed, sender = asyncio.run(_new_style(srv.base_url, recipients, per_recipient))
+    print(f"új (megosztott kliens)    {total / elapsed:8.1f} üzenet/mp, {srv.connections} TCP kapcsolat, "
+          f"{sender.retried} újrapróbálás, {sender.failed} sikertelen")
+    in_order = all(
+        [m["text"] for m in srv.received[f"u{r}"]] == [str(i) for i in range(per_recipient)]
+        for r in range(recipients)
+    )
+    print("címzettenkénti sorrend:", "OK" if in_order else "HIBÁS")
+    srv.shutdown()
+    if not in_order:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+/api/slots válaszméret és kódolási idő: régi JSON (objektumonként) vs. compact-v1, tömörítve és anélkül,
+az ablak méretének függvényében. A sorok a db.get_slot_rows_range tuple-formájában vannak;
+a „régi út” a korábbi dict(row) + json.dumps láncot utánozza. Ellenőrzi, hogy a compact
+forma visszafejtve pontosan a régi listát adja.
+
+Futtatás: python3 bench/bench_slots_format.py
+"""
+import gzip
+import json
+import sys
+import timeit
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import slot_format  # noqa: E402
+from schedule_engine import slot_key  # noqa: E402
+
+WEEKDAY_TIMES = ["15:15", "16:15", "17:00", "17:45", "18:30"]
+WEEKEND_TIMES = ["08:30", "09:30", "10:30", "11:15", "12:00"]
+
+
+def _rows(days: int) -> list[tuple[int, str, str, str]]:
+    start = date(2025, 1, 1)
+    rows = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        d = day.isoformat()
+        for n, t in enumerate(WEEKDAY_TIMES if day.weekday() < 5 else WEEKEND_TIMES):
+            rows.append((slot_key(d, t), d, t, "booked" if (i + n) % 4 == 0 else "free"))
+    return rows
+
+
+def _old_encode(rows) -> bytes:
+    slots = [dict(zip(("id", "date", "time", "status"), r)) for r in rows]
+    return json.dumps(slots, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def main() -> None:
+    print(f"JSON kódoló: {'orjson' if slot_format.orjson else 'json (beépített)'}")
+    print(f"{'napok':>6} {'slot':>6} {'json B':>8} {'json gz':>8} {'compact B':>10} {'compact gz':>11} "
+          f"{'régi µs':>9} {'json µs':>9} {'compact µs':>11}")
+    for days in (31, 92, 366):
+        rows = _rows(days)
+        old = _old_encode(rows)
+        compact = slot_format.encode_compact(rows)
+        assert json.loads(slot_format.encode_json(rows)) == json.loads(old)
+        assert slot_format.decode_compact(json.loads(compact)) == json.loads(old), "compact visszafejtés eltér"
+        n = 200
+        t_old = timeit.timeit(lambda: _old_encode(rows), number=n) / n * 1e6
+        t_json = timeit.timeit(lambda: slot_format.encode_json(rows), number=n) / n * 1e6
+        t_compact = timeit.timeit(lambda: slot_format.encode_compact(rows), number=n) / n * 1e6
+        print(f"{days:>6} {len(rows):>6} {len(old):>8} {len(gzip.compress(old)):>8} {len(compact):>10} "
+              f"{len(slot_format.gzip_body(compact)):>11} {t_old:>9.0f} {t_json:>9.0f} {t_compact:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
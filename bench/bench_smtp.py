@@ -0,0 +1,42 @@
+"""
+Emlékeztető e-mailek átviteli sebessége (levél/mp) helyi SMTP stand-in szerverrel.
+Összeveti a levelenként új kapcsolatot (régi viselkedés) a mailer.send_batch
+kötegelt, párhuzamos munkaszálas küldésével. A kapcsolódás költségét (TLS + LOGIN)
+a stand-in késleltetése szimulálja.
+
+Futtatás: python3 bench/bench_smtp.py [levelek_száma] [kapcsolódási_késleltetés_ms]
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mailer  # noqa: E402
+from smtp_standin import SmtpStandin  # noqa: E402
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50.0) / 1000
+    server = SmtpStandin(latency=latency).start()
+    mails = [mailer.build_reminder(i, f"vendeg{i}@example.com", "Vendég", "2025-01-01", "15:15") for i in range(count)]
+
+    runs = [("levelenként új kapcsolat", 1, True)] + [(f"köteg, {w} munkaszál", w, False) for w in (1, 4, 8)]
+    for label, workers, per_message in runs:
+        config = mailer.SmtpConfig(host="127.0.0.1", port=server.port, starttls=False, workers=workers)
+        before_msgs, before_conns = server.messages, server.connections
+        t0 = time.perf_counter()
+        if per_message:
+            results = [r for m in mails for r in mailer.send_batch([m], config)]
+        else:
+            results = mailer.send_batch(mails, config)
+        elapsed = time.perf_counter() - t0
+        ok = sum(1 for _, sent in results if sent)
+        print(f"{label:26s} {ok}/{count} ok, {count / elapsed:8.1f} levél/mp, "
+              f"{server.connections - before_conns} kapcsolat, {server.messages - before_msgs} fogadva")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Hidegindítás mérése és regressziós küszöb.
+- `import server` ideje friss Python folyamatokban (medián), és hogy a nehéz, csak később
+  kellő modulok (smtplib, email.mime, httpx) NEM töltődnek be importkor.
+- Indítástól az első sikeres /api/health válaszig eltelt idő uvicorn-nal, üres és már
+  létező (már migrált) adatbázissal.
+Kilépési kód 1, ha valamelyik érték túllépi a küszöböt vagy lusta modul betöltődött.
+
+Futtatás: python3 bench/bench_startup.py [--runs 5] [--max-import-ms 800] [--max-ready-ms 3000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from server_process import ROOT, ServerProcess
+
+LAZY_MODULES = ("smtplib", "email.mime.multipart", "httpx")
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import server
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({"ms": ms, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def _import_once(db_path: Path) -> dict:
+    env = {**os.environ, "DB_PATH": str(db_path)}
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _ready_ms(db_path: Path, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        srv = ServerProcess(db_path)
+        try:
+            times.append(srv.start() * 1000)
+        finally:
+            srv.stop()
+    return statistics.median(times)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=800.0)
+    parser.add_argument("--max-ready-ms", type=float, default=3000.0)
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "startup.db"
+        probes = [_import_once(db_path) for _ in range(args.runs)]
+        import_ms = statistics.median(p["ms"] for p in probes)
+        loaded = sorted({m for p in probes for m in p["loaded"]})
+        print(f"import server:           {import_ms:7.0f} ms (medián, {args.runs} futás)")
+        if loaded:
+            print(f"  HIBA: importkor betöltődött: {', '.join(loaded)}")
+            failed = True
+        if import_ms > args.max_import_ms:
+            print(f"  HIBA: import > {args.max_import_ms:.0f} ms")
+            failed = True
+
+        fresh_ms = _ready_ms(Path(tmp) / "fresh.db", 1)
+        existing_ms = _ready_ms(Path(tmp) / "fresh.db", args.runs)
+        print(f"első /api/health (új db):   {fresh_ms:7.0f} ms")
+        print(f"első /api/health (meglévő): {existing_ms:7.0f} ms (medián)")
+        for label, ms in (("új db", fresh_ms), ("meglévő db", existing_ms)):
+            if ms > args.max_ready_ms:
+                print(f"  HIBA: első válasz ({label}) > {args.max_ready_ms:.0f} ms")
+                failed = True
+
+    print("REGRESSZIÓ" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
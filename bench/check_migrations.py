@@ -0,0 +1,56 @@
+"""
+Migráció ellenőrzés: régi sémájú app.db helyben frissítése.
+Ideiglenes adatbázist hoz létre a migrációk előtti sémával (phone/email/reminder_sent
+nélkül, user_version = 0), lefuttatja a db.init_db()-t, és ellenőrzi, hogy
+- minden oszlop létrejött és a user_version naprakész,
+- a meglévő foglalás megmaradt,
+- második indításkor nem fut újra migráció.
+
+Futtatás: python3 bench/check_migrations.py
+"""
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+
+OLD_SCHEMA = """
+    CREATE TABLE slots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'free',
+        booking_name TEXT,
+        UNIQUE(date, time)
+    )
+"""
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "app.db"
+        old = sqlite3.connect(path)
+        old.execute(OLD_SCHEMA)
+        old.execute("INSERT INTO slots (date, time, status, booking_name) VALUES ('2020-01-06', '15:15', 'booked', 'Régi Vendég')")
+        old.commit()
+        old.close()
+
+        db.DB_PATH = path
+        db.init_db()
+        with db.get_connection() as conn:
+            version = db.get_schema_version(conn)
+            assert version == db.SCHEMA_VERSION, f"user_version={version}, várt: {db.SCHEMA_VERSION}"
+            for col in ("phone", "email", "reminder_sent"):
+                assert db._column_exists(conn, "slots", col), f"hiányzó oszlop: {col}"
+            row = conn.execute("SELECT booking_name FROM slots WHERE date = '2020-01-06'").fetchone()
+            assert row and row["booking_name"] == "Régi Vendég", "a régi foglalás elveszett"
+            assert db.migrate(conn) == 0, "naprakész sémán újra lefutott a migráció"
+        db.close_pool()
+    print(f"OK – régi séma frissítve a {db.SCHEMA_VERSION}. verzióra.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Bezárás-ellenőrzés: a nyitvatartási kivétellel (kind='closed') bezárt nap vagy időpont akkor
+sem foglalható, ha a slotnak már van tárolt, szabad sora (lemondás vagy feloldás után).
+Ideiglenes adatbázison ellenőrzi, hogy
+- foglalás → lemondás → egész napos bezárás után a book_slot, a hold_slot és a move_booking
+  célként is elutasítja a slotot,
+- ugyanez egy időpontra szóló bezárásnál is így van, a nap többi időpontja viszont foglalható,
+- a kivétel törlése után a slot újra foglalható.
+
+Futtatás: python3 bench/check_schedule_closures.py
+"""
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+from schedule_engine import slot_key  # noqa: E402
+
+
+def _cancelled_slot(day: str, slot_time: str) -> int:
+    """Extra időpont, lefoglalva és lemondva: a slotnak innentől szabad, tárolt sora van."""
+    db.add_schedule_exception(day, "extra", slot_time)
+    sid = slot_key(day, slot_time)
+    assert db.book_slot(sid, "Próba Vendég", "", "proba@example.com"), "az előkészítő foglalás nem sikerült"
+    assert db.cancel_booking(sid), "a lemondás nem sikerült"
+    assert db.get_slot(sid)["status"] == "free"
+    return sid
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "app.db"
+        db.init_db()
+        day = (date.today() + timedelta(days=3)).isoformat()
+        closed = _cancelled_slot(day, "10:00")
+        time_closed = _cancelled_slot(day, "11:00")
+        other = _cancelled_slot(day, "12:00")
+        mover = slot_key(day, "13:00")
+        db.add_schedule_exception(day, "extra", "13:00")
+        assert db.book_slot(mover, "Áthelyezendő", "", "mover@example.com")
+
+        day_exc = db.add_schedule_exception(day, "closed", note="egész nap")
+        for sid in (closed, time_closed, other):
+            assert not db.book_slot(sid, "Új Vendég"), f"bezárt nap slotja foglalható: {sid}"
+            assert not db.hold_slot(sid, "psid-1"), f"bezárt nap slotja tartható: {sid}"
+        assert not db.move_booking(mover, closed, "Áthelyezendő"), "áthelyezés bezárt napra"
+        db.delete_schedule_exception(day_exc)
+
+        db.add_schedule_exception(day, "closed", "11:00", note="egy időpont")
+        assert not db.book_slot(time_closed, "Új Vendég"), "bezárt időpont foglalható"
+        assert not db.hold_slot(time_closed, "psid-1"), "bezárt időpont tartható"
+        assert not db.move_booking(mover, time_closed, "Áthelyezendő"), "áthelyezés bezárt időpontra"
+        assert db.book_slot(closed, "Új Vendég"), "a nap nyitott időpontja nem foglalható"
+        assert db.move_booking(mover, other, "Áthelyezendő"), "áthelyezés nyitott időpontra nem sikerült"
+        db.close_pool()
+    print("OK – a bezárt nap / időpont tárolt szabad sora sem foglalható.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+EXPLAIN QUERY PLAN ellenőrzés a foglalás- és emlékeztető lekérdezésekre.
+Ideiglenes adatbázison előbb a 004-es migráció előtti sémával és a régi lekérdezésekkel,
+majd a friss sémával és a db.py aktuális lekérdezéseivel írja ki a tervet.
+Hibával lép ki, ha az új tervekben teljes táblaolvasás (SCAN slots) maradt.
+
+Futtatás: python3 bench/explain_slot_queries.py
+"""
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+
+OLD_BOOKED_SQL = """
+    SELECT id, date, time, status, booking_name, phone, email
+    FROM slots
+    WHERE status = 'booked' OR COALESCE(booking_name, '') != ''
+    ORDER BY date, time
+"""
+
+OLD_REMINDER_SQL = """
+    SELECT id, date, time, booking_name, email
+    FROM slots
+    WHERE (status = 'booked' OR COALESCE(booking_name, '') != '')
+      AND COALESCE(reminder_sent, 0) = 0
+      AND email IS NOT NULL AND email != ''
+"""
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> list[str]:
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def _show(title: str, plan: list[str]) -> None:
+    print(f"  {title}:")
+    for line in plan:
+        print(f"    {line}")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "plan.db")
+        for step in db.MIGRATIONS[:3]:
+            step(conn)
+        print("Előtte (3. sémaverzió, régi lekérdezések):")
+        _show("get_booked_slots", _plan(conn, OLD_BOOKED_SQL))
+        _show("get_bookings_needing_reminder", _plan(conn, OLD_REMINDER_SQL))
+
+        for step in db.MIGRATIONS[3:]:
+            step(conn)
+        conn.execute("ANALYZE")
+        print("Utána (aktuális séma és db.py lekérdezések):")
+        booked = _plan(conn, db.BOOKED_SLOTS_SQL)
+        reminder = _plan(conn, db.REMINDER_SQL, (0, 0))
+        _show("get_booked_slots", booked)
+        _show("get_pending_reminders", reminder)
+        conn.close()
+
+    # Index bejárása (idx_slots_status_date: csak a foglalt sorok, idx_slots_reminder: csak a
+    # függő emlékeztetők tartománya) nem teljes olvasás – csak az index nélküli SCAN slots hiba
+    scans = [line for line in booked + reminder if line.startswith("SCAN slots") and "idx_slots_" not in line]
+    if scans:
+        print(f"HIBA: teljes táblaolvasás maradt: {scans}")
+        sys.exit(1)
+    print("OK – nincs teljes táblaolvasás.")
+
+
+if __name__ == "__main__":
+    main()
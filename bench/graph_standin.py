@@ -0,0 +1,84 @@
+"""
+Helyi mock Graph API (Messenger Send API) méréshez és próbához.
+POST /<verzió>/me/messages kéréseket fogad HTTP/1.1 keep-alive-val, címzettenként
+rögzíti az üzeneteket, és fail_rate valószínűséggel 500-as vagy 429-es hibát ad.
+
+Használat: MESSENGER_GRAPH_URL=http://127.0.0.1:<port>/v21.0
+Önálló futtatás: python3 bench/graph_standin.py [port]
+"""
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 – csendes mock
+        pass
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _respond(self, status: int, body: dict, headers: dict | None = None) -> None:
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self) -> None:
+        server: GraphStandin = self.server  # type: ignore[assignment]
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail_rate and random.random() < server.fail_rate:
+            with server.lock:
+                server.errors += 1
+            if random.random() < 0.5:
+                self._respond(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0"})
+            else:
+                self._respond(500, {"error": {"message": "temporary"}})
+            return
+        recipient = payload.get("recipient", {}).get("id", "")
+        with server.lock:
+            server.received[recipient].append(payload.get("message", {}))
+            server.total += 1
+        self._respond(200, {"recipient_id": recipient, "message_id": f"m_{server.total}"})
+
+
+class GraphStandin(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, fail_rate: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.lock = threading.Lock()
+        self.received: dict[str, list[dict]] = defaultdict(list)
+        self.total = 0
+        self.errors = 0
+        self.connections = 0
+        self.latency = latency
+        self.fail_rate = fail_rate
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v21.0"
+
+    def start(self) -> "GraphStandin":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    srv = GraphStandin(int(sys.argv[1]) if len(sys.argv) > 1 else 8090)
+    print(f"Graph API mock: {srv.base_url}")
+    srv.serve_forever()
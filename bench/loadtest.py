@@ -0,0 +1,289 @@
+"""
+Önálló terheléses teszt a foglalási API-ra és a Messenger webhookra.
+Ideiglenes adatbázissal elindítja a server:app-ot (uvicorn, külön folyamat), mellé helyi
+SMTP stand-int és mock Graph API-t, majd valósághű műveletkeveréket futtat:
+- /api/slots olvasás (ETag-gel is), /api/book foglalás,
+- admin lista, PATCH (adatmódosítás) és DELETE (lemondás),
+- szimulált Messenger beszélgetések (hónap → hét → nap → időpont → név → telefon → e-mail);
+  a lépés ideje a webhook hívástól a bot válaszának megérkezéséig tart.
+Az eredmény (áteresztőképesség, késleltetés percentilisek, hibaarány) JSON fájlba kerül,
+hogy verziók között összevethető legyen.
+
+Futtatás:
+  python3 bench/loadtest.py --duration 30 --concurrency 32 --workers 1 --out loadtest.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from graph_standin import GraphStandin  # noqa: E402
+from server_process import ROOT, ServerProcess  # noqa: E402
+from smtp_standin import SmtpStandin  # noqa: E402
+
+DEFAULT_MIX = "slots=55,slots_etag=10,book=12,admin_list=5,admin_patch=5,admin_delete=5,messenger=8"
+REPLY_TIMEOUT = 10.0
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def ok(self, op: str, seconds: float) -> None:
+        self.samples[op].append(seconds)
+
+    def error(self, op: str, seconds: float | None = None) -> None:
+        self.errors[op] += 1
+        if seconds is not None:
+            self.samples[op].append(seconds)
+
+    @staticmethod
+    def _pct(ordered: list[float], p: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def report(self, elapsed: float) -> dict:
+        out = {}
+        for op in sorted(set(self.samples) | set(self.errors)):
+            ordered = sorted(self.samples.get(op, []))
+            count = len(ordered)
+            errors = self.errors.get(op, 0)
+            out[op] = {
+                "count": count,
+                "errors": errors,
+                "error_rate": round(errors / count, 4) if count else (1.0 if errors else 0.0),
+                "throughput_rps": round(count / elapsed, 2),
+                "latency_ms": {
+                    "mean": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+                    "p50": round(self._pct(ordered, 50) * 1000, 3),
+                    "p90": round(self._pct(ordered, 90) * 1000, 3),
+                    "p99": round(self._pct(ordered, 99) * 1000, 3),
+                    "max": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+                },
+            }
+        return out
+
+
+class Scenario:
+    """Közös állapot a virtuális felhasználók között: szabad és foglalt slotok."""
+
+    def __init__(self, client: httpx.AsyncClient, graph: GraphStandin, rec: Recorder):
+        self.client = client
+        self.graph = graph
+        self.rec = rec
+        self.free: list[int] = []
+        self.booked: list[int] = []
+        self.etag = ""
+        self._senders = itertools.count(1)
+        self._names = itertools.count(1)
+
+    async def _timed(self, op: str, method: str, url: str, **kw) -> httpx.Response | None:
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, **kw)
+        except httpx.HTTPError:
+            self.rec.error(op, time.perf_counter() - t0)
+            return None
+        elapsed = time.perf_counter() - t0
+        if r.status_code >= 400:
+            self.rec.error(op, elapsed)
+        else:
+            self.rec.ok(op, elapsed)
+        return r
+
+    def _remember_slots(self, slots: list[dict]) -> None:
+        self.free = [s["id"] for s in slots if s["status"] == "free"]
+
+    async def slots(self) -> None:
+        r = await self._timed("slots", "GET", "/api/slots")
+        if r is not None and r.status_code == 200:
+            self.etag = r.headers.get("etag", "")
+            self._remember_slots(r.json())
+
+    async def slots_etag(self) -> None:
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        r = await self._timed("slots_etag", "GET", "/api/slots", headers=headers)
+        if r is not None and r.status_code == 200:
+            self.etag = r.headers.get("etag", "")
+            self._remember_slots(r.json())
+
+    async def book(self) -> None:
+        if not self.free:
+            return await self.slots()
+        slot_id = random.choice(self.free)
+        n = next(self._names)
+        body = {"slot_id": slot_id, "booking_name": f"Terhelés {n}", "phone": "+36 30 123 4567", "email": f"lt{n}@example.com"}
+        r = await self._timed("book", "POST", "/api/book", json=body)
+        if r is not None and r.status_code == 200 and r.json().get("ok"):
+            self.booked.append(slot_id)
+            if slot_id in self.free:
+                self.free.remove(slot_id)
+
+    async def admin_list(self) -> None:
+        await self._timed("admin_list", "GET", "/api/admin/bookings")
+
+    async def admin_patch(self) -> None:
+        if not self.booked:
+            return await self.book()
+        slot_id = random.choice(self.booked)
+        body = {"booking_name": f"Módosított {next(self._names)}", "phone": "+36 70 765 4321", "email": "mod@example.com"}
+        await self._timed("admin_patch", "PATCH", f"/api/admin/bookings/{slot_id}", json=body)
+
+    async def admin_delete(self) -> None:
+        if not self.booked:
+            return await self.book()
+        slot_id = self.booked.pop(random.randrange(len(self.booked)))
+        await self._timed("admin_delete", "DELETE", f"/api/admin/bookings/{slot_id}")
+
+    async def _bot_step(self, sender: str, event: dict) -> dict | None:
+        """Egy webhook esemény elküldése, majd várakozás a bot következő válaszára."""
+        seen = len(self.graph.received.get(sender, []))
+        body = {"object": "page", "entry": [{"messaging": [{"sender": {"id": sender}, **event}]}]}
+        t0 = time.perf_counter()
+        r = await self._timed("messenger_webhook", "POST", "/api/messenger/webhook", json=body)
+        if r is None or r.status_code != 200:
+            return None
+        while len(self.graph.received.get(sender, [])) <= seen:
+            if time.perf_counter() - t0 > REPLY_TIMEOUT:
+                self.rec.error("messenger_reply")
+                return None
+            await asyncio.sleep(0.002)
+        self.rec.ok("messenger_reply", time.perf_counter() - t0)
+        return self.graph.received[sender][-1]
+
+    async def messenger(self) -> None:
+        sender = f"lt-{next(self._senders)}"
+        t0 = time.perf_counter()
+        reply = await self._bot_step(sender, {"postback": {"payload": "BOOK_START", "mid": f"{sender}-0"}})
+        for step in range(1, 5):  # hónap, hét, nap, időpont
+            replies = (reply or {}).get("quick_replies") or []
+            choices = [q["payload"] for q in replies if ":" in q["payload"] and not q["payload"].startswith("BACK")]
+            if not choices:
+                return
+            payload = choices[0] if step < 4 else random.choice(choices)
+            reply = await self._bot_step(sender, {"message": {"mid": f"{sender}-{step}", "quick_reply": {"payload": payload}, "text": "x"}})
+        n = next(self._names)
+        for step, text in enumerate((f"Bot Vendég {n}", "+36 20 555 1234", f"bot{n}@example.com"), start=5):
+            reply = await self._bot_step(sender, {"message": {"mid": f"{sender}-{step}", "text": text}})
+            if reply is None:
+                return
+        self.rec.ok("messenger_conversation", time.perf_counter() - t0)
+
+
+def _parse_mix(mix: str) -> tuple[list[str], list[int]]:
+    ops, weights = [], []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        ops.append(name.strip())
+        weights.append(int(weight or 1))
+    return ops, weights
+
+
+async def _run(base_url: str, graph: GraphStandin, args) -> tuple[Recorder, float]:
+    rec = Recorder()
+    ops, weights = _parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        scenario = Scenario(client, graph, rec)
+        await scenario.slots()
+        deadline = time.perf_counter() + args.duration
+
+        async def user():
+            while time.perf_counter() < deadline:
+                op = random.choices(ops, weights)[0]
+                await getattr(scenario, op)()
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+    return rec, elapsed
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Terheléses teszt (foglalási API + Messenger webhook)")
+    parser.add_argument("--duration", type=float, default=20.0, help="futási idő másodpercben")
+    parser.add_argument("--concurrency", type=int, default=32, help="párhuzamos virtuális felhasználók")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker folyamatok")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"műveletek súlyai (alap: {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1, help="véletlen mag a reprodukálhatósághoz")
+    parser.add_argument("--out", default="loadtest.json", help="JSON eredményfájl")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    smtp = SmtpStandin().start()
+    graph = GraphStandin().start()
+    env = {
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(smtp.port), "SMTP_STARTTLS": "0",
+        "MESSENGER_PAGE_ACCESS_TOKEN": "loadtest", "MESSENGER_GRAPH_URL": graph.base_url,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        server = ServerProcess(Path(tmp) / "loadtest.db", workers=args.workers, env=env)
+        startup = server.start()
+        try:
+            rec, elapsed = asyncio.run(_run(server.base_url, graph, args))
+        finally:
+            server.stop()
+    smtp.shutdown()
+    graph.shutdown()
+
+    operations = rec.report(elapsed)
+    # A beszélgetés és a bot válaszideje nem külön HTTP kérés – az összesítésben nem számít
+    http_ops = {name: op for name, op in operations.items() if name not in ("messenger_conversation", "messenger_reply")}
+    total = sum(op["count"] for op in http_ops.values())
+    errors = sum(op["errors"] for op in http_ops.values())
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "duration_s": round(elapsed, 3),
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "mix": args.mix,
+            "seed": args.seed,
+            "startup_s": round(startup, 3),
+        },
+        "totals": {
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "throughput_rps": round(total / elapsed, 2),
+            "graph_api_messages": graph.total,
+        },
+        "operations": operations,
+    }
+    Path(args.out).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"{'művelet':24s} {'db':>7} {'hiba':>6} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for name, op in operations.items():
+        lat = op["latency_ms"]
+        print(f"{name:24s} {op['count']:>7} {op['errors']:>6} {op['throughput_rps']:>8} "
+              f"{lat['p50']:>8} {lat['p90']:>8} {lat['p99']:>8}")
+    print(f"Összesen: {total} kérés, {result['totals']['throughput_rps']} kérés/mp, hibaarány {result['totals']['error_rate']}")
+    print(f"Eredmény: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Segédfüggvények a benchmarkokhoz: a server:app elindítása külön uvicorn folyamatban,
+ideiglenes adatbázissal (DB_PATH), megadott worker számmal és környezettel.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServerProcess:
+    def __init__(self, db_path: Path, workers: int = 1, env: dict | None = None, port: int | None = None):
+        self.db_path = db_path
+        self.workers = workers
+        self.port = port or free_port()
+        self.env = env or {}
+        self.proc: subprocess.Popen | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 30.0) -> float:
+        """Elindítja a szervert és megvárja az első sikeres /api/health választ.
+        Visszaadja az indítástól az első válaszig eltelt időt (mp)."""
+        env = {**os.environ, "DB_PATH": str(self.db_path), "WEB_CONCURRENCY": str(self.workers), **self.env}
+        cmd = [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+               "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"]
+        t0 = time.perf_counter()
+        self.proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = t0 + timeout
+        while time.perf_counter() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"a szerver kilépett (kód: {self.proc.returncode})")
+            try:
+                if httpx.get(f"{self.base_url}/api/health", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        self.stop()
+        raise RuntimeError("a szerver nem indult el időben")
+
+    def stop(self) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc = None
+
+    def __enter__(self) -> "ServerProcess":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
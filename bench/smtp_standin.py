@@ -0,0 +1,71 @@
+"""
+Helyi SMTP „stand-in” szerver méréshez és próbához (aiosmtpd-szerű, függőség nélkül).
+Elfogadja az EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT parancsokat, és csak számolja
+a leveleket. STARTTLS és AUTH nincs – a klienst SMTP_STARTTLS=0 mellett, SMTP_USER nélkül használd.
+
+Önálló futtatás: python3 bench/smtp_standin.py [port]
+"""
+import socketserver
+import sys
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self) -> None:
+        server: "SmtpStandin" = self.server  # type: ignore[assignment]
+        with server.lock:
+            server.connections += 1
+        if server.latency:
+            time.sleep(server.latency)  # kapcsolódási (TLS/LOGIN) költség szimulálása
+        self._reply("220 standin ESMTP")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            cmd = raw.decode("utf-8", "replace").strip().upper()
+            if cmd.startswith("EHLO"):
+                self.wfile.write(b"250-standin\r\n250 8BITMIME\r\n")
+            elif cmd.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif cmd == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with server.lock:
+                    server.messages += 1
+                self._reply("250 OK queued")
+            elif cmd == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SmtpStandin(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.connections = 0
+        self.latency = latency
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "SmtpStandin":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    srv = SmtpStandin(int(sys.argv[1]) if len(sys.argv) > 1 else 8025)
+    print(f"SMTP stand-in: 127.0.0.1:{srv.port}")
+    srv.serve_forever()
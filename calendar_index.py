@@ -0,0 +1,104 @@
+"""
+Szabad időpontok naptár-indexe a Messenger hónap → hét → nap → időpont menühöz.
+Adatverziónként (db.get_slots_snapshot kulcsa) egyszer épül fel; utána minden
+menülépés szótár-kikeresés a teljes lista bejárása helyett. A holdok (ideiglenes foglalások)
+nincsenek benne, azokat a menü szűri ki (db.get_held_slot_ids), így nem kell újraépíteni.
+"""
+import threading
+from datetime import date, timedelta
+
+import db
+
+HONAPOK = {"01": "január", "02": "február", "03": "március", "04": "április", "05": "május",
+           "06": "június", "07": "július", "08": "augusztus", "09": "szeptember",
+           "10": "október", "11": "november", "12": "december"}
+
+DAY_NAMES = ["Hétfő", "Kedd", "Szerda", "Csütörtök", "Péntek", "Szombat", "Vasárnap"]
+
+
+class AvailabilityIndex:
+    """Szabad slotok hónap / ISO hét (hétfői kezdőnap) / nap szerint csoportosítva,
+    a menüfeliratokkal együtt előre kiszámolva."""
+
+    def __init__(self, slots: list[dict]):
+        self._by_id: dict[int, dict] = {}
+        self._by_day: dict[str, list[dict]] = {}
+        weeks_by_month: dict[str, set[str]] = {}
+        for s in slots:
+            if s.get("status") != "free":
+                continue
+            d = s.get("date", "")
+            self._by_id[s["id"]] = s
+            self._by_day.setdefault(d, []).append(s)
+            try:
+                dt = date.fromisoformat(d)
+            except (ValueError, TypeError):
+                continue
+            week_key = (dt - timedelta(days=dt.weekday())).isoformat()
+            weeks_by_month.setdefault(d[:7], set()).add(week_key)
+
+        self._months = [(ym, HONAPOK.get(ym[5:7], ym[5:7])) for ym in sorted(weeks_by_month)][:3]
+        self._weeks = {ym: [(wk, self._week_label(wk)) for wk in sorted(wks)] for ym, wks in weeks_by_month.items()}
+        self._days: dict[str, list[tuple[str, str]]] = {}
+        for wks in weeks_by_month.values():
+            for wk in wks:
+                if wk not in self._days:
+                    self._days[wk] = self._week_days(wk)
+
+    @staticmethod
+    def _week_label(week_key: str) -> str:
+        wk_start = date.fromisoformat(week_key)
+        wk_end = wk_start + timedelta(days=6)
+        mn = HONAPOK.get(wk_start.strftime("%m"), "")
+        return f"{wk_start.day}.–{wk_end.day}. {mn}"
+
+    def _week_days(self, week_key: str) -> list[tuple[str, str]]:
+        start = date.fromisoformat(week_key)
+        out = []
+        for i in range(7):
+            d = start + timedelta(days=i)
+            ds = d.isoformat()
+            if ds in self._by_day:
+                out.append((ds, f"{DAY_NAMES[d.weekday()]} {d.day}."))
+        return out
+
+    def months(self) -> list[tuple[str, str]]:
+        """(yyyy-mm, megjelenített név) párok, legfeljebb 3."""
+        return self._months
+
+    def weeks(self, yyyy_mm: str) -> list[tuple[str, str]]:
+        """(hét kezdő dátuma, megjelenített név) párok a hónapban."""
+        return self._weeks.get(yyyy_mm, [])
+
+    def days(self, week_start: str) -> list[tuple[str, str]]:
+        """(dátum, megjelenített név) párok azokra a napokra, ahol van szabad időpont."""
+        days = self._days.get(week_start)
+        if days is None:
+            try:
+                days = self._week_days(week_start)
+            except ValueError:
+                days = []
+        return days
+
+    def slots_for_day(self, day: str) -> list[dict]:
+        return self._by_day.get(day, [])
+
+    def slot(self, slot_id: int) -> dict | None:
+        return self._by_id.get(slot_id)
+
+
+_cached: tuple[str, AvailabilityIndex] | None = None
+_lock = threading.Lock()
+
+
+def get_index() -> AvailabilityIndex:
+    """Az aktuális adatverzióhoz tartozó index; csak foglalás/lemondás/áthelyezés után épül újra."""
+    global _cached
+    key, slots = db.get_slots_snapshot(holds=False)
+    cached = _cached
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _lock:
+        if _cached is None or _cached[0] != key:
+            _cached = (key, AvailabilityIndex(slots))
+        return _cached[1]
@@ -1,27 +1,241 @@
 """
 Adatbázis kezelő – időpontok (slots) tárolása SQLite-ban.
 Tábla: id, date, time, status, booking_name
-- Hétköznap: 15:15, 16:15, 17:00, 17:45, 18:30
-- Hétvége: 08:30, 09:30, 10:30, 11:15, 12:00
-- Mindig aktuális + következő hónap; hóvégén (25-től) a következő utáni hónap is.
+- Az időpontokat a nyitvatartási szabályok adják (schedule_rules, schedule_exceptions; lásd
+  schedule_engine.py); a slots táblában csak a foglalt / letiltott / már érintett időpontok vannak.
+- Alapszabályok: hétköznap 15:15, 16:15, 17:00, 17:45, 18:30; hétvége 08:30, 09:30, 10:30, 11:15, 12:00
+- Lista: mindig aktuális + következő hónap; hóvégén (25-től) a következő utáni hónap is.
 """
+import functools
+import heapq
+import json
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+import zlib
 from contextlib import contextmanager
 from datetime import date, datetime, timedelta
+import calendar
 from calendar import monthrange
 from pathlib import Path
+from typing import Callable
 
-DB_PATH = Path(__file__).parent / "app.db"
+import schedule_engine
+from metrics import SLOT_HOLD_CONFLICTS, SLOT_HOLDS, timed_db
+from schedule_engine import Schedule, ScheduleException, WeeklyRule
 
+DB_PATH = Path(os.environ.get("DB_PATH") or Path(__file__).parent / "app.db")
+
+# Kapcsolat-pool: DB_POOL=0 → minden hívás új kapcsolatot nyit (régi viselkedés, méréshez)
+DB_POOL_ENABLED = os.environ.get("DB_POOL", "1").lower() not in ("0", "false", "no", "off")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+# Írási tranzakció (BEGIN IMMEDIATE) újrapróbálása, ha a busy_timeout után is zárolt az adatbázis
+DB_WRITE_RETRIES = int(os.environ.get("DB_WRITE_RETRIES", "5"))
+# Több uvicorn worker esetén az adatverzió az adatbázisban is nő, hogy minden folyamat cache-e érvénytelenüljön
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1") or 1)
+DB_SHARED_VERSION = os.environ.get("DB_SHARED_VERSION", "1" if WEB_CONCURRENCY > 1 else "0").lower() in ("1", "true", "yes", "on")
+
+# Archiválás: ennyi napnál régebbi slotok kerülnek ki a slots táblából (lásd archive_past_slots)
+SLOTS_RETENTION_DAYS = int(os.environ.get("SLOTS_RETENTION_DAYS", "7"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "2000"))
+# Futásonként legfeljebb ennyi szabad lapot ad vissza az incremental_vacuum (0 = mindet)
+DB_VACUUM_PAGES = int(os.environ.get("DB_VACUUM_PAGES", "1000"))
+
+# Értesítési outbox: mely eseményekről menjen e-mail (a Messenger értesítés csak a beszélgetésből
+# indított foglalásnál / lemondásnál megy, a küldő azonosítójával); az elküldött / véglegesen
+# sikertelen feladatok ennyi nap után törlődnek
+OUTBOX_EMAIL_KINDS = frozenset(
+    k.strip() for k in os.environ.get("OUTBOX_EMAIL_KINDS", "booked,moved,cancelled,reminder").split(",") if k.strip()
+)
+OUTBOX_RETENTION_DAYS = int(os.environ.get("OUTBOX_RETENTION_DAYS", "30"))
+
+# Ideiglenes foglalás (hold): a Messenger beszélgetésben a választott slot ennyi mp-ig másnak nem foglalható
+SLOT_HOLD_SECONDS = float(os.environ.get("SLOT_HOLD_SECONDS", "600"))
+
+# Alap nyitvatartás: a 008-as migráció ebből hozza létre a heti szabályokat
 WEEKDAY_TIMES = ["15:15", "16:15", "17:00", "17:45", "18:30"]
 WEEKEND_TIMES = ["08:30", "09:30", "10:30", "11:15", "12:00"]
 
 
+def phone_digits(phone: str | None) -> str:
+    """Telefonszám csak a számjegyekkel (ugyanaz a normalizálás, mint a server._is_valid_phone-ban)."""
+    return re.sub(r"\D", "", phone or "")
+
+
+def _phone_search_tokens(phone: str | None) -> str:
+    """A kereső index telefon-tokenjei: a teljes számjegysor, az országos hívószám nélküli
+    alak (36 / 06 elhagyva) és az utolsó 7 számjegy – így „+36 30 …”, „06 30 …” és „30 …”
+    is ugyanarra a foglalásra talál (prefix kereséssel)."""
+    digits = phone_digits(phone)
+    if not digits:
+        return ""
+    tokens = [digits]
+    for prefix in ("36", "06"):
+        if digits.startswith(prefix) and len(digits) > 8:
+            tokens.append(digits[len(prefix):])
+            break
+    if len(digits) > 7:
+        tokens.append(digits[-7:])
+    return " ".join(dict.fromkeys(tokens))
+
+
+def _register_functions(conn: sqlite3.Connection) -> None:
+    """A triggerek által hívott SQL függvények (minden kapcsolaton regisztrálni kell)."""
+    conn.create_function("phone_search_tokens", 1, _phone_search_tokens, deterministic=True)
+
+
+def _connect() -> sqlite3.Connection:
+    """Új kapcsolat nyitása a hangolt PRAGMA-kkal (WAL, busy_timeout, synchronous, cache)."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    _register_functions(conn)
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA cache_size = -8000")  # ~8 MB lapcache kapcsolatonként
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+class _ConnectionPool:
+    """Korlátos méretű pool: a kapcsolatok nyitva maradnak a hívások között.
+    Ha minden kapcsolat foglalt és elértük a méretet, a hívó vár egy szabad kapcsolatra."""
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = max(1, size)
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return _connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._created = 0
+
+
+_pool: _ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _ConnectionPool:
+    """Az aktuális DB_PATH-hoz tartozó pool (DB_PATH változásakor újat hoz létre)."""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.path == DB_PATH:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = _ConnectionPool(DB_PATH, DB_POOL_SIZE)
+        return _pool
+
+
+# Szálhoz kötött kapcsolat: a use_thread_connection()-nel megjelölt szál (az adb executor szálai)
+# a közös pool helyett saját, nyitva tartott kapcsolatot használ, így a háttérszálak (outbox,
+# emlékeztető, webhook workerek, archiválás) terhelése nem foglalja el előle a poolt.
+_thread_conn = threading.local()
+_thread_conns: list[sqlite3.Connection] = []
+_thread_conns_lock = threading.Lock()
+_thread_conns_epoch = 0  # close_pool() növeli: a szálak új kapcsolatot nyitnak
+
+
+def use_thread_connection() -> None:
+    """A hívó szál mostantól saját kapcsolatot használ (ThreadPoolExecutor initializer-ként)."""
+    _thread_conn.enabled = True
+
+
+def _acquire_thread_connection() -> sqlite3.Connection | None:
+    """A szál saját kapcsolata; None, ha a szál nincs megjelölve, vagy a kapcsolata épp használatban
+    van (egymásba ágyazott get_connection – ilyenkor a pool ad másikat)."""
+    if not getattr(_thread_conn, "enabled", False) or getattr(_thread_conn, "busy", False):
+        return None
+    conn = getattr(_thread_conn, "conn", None)
+    if conn is None or _thread_conn.path != DB_PATH or _thread_conn.epoch != _thread_conns_epoch:
+        conn = _connect()
+        with _thread_conns_lock:
+            _thread_conns.append(conn)
+        _thread_conn.conn, _thread_conn.path, _thread_conn.epoch = conn, DB_PATH, _thread_conns_epoch
+    _thread_conn.busy = True
+    return conn
+
+
+def set_pool_enabled(enabled: bool) -> None:
+    """Pool be/ki kapcsolása futás közben (pl. késleltetés méréshez)."""
+    global DB_POOL_ENABLED
+    DB_POOL_ENABLED = enabled
+    if not enabled:
+        close_pool()
+
+
+def close_pool() -> None:
+    """Az összes pool-ban tartott és szálhoz kötött kapcsolat lezárása."""
+    global _pool, _thread_conns_epoch
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+    with _thread_conns_lock:
+        _thread_conns_epoch += 1
+        for conn in _thread_conns:
+            conn.close()
+        _thread_conns.clear()
+
+
 @contextmanager
 def get_connection():
-    """Környezetkezelő az adatbázis kapcsolathoz."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """Környezetkezelő az adatbázis kapcsolathoz (pool-ból, ha engedélyezett)."""
+    if not DB_POOL_ENABLED:
+        conn = _connect()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return
+    conn = _acquire_thread_connection()
+    if conn is not None:
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            _thread_conn.busy = False
+        return
+    pool = _get_pool()
+    conn = pool.acquire()
     try:
         yield conn
         conn.commit()
@@ -29,7 +243,29 @@ def get_connection():
         conn.rollback()
         raise
     finally:
-        conn.close()
+        pool.release(conn)
+
+
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+
+@contextmanager
+def write_transaction():
+    """Írási tranzakció BEGIN IMMEDIATE-tel: az írási zárat már az elején megszerzi, így a
+    tranzakció közben nem jöhet SQLITE_BUSY, és több folyamat sem írhat egyszerre.
+    Ha a busy_timeout után is foglalt, korlátozott számban, növekvő várakozással újrapróbálja."""
+    with get_connection() as conn:
+        for attempt in range(DB_WRITE_RETRIES + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == DB_WRITE_RETRIES:
+                    raise
+                time.sleep(min(1.0, 0.05 * (2 ** attempt)))
+        yield conn
 
 
 def _get_month_range() -> tuple[date, date]:
@@ -65,195 +301,992 @@ def _get_month_range() -> tuple[date, date]:
     return start, end
 
 
-def _generate_slots_to_insert() -> list[tuple[str, str]]:
-    """Generálja a beszúrandó (date, time) párokat."""
-    start, end = _get_month_range()
-    slots: list[tuple[str, str]] = []
-    d = start
-    while d <= end:
-        weekday = d.weekday()  # 0=Hétfő, 6=Vasárnap
-        times = WEEKDAY_TIMES if weekday < 5 else WEEKEND_TIMES
-        for t in times:
-            slots.append((d.isoformat(), t))
-        d += timedelta(days=1)
-    return slots
+# --- Sémamigrációk (PRAGMA user_version) ---
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    """Régi (user_version = 0) adatbázisokon az oszlop már létezhet – ilyenkor kihagyja."""
+    if not _column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _migrate_001_create_slots(conn: sqlite3.Connection) -> None:
+    """Alap slots tábla."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS slots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'free',
+            booking_name TEXT,
+            UNIQUE(date, time)
+        )
+    """)
+
+
+def _migrate_002_contact_and_reminder(conn: sqlite3.Connection) -> None:
+    """Telefon, e-mail és emlékeztető jelző oszlopok."""
+    _add_column_if_missing(conn, "slots", "phone", "TEXT")
+    _add_column_if_missing(conn, "slots", "email", "TEXT")
+    _add_column_if_missing(conn, "slots", "reminder_sent", "INTEGER DEFAULT 0")
+
+
+def _migrate_003_meta(conn: sqlite3.Connection) -> None:
+    """Kulcs–érték tábla belső állapothoz (pl. slot generálás vízjele)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+
+def _migrate_004_starts_at_and_indexes(conn: sqlite3.Connection) -> None:
+    """starts_at (kezdés epoch másodpercben) + indexek a foglalás- és emlékeztető lekérdezésekhez.
+    A starts_at a helyi falióra-időt UTC-ként értelmezve tárolja (mint a datetime.now() naiv ideje).
+    Egyúttal kikényszeríti az invariánst: van booking_name ⇒ status = 'booked', és reminder_sent nem NULL,
+    így a lekérdezések COALESCE nélkül, indexszel szűrhetnek."""
+    _add_column_if_missing(conn, "slots", "starts_at", "INTEGER")
+    conn.execute("UPDATE slots SET starts_at = CAST(strftime('%s', date || ' ' || time) AS INTEGER)")
+    conn.execute("UPDATE slots SET status = 'booked' WHERE COALESCE(booking_name, '') != '' AND status != 'booked'")
+    conn.execute("UPDATE slots SET reminder_sent = 0 WHERE reminder_sent IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_slots_booked ON slots(date, time) WHERE status = 'booked'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_slots_reminder ON slots(reminder_sent, starts_at)")
+
+
+def _migrate_005_sessions(conn: sqlite3.Connection) -> None:
+    """Messenger beszélgetés-állapot (több worker folyamat közös tárolója)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            sender_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+
+
+def _migrate_006_admin_listing_index(conn: sqlite3.Connection) -> None:
+    """Admin lista: státusz + dátum szűrés és (date, time, id) szerinti lapozás egy indexből.
+    A 004-es részleges foglalás-indexet kiváltja (status = 'booked' ugyanezt használja)."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_slots_status_date ON slots(status, date, time)")
+    conn.execute("DROP INDEX IF EXISTS idx_slots_booked")
+
+
+def _migrate_007_slots_archive(conn: sqlite3.Connection) -> None:
+    """Múltbeli foglalások archívuma: a slots tábla csak a közelmúltat és a jövőt tartja."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS slots_archive (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            status TEXT NOT NULL,
+            booking_name TEXT,
+            phone TEXT,
+            email TEXT,
+            reminder_sent INTEGER NOT NULL DEFAULT 0,
+            starts_at INTEGER,
+            archived_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_slots_archive_status_date ON slots_archive(status, date, time)")
+
+
+def _migrate_008_schedule_rules(conn: sqlite3.Connection) -> None:
+    """Nyitvatartási szabályok és kivételek; az előre legenerált, érintetlen szabad slotok törlése
+    (ezeket mostantól a szabályokból számoljuk, a slots tábla a foglalásokkal nő, nem a naptárral)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schedule_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            weekday INTEGER NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+            times TEXT NOT NULL,
+            valid_from TEXT,
+            valid_to TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schedule_exceptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            time TEXT,
+            kind TEXT NOT NULL CHECK (kind IN ('closed', 'extra')),
+            note TEXT NOT NULL DEFAULT ''
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_schedule_exceptions_date ON schedule_exceptions(date)")
+    if conn.execute("SELECT COUNT(*) FROM schedule_rules").fetchone()[0] == 0:
+        conn.executemany(
+            "INSERT INTO schedule_rules (weekday, times) VALUES (?, ?)",
+            [(wd, ",".join(WEEKDAY_TIMES if wd < 5 else WEEKEND_TIMES)) for wd in range(7)],
+        )
+    conn.execute("DELETE FROM slots WHERE status = 'free' AND COALESCE(booking_name, '') = ''")
+    conn.execute("DELETE FROM meta WHERE key = 'slots_materialized_until'")
+
+
+def _migrate_009_outbox(conn: sqlite3.Connection) -> None:
+    """Tartós értesítési sor: a foglalás / lemondás / áthelyezés ugyanabban a tranzakcióban
+    teszi be a kiküldendő értesítést, mint a slot módosítását (lásd notifier.py).
+    available_at: mikortól vehető fel (újrapróbálásnál a visszalépés vége, felvételkor a bérlet vége)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel TEXT NOT NULL CHECK (channel IN ('email', 'messenger')),
+            kind TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            slot_id INTEGER,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending'
+                CHECK (status IN ('pending', 'sending', 'sent', 'failed', 'cancelled')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            finished_at REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, available_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_slot ON outbox(slot_id) WHERE status = 'pending'")
+
+
+def _migrate_010_bookings_search(conn: sqlite3.Connection) -> None:
+    """Teljes szöveges kereső a foglalásokra (név, e-mail, telefon) – FTS5, rowid = slot id.
+    A slots (csak a foglaltak) és a slots_archive sorait triggerek tartják szinkronban; az
+    archiválás (azonos id-vel) a bejegyzést megtartja. A telefon a phone_search_tokens SQL
+    függvénnyel kerül be, ezért a slots táblát csak a db.py kapcsolatain (vagy a függvényt
+    regisztráló kapcsolaton) szabad írni.
+    Prefix index 2–10 karakterig: az FTS5 index nélküli prefix keresésnél a teljes egyesített
+    doclistát felépíti (1M foglalásnál gyakori névre ~20 ms), indexszel ~0,3 ms; az ára kb.
+    kétszeres indexméret."""
+    _register_functions(conn)
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS bookings_fts USING fts5(
+            name, email, phone,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3 4 5 6 7 8 9 10'
+        )
+    """)
+    columns = "(rowid, name, email, phone)"
+    # executescript helyett egyenként: az executescript COMMIT-tal kezdene, a migráció pedig egy tranzakció
+    for trigger in (
+        f"""CREATE TRIGGER IF NOT EXISTS slots_fts_insert AFTER INSERT ON slots
+            WHEN new.status = 'booked' BEGIN
+                INSERT INTO bookings_fts {columns}
+                VALUES (new.id, new.booking_name, new.email, phone_search_tokens(new.phone));
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS slots_fts_update AFTER UPDATE OF status, booking_name, phone, email ON slots
+            WHEN old.status = 'booked' OR new.status = 'booked' BEGIN
+                DELETE FROM bookings_fts WHERE rowid = old.id;
+                INSERT INTO bookings_fts {columns}
+                SELECT new.id, new.booking_name, new.email, phone_search_tokens(new.phone) WHERE new.status = 'booked';
+            END""",
+        """CREATE TRIGGER IF NOT EXISTS slots_fts_delete AFTER DELETE ON slots
+            WHEN old.status = 'booked' AND NOT EXISTS (SELECT 1 FROM slots_archive WHERE id = old.id) BEGIN
+                DELETE FROM bookings_fts WHERE rowid = old.id;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS slots_archive_fts_insert AFTER INSERT ON slots_archive BEGIN
+                DELETE FROM bookings_fts WHERE rowid = new.id;
+                INSERT INTO bookings_fts {columns}
+                VALUES (new.id, new.booking_name, new.email, phone_search_tokens(new.phone));
+            END""",
+        """CREATE TRIGGER IF NOT EXISTS slots_archive_fts_delete AFTER DELETE ON slots_archive BEGIN
+                DELETE FROM bookings_fts WHERE rowid = old.id;
+            END""",
+    ):
+        conn.execute(trigger)
+    conn.execute("DELETE FROM bookings_fts")
+    conn.execute(f"""
+        INSERT INTO bookings_fts {columns}
+        SELECT id, booking_name, email, phone_search_tokens(phone) FROM slots WHERE status = 'booked'
+        UNION ALL
+        SELECT id, booking_name, email, phone_search_tokens(phone) FROM slots_archive
+    """)
+
+
+def _migrate_011_slot_holds(conn: sqlite3.Connection) -> None:
+    """Ideiglenes foglalások: slot_id → holder, lejárat (epoch mp). Virtuális slotra sem hoz
+    létre slots sort. Egyszerre legfeljebb a folyamatban lévő beszélgetések számú sor."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS slot_holds (
+            slot_id INTEGER PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+
+
+def _migrate_012_booked_at(conn: sqlite3.Connection) -> None:
+    """A foglalás (áthelyezés) ideje a starts_at időskáláján: az emlékeztető csak akkor jár,
+    ha a foglalás az esedékesség (starts_at − lead) előtt jött létre. A régi foglalásoknál NULL."""
+    _add_column_if_missing(conn, "slots", "booked_at", "INTEGER")
+
+
+def _migrate_013_outbox_sent_parts(conn: sqlite3.Connection) -> None:
+    """Több üzenetből álló (Messenger) feladatnál a már kézbesített részek bitmaszkja: az
+    újrapróbálás csak a hiányzókat küldi, a vendég nem kapja meg újra a visszaigazolást."""
+    _add_column_if_missing(conn, "outbox", "sent_parts", "INTEGER NOT NULL DEFAULT 0")
 
 
+# Sorrendben futnak; az i. elem után a user_version = i + 1. Új lépést csak a lista végére!
+MIGRATIONS = [
+    _migrate_001_create_slots,
+    _migrate_002_contact_and_reminder,
+    _migrate_003_meta,
+    _migrate_004_starts_at_and_indexes,
+    _migrate_005_sessions,
+    _migrate_006_admin_listing_index,
+    _migrate_007_slots_archive,
+    _migrate_008_schedule_rules,
+    _migrate_009_outbox,
+    _migrate_010_bookings_search,
+    _migrate_011_slot_holds,
+    _migrate_012_booked_at,
+    _migrate_013_outbox_sent_parts,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Lefuttatja a még nem alkalmazott migrációkat egy írási tranzakcióban.
+    Ha a séma naprakész, csak a user_version-t olvassa. Visszaadja a futtatott lépések számát."""
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Újraolvasás a zár alatt: több worker egyszerre is indulhat
+        version = get_schema_version(conn)
+        for step in MIGRATIONS[version:]:
+            step(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    applied = SCHEMA_VERSION - version
+    if applied:
+        print(f"[DB] Séma frissítve: {version} → {SCHEMA_VERSION}")
+    return applied
+
+
+@timed_db
 def init_db():
-    """Létrehozza a slots táblát, ha még nem létezik, és feltölti a hiányzó slotokat.
+    """Lefuttatja a függő migrációkat. Slotokat nem generál: azok a szabályokból számolódnak.
     Nem törli a meglévő táblát sem a tartalmát. Resethez töröld az app.db fájlt."""
     with get_connection() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS slots (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                time TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'free',
-                booking_name TEXT,
-                phone TEXT,
-                email TEXT,
-                reminder_sent INTEGER DEFAULT 0,
-                UNIQUE(date, time)
+        migrate(conn)
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+
+
+SHARED_VERSION_KEY = "data_version"
+HOLDS_VERSION_KEY = "holds_version"
+
+
+# --- Adatverzió és elérhetőségi cache ---
+# Minden sikeres, a slotokat módosító írás után nő (commit után), így a cache-elt lista
+# addig érvényes, amíg a verzió (és a nap) nem változik. A holdok (ideiglenes foglalások) nem
+# emelik: külön hold-verziójuk van, és a lista fölé rétegként kerülnek (get_slot_rows_snapshot).
+
+_data_version = 0
+_cache_epoch = os.urandom(4).hex()  # újraindítás után a régi ETag-ek ne egyezzenek
+_version_lock = threading.Lock()
+_slots_cache: tuple[str, list[tuple[int, str, str, str]]] | None = None  # holdok nélkül
+_slots_view_cache: tuple[str, list[tuple[int, str, str, str]]] | None = None  # holdokkal
+_slots_dicts_cache: tuple[str, list[dict]] | None = None
+_holds_version = 0
+_holds_cache: tuple[str, float | None, frozenset[int]] | None = None  # (hold-verzió, legkorábbi lejárat, slot id-k)
+
+
+def get_data_version() -> int:
+    return _data_version
+
+
+def bump_data_version() -> int:
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+        version = _data_version
+    if DB_SHARED_VERSION:
+        with write_transaction() as conn:
+            conn.execute(
+                """INSERT INTO meta (key, value) VALUES (?, '1')
+                   ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1""",
+                (SHARED_VERSION_KEY,),
             )
-        """)
-        try:
-            conn.execute("ALTER TABLE slots ADD COLUMN phone TEXT")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            conn.execute("ALTER TABLE slots ADD COLUMN email TEXT")
-        except sqlite3.OperationalError:
-            pass
+    return version
+
+
+@timed_db
+def _shared_version() -> str:
+    with get_connection() as conn:
+        return _get_meta(conn, SHARED_VERSION_KEY) or "0"
+
+
+def get_shared_version() -> int:
+    """Az adatbázisban tárolt, minden worker írásaival együtt növő adatverzió."""
+    return int(_shared_version())
+
+
+# Slot-változás figyelők (pl. slot_events): f(changes), ahol changes = [(slot_id, új státusz), ...]
+# vagy None = „sok minden változott, tölts újra”. A commit és a verzióemelés UTÁN hívódnak.
+_change_listeners: list[Callable[[list[tuple[int, str]] | None], None]] = []
+_pending_changes = threading.local()
+
+
+def add_change_listener(func: Callable[[list[tuple[int, str]] | None], None]) -> None:
+    if func not in _change_listeners:
+        _change_listeners.append(func)
+
+
+def remove_change_listener(func: Callable[[list[tuple[int, str]] | None], None]) -> None:
+    if func in _change_listeners:
+        _change_listeners.remove(func)
+
+
+def _notify_changes(changes: list[tuple[int, str]] | None) -> None:
+    for listener in list(_change_listeners):
         try:
-            conn.execute("ALTER TABLE slots ADD COLUMN reminder_sent INTEGER DEFAULT 0")
-        except sqlite3.OperationalError:
-            pass
-        _ensure_slots_exist(conn)
+            listener(changes)
+        except Exception as e:
+            print(f"[DB] Változás-értesítési hiba: {e}")
+
+
+def _queue_changes(changes: list[tuple[int, str]] | None) -> None:
+    """Sikeres commit után: a változásokat a _bumps_version a verzióemelés után küldi ki,
+    így aki az értesítésre olvas, már az új verziót kapja."""
+    _pending_changes.value = changes
+    _pending_changes.set = True
 
 
-def _ensure_slots_exist(conn: sqlite3.Connection):
-    """Ha új hónapok kerültek a tartományba, beszúrja a hiányzó slotokat."""
-    for d, t in _generate_slots_to_insert():
+def _publishes_changes(bump: Callable[[], object] | None):
+    """Dekorátor-gyártó: ha az írás sikeres (igaz visszatérési érték), meghívja a bump-ot (verzió
+    növelése), majd kiküldi a függvény által jelzett slot-változásokat."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _pending_changes.set = False
+            try:
+                result = func(*args, **kwargs)
+                if result:
+                    if bump is not None:
+                        bump()
+                    if _pending_changes.set:
+                        _notify_changes(_pending_changes.value)
+                return result
+            finally:
+                _pending_changes.set = False
+                _pending_changes.value = None
+        return wrapper
+    return decorator
+
+
+def _bump_holds_version() -> None:
+    """Hold-írás commitja után (a tranzakción belül a _touch_holds párja)."""
+    global _holds_version
+    with _version_lock:
+        _holds_version += 1
+
+
+# A slotokat (a publikus listát) módosító írások: adatverzió-emelés + változás-értesítés
+_bumps_version = _publishes_changes(bump_data_version)
+# Hold-műveletek: csak a hold-verzió nő, így a slot-lista cache, az előre tömörített válaszok
+# és a naptár-index megmarad
+_bumps_holds_version = _publishes_changes(_bump_holds_version)
+# A publikus listát nem érintő írások (pl. a foglalás adatai): csak értesítés, pl. az
+# emlékeztető-ütemezőnek
+_notifies_changes = _publishes_changes(None)
+
+
+def _touch_holds(conn: sqlite3.Connection) -> None:
+    """Hold-írás tranzakcióján belül: több workernél a közös hold-verziót is növeli (külön
+    tranzakció nélkül)."""
+    if DB_SHARED_VERSION:
         conn.execute(
-            "INSERT OR IGNORE INTO slots (date, time, status) VALUES (?, ?, 'free')",
-            (d, t),
+            """INSERT INTO meta (key, value) VALUES (?, '1')
+               ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1""",
+            (HOLDS_VERSION_KEY,),
         )
 
 
+@timed_db
+def _holds_stamp() -> str:
+    if DB_SHARED_VERSION:
+        with get_connection() as conn:
+            return _get_meta(conn, HOLDS_VERSION_KEY) or "0"
+    return str(_holds_version)
+
+
+def get_held_slot_ids() -> frozenset[int]:
+    """Az érvényes holddal tartott slotok. Memóriából, amíg nincs hold-írás és egyik sem jár le.
+    A lejárat idő szerinti szűrés (írás nélkül); a lejárt holdokról itt megy ki a változás."""
+    global _holds_cache
+    stamp = _holds_stamp()
+    now = time.time()
+    cached = _holds_cache
+    if cached is not None and cached[0] == stamp and (cached[1] is None or now < cached[1]):
+        return cached[2]
+    expired: list[tuple[int, str]] = []
+    with get_connection() as conn:
+        rows = conn.execute("SELECT slot_id, expires_at FROM slot_holds WHERE expires_at > ?", (now,)).fetchall()
+        held = frozenset(r[0] for r in rows)
+        if cached is not None and cached[0] == stamp:
+            expired = [(i, _slot_status(conn, i)) for i in cached[2] - held]
+    _holds_cache = (stamp, min((r[1] for r in rows), default=None), held)
+    if expired:
+        _notify_changes(expired)
+    return held
+
+
+def _overlay_holds(rows: list[tuple[int, str, str, str]], held: frozenset[int]) -> list[tuple[int, str, str, str]]:
+    """A holddal tartott szabad slotok státusza 'held'."""
+    return [(i, d, t, "held") if st == "free" and i in held else (i, d, t, st) for i, d, t, st in rows]
+
+
+def _snapshot_key() -> str:
+    if DB_SHARED_VERSION:
+        # Több worker: a közös (adatbázisbeli) verzió egy elsődleges kulcsos olvasás, nem teljes lekérdezés
+        return f"v{_shared_version()}-{date.today().isoformat()}"
+    return f"{_cache_epoch}-{_data_version}-{date.today().isoformat()}"
+
+
+def _base_rows_snapshot() -> tuple[str, list[tuple[int, str, str, str]]]:
+    global _slots_cache
+    key = _snapshot_key()
+    cached = _slots_cache
+    if cached is not None and cached[0] == key:
+        return cached
+    # A verziót a lekérdezés ELŐTT olvastuk: ha közben írás történik, a következő hívás újratölt
+    start, end = _get_month_range()
+    cached = (key, get_slot_rows_range(max(start, date.today()), end, holds=False))
+    _slots_cache = cached
+    return cached
+
+
+def get_slot_rows_snapshot(holds: bool = True) -> tuple[str, list[tuple[int, str, str, str]]]:
+    """(cache_kulcs, [(id, date, time, status), ...]) – a lista alapja, soronkénti dict nélkül.
+    Memóriából, amíg nincs új írás és nem vált a nap. A visszaadott listát nem szabad módosítani.
+    holds=True: a holddal tartott szabad slotok 'held' státuszúak; ilyenkor a kulcsban a holdok
+    halmazának lenyomata is benne van (hold-változásnál csak ez a réteg épül újra)."""
+    global _slots_view_cache
+    key, rows = _base_rows_snapshot()
+    held = get_held_slot_ids() if holds else frozenset()
+    if not held:
+        return key, rows
+    key += f"-h{zlib.crc32(','.join(map(str, sorted(held))).encode()):08x}"
+    cached = _slots_view_cache
+    if cached is None or cached[0] != key:
+        cached = (key, _overlay_holds(rows, held))
+        _slots_view_cache = cached
+    return cached
+
+
+def get_slots_snapshot(holds: bool = True) -> tuple[str, list[dict]]:
+    """(cache_kulcs, időpontok dict-ként) – a sor-pillanatképből verziónként egyszer épül.
+    A kulcs ETag-ként használható. A visszaadott listát nem szabad módosítani."""
+    global _slots_dicts_cache
+    key, rows = get_slot_rows_snapshot(holds)
+    cached = _slots_dicts_cache
+    if cached is None or cached[0] != key:
+        cached = (key, _rows_to_dicts(rows))
+        _slots_dicts_cache = cached
+    return cached
+
+
 def get_slots():
     """Visszaadja az időpontokat: mai napról, aktuális + következő hónap(ok) ablakában.
-    Ha booking_name nem üres, status = 'booked'."""
+    Cache-elt, csak olvasásra."""
+    return get_slots_snapshot()[1]
+
+
+def _rows_to_dicts(rows: list[tuple[int, str, str, str]]) -> list[dict]:
+    return [{"id": i, "date": d, "time": t, "status": st} for i, d, t, st in rows]
+
+
+SLOTS_RANGE_MAX_DAYS = 366
+
+
+@timed_db
+def get_slot_rows_range(start: date, end: date, holds: bool = True) -> list[tuple[int, str, str, str]]:
+    """Tetszőleges [start, end] napok időpontjai (id, date, time, status) tuple-ként: a szabályokból
+    számolt (virtuális) slotok összefésülve a slots tábla soraival (foglalás, letiltás). A szabályon
+    kívül eső, de foglalt vagy letiltott sorok is megjelennek (pl. utólag bezárt nap foglalása);
+    a szabad sorok nem. holds=True: az érvényes holddal tartott szabad slot státusza 'held'.
+    A kurzor sqlite3.Row helyett sima tuple-t ad (nincs soronkénti objektum)."""
     with get_connection() as conn:
-        _ensure_slots_exist(conn)
-        today = date.today().isoformat()
-        start, end = _get_month_range()
-        start_s, end_s = start.isoformat(), end.isoformat()
-        rows = conn.execute(
-            """
-            SELECT id, date, time,
-                   CASE WHEN COALESCE(booking_name, '') != '' THEN 'booked' ELSE status END AS status
-            FROM slots
-            WHERE date >= ? AND date BETWEEN ? AND ?
-            ORDER BY date, time
-            """,
-            (today, start_s, end_s),
+        sched = _load_schedule(conn)
+        cur = conn.cursor()
+        cur.row_factory = None
+        rows = cur.execute(
+            "SELECT date, time, id, status FROM slots WHERE date BETWEEN ? AND ?",
+            (start.isoformat(), end.isoformat()),
         ).fetchall()
-        return [dict(row) for row in rows]
+    stored = {(d, t): (slot_id, st) for d, t, slot_id, st in rows}
+    slot_key = schedule_engine.slot_key
+    out = []
+    for d, t in sched.slots(start, end):
+        hit = stored.pop((d, t), None)
+        if hit is None:
+            out.append((slot_key(d, t), d, t, "free"))
+        else:
+            out.append((hit[0], d, t, hit[1]))
+    extra = [(slot_id, d, t, st) for (d, t), (slot_id, st) in stored.items() if st != "free"]
+    if extra:
+        out.extend(extra)
+        out.sort(key=lambda r: (r[1], r[2]))
+    held = get_held_slot_ids() if holds else frozenset()
+    return _overlay_holds(out, held) if held else out
 
 
-def update_slot_status(slot_id: int, status: str) -> bool:
-    """Frissíti egy időpont státuszát (pl. 'free' → 'booked')."""
-    with get_connection() as conn:
-        cur = conn.execute("UPDATE slots SET status = ? WHERE id = ?", (status, slot_id))
-        return cur.rowcount > 0
+def get_slots_range(start: date, end: date) -> list[dict]:
+    """Mint get_slot_rows_range, dict-ként (id, date, time, status)."""
+    return _rows_to_dicts(get_slot_rows_range(start, end))
+
+
+# --- Nyitvatartási szabályok ---
+
+def _load_schedule(conn: sqlite3.Connection) -> Schedule:
+    rules = [
+        WeeklyRule(row[0], row[1], tuple(t for t in row[2].split(",") if t), row[3], row[4])
+        for row in conn.execute("SELECT id, weekday, times, valid_from, valid_to FROM schedule_rules")
+    ]
+    exceptions = [
+        ScheduleException(row[0], row[1], row[3], row[2], row[4] or "")
+        for row in conn.execute("SELECT id, date, time, kind, note FROM schedule_exceptions")
+    ]
+    return Schedule(rules, exceptions)
 
 
-def book_slot(slot_id: int, booking_name: str, phone: str = "", email: str = "") -> bool:
-    """Foglalás: booking_name, phone, email beírása, status → 'booked'."""
+@timed_db
+def get_schedule_config() -> dict:
+    """Heti szabályok és kivételek (admin felülethez)."""
     with get_connection() as conn:
-        try:
-            conn.execute("ALTER TABLE slots ADD COLUMN phone TEXT")
-        except sqlite3.OperationalError:
-            pass
-        try:
-            conn.execute("ALTER TABLE slots ADD COLUMN email TEXT")
-        except sqlite3.OperationalError:
-            pass
+        sched = _load_schedule(conn)
+    return {
+        "rules": [
+            {"id": r.id, "weekday": r.weekday, "times": list(r.times), "valid_from": r.valid_from, "valid_to": r.valid_to}
+            for r in sorted(sched.rules, key=lambda r: (r.weekday, r.valid_from or "", r.id))
+        ],
+        "exceptions": [
+            {"id": e.id, "date": e.date, "time": e.time, "kind": e.kind, "note": e.note}
+            for e in sorted(sched.exceptions, key=lambda e: (e.date, e.time or "", e.id))
+        ],
+    }
+
+
+@_bumps_version
+@timed_db
+def add_schedule_rule(weekday: int, times: list[str], valid_from: str | None = None, valid_to: str | None = None) -> int:
+    """Heti szabály felvétele; visszaadja az id-t."""
+    with write_transaction() as conn:
         cur = conn.execute(
-            """UPDATE slots SET booking_name = ?, phone = ?, email = ?, status = 'booked', reminder_sent = 0
-               WHERE id = ? AND status = 'free'""",
-            (booking_name, phone or "", email or "", slot_id),
+            "INSERT INTO schedule_rules (weekday, times, valid_from, valid_to) VALUES (?, ?, ?, ?)",
+            (weekday, ",".join(sorted(set(times))), valid_from, valid_to),
         )
-        return cur.rowcount > 0
+        rule_id = cur.lastrowid
+    _queue_changes(None)
+    return rule_id
+
+
+@_bumps_version
+@timed_db
+def delete_schedule_rule(rule_id: int) -> bool:
+    with write_transaction() as conn:
+        ok = conn.execute("DELETE FROM schedule_rules WHERE id = ?", (rule_id,)).rowcount > 0
+    if ok:
+        _queue_changes(None)
+    return ok
+
+
+@_bumps_version
+@timed_db
+def add_schedule_exception(exc_date: str, kind: str, exc_time: str | None = None, note: str = "") -> int:
+    """Kivétel felvétele: kind='closed' (egész nap, ha exc_time nincs megadva) vagy 'extra'.
+    A már meglévő foglalások megmaradnak – lásd booked_slots_on()."""
+    with write_transaction() as conn:
+        cur = conn.execute(
+            "INSERT INTO schedule_exceptions (date, time, kind, note) VALUES (?, ?, ?, ?)",
+            (exc_date, exc_time, kind, note or ""),
+        )
+        exc_id = cur.lastrowid
+    _queue_changes(None)
+    return exc_id
+
+
+@_bumps_version
+@timed_db
+def delete_schedule_exception(exc_id: int) -> bool:
+    with write_transaction() as conn:
+        ok = conn.execute("DELETE FROM schedule_exceptions WHERE id = ?", (exc_id,)).rowcount > 0
+    if ok:
+        _queue_changes(None)
+    return ok
+
+
+@timed_db
+def booked_slots_on(day: str, slot_time: str | None = None) -> list[dict]:
+    """Egy nap (vagy egy időpont) foglalásai – pl. bezárás előtt, ütközés jelzésére."""
+    sql = "SELECT id, date, time, booking_name, phone, email FROM slots WHERE status = 'booked' AND date = ?"
+    params: tuple = (day,)
+    if slot_time:
+        sql += " AND time = ?"
+        params = (day, slot_time)
+    with get_connection() as conn:
+        return [dict(row) for row in conn.execute(sql + " ORDER BY time", params)]
+
+
+def _virtual_slot(conn: sqlite3.Connection, slot_id: int) -> tuple[str, str] | None:
+    """(date, time), ha a slot_id egy még nem tárolt, a szabályok szerint létező, nem múltbeli
+    időpont. Ha arra az időpontra már van sor (más id-vel), None – azt a sor id-jével kell elérni."""
+    parsed = schedule_engine.parse_slot_key(slot_id)
+    if parsed is None or parsed[0] < date.today().isoformat():
+        return None
+    if conn.execute("SELECT 1 FROM slots WHERE date = ? AND time = ?", parsed).fetchone():
+        return None
+    return parsed if _load_schedule(conn).contains(*parsed) else None
+
+
+def _ensure_row(conn: sqlite3.Connection, slot_id: int) -> None:
+    """Virtuális slot első írásakor létrehozza a sort (id = YYYYMMDDHHMM). Meglévő sornál nem
+    csinál semmit; érvénytelen id-nél sem – ilyenkor az azt követő UPDATE nem talál sort."""
+    if conn.execute("SELECT 1 FROM slots WHERE id = ?", (slot_id,)).fetchone():
+        return
+    parsed = _virtual_slot(conn, slot_id)
+    if parsed is None:
+        return
+    conn.execute(
+        """INSERT OR IGNORE INTO slots (id, date, time, status, reminder_sent, starts_at)
+           VALUES (?1, ?2, ?3, 'free', 0, CAST(strftime('%s', ?2 || ' ' || ?3) AS INTEGER))""",
+        (slot_id, *parsed),
+    )
+
+
+@_bumps_version
+@timed_db
+def update_slot_status(slot_id: int, status: str) -> bool:
+    """Frissíti egy időpont státuszát (pl. 'free' → 'booked')."""
+    with write_transaction() as conn:
+        ok = _set_status(conn, slot_id, status)
+    if ok:
+        _queue_changes([(slot_id, status)])
+    return ok
+
+
+@_bumps_version
+@timed_db
+def book_slot(
+    slot_id: int,
+    booking_name: str,
+    phone: str = "",
+    email: str = "",
+    messenger_id: str | None = None,
+    holder: str | None = None,
+) -> bool:
+    """Foglalás: booking_name, phone, email beírása, status → 'booked'.
+    A visszaigazolás (e-mail, ill. messenger_id esetén Messenger) ugyanebben a tranzakcióban
+    kerül az outboxba. Más érvényes holdja alatt álló slotnál False; a holder saját holdja
+    a foglalással megszűnik."""
+    with write_transaction() as conn:
+        ok = _book(conn, slot_id, booking_name, phone, email, messenger_id, holder)
+    if ok:
+        if holder is not None:
+            _bump_holds_version()
+        _queue_changes([(slot_id, "booked")])
+    return ok
 
 
+@timed_db
 def get_slot(slot_id: int) -> dict | None:
-    """Egy adott időpont lekérése ID alapján."""
+    """Egy adott időpont lekérése ID alapján (virtuális, még nem tárolt slotra is)."""
     with get_connection() as conn:
         row = conn.execute(
             "SELECT id, date, time, status, booking_name, phone, email FROM slots WHERE id = ?",
             (slot_id,),
         ).fetchone()
         if not row:
-            return None
+            parsed = _virtual_slot(conn, slot_id)
+            if parsed is None:
+                return None
+            return {"id": slot_id, "date": parsed[0], "time": parsed[1], "status": "free",
+                    "booking_name": None, "phone": None, "email": None}
         d = dict(row)
         if d.get("booking_name"):
             d["status"] = "booked"
         return d
 
 
+BOOKED_SLOTS_SQL = """
+    SELECT id, date, time, status, booking_name, phone, email
+    FROM slots
+    WHERE status = 'booked'
+    ORDER BY date, time
+"""
+
+
+@timed_db
 def get_booked_slots():
-    """Csak a lefoglalt időpontok listája, dátum és idő szerint rendezve."""
+    """Csak a lefoglalt időpontok listája, dátum és idő szerint rendezve (idx_slots_status_date)."""
     with get_connection() as conn:
-        rows = conn.execute(
-            """
-            SELECT id, date, time, status, booking_name, phone, email
-            FROM slots
-            WHERE status = 'booked' OR COALESCE(booking_name, '') != ''
-            ORDER BY date, time
-            """
-        ).fetchall()
+        rows = conn.execute(BOOKED_SLOTS_SQL).fetchall()
         return [dict(row) for row in rows]
 
 
-def update_booking(slot_id: int, booking_name: str, phone: str = "", email: str = "") -> bool:
-    """Foglalás módosítása."""
+ADMIN_STATUSES = ("booked", "blocked", "free", "all")
+ADMIN_PAGE_MAX = 1000
+
+
+@timed_db
+def get_bookings_page(
+    date_from: str | None = None,
+    date_to: str | None = None,
+    status: str = "booked",
+    after: tuple[str, str, int] | None = None,
+    limit: int = 200,
+    include_archive: bool = False,
+) -> tuple[list[dict], tuple[str, str, int] | None]:
+    """Admin lista egy lapja (keyset lapozás): a (date, time, id) szerint az `after` utáni
+    legfeljebb `limit` sor. Visszaad: (sorok, következő lap kulcsa vagy None).
+    A lekérdezés ideje a lap méretétől függ, nem a tábla teljes méretétől.
+    include_archive=True: a slots_archive sorai is (mindkét táblából lapnyit olvas, majd összefésüli)."""
+    where, params = [], []
+    if status != "all":
+        where.append("status = ?")
+        params.append(status)
+    if date_from:
+        where.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append("date <= ?")
+        params.append(date_to)
+    if after:
+        where.append("(date, time, id) > (?, ?, ?)")
+        params.extend(after)
+    limit = max(1, min(limit, ADMIN_PAGE_MAX))
+    tail = (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY date, time, id LIMIT ?"
+    columns = "SELECT id, date, time, status, booking_name, phone, email FROM "
     with get_connection() as conn:
-        cur = conn.execute(
-            "UPDATE slots SET booking_name = ?, phone = ?, email = ? WHERE id = ? AND status = 'booked'",
-            (booking_name, phone or "", email or "", slot_id),
+        rows = conn.execute(columns + "slots" + tail, (*params, limit + 1)).fetchall()
+        if include_archive:
+            archived = conn.execute(columns + "slots_archive" + tail, (*params, limit + 1)).fetchall()
+            order = lambda row: (row["date"], row["time"], row["id"])  # noqa: E731
+            rows = list(heapq.merge(archived, rows, key=order))[:limit + 1]
+    items = [dict(row) for row in rows[:limit]]
+    if len(rows) <= limit:
+        return items, None
+    last = items[-1]
+    return items, (last["date"], last["time"], last["id"])
+
+
+SEARCH_PAGE_MAX = 100
+_PHONE_QUERY_RE = re.compile(r"[\d\s+()/.-]+")
+
+
+def _search_match(q: str) -> str | None:
+    """Keresőkifejezés → FTS5 MATCH. Csak számokból (és telefonszám-jelekből) álló keresés:
+    a számjegyek prefixként a telefon oszlopban, ugyanúgy normalizálva, mint indexeléskor.
+    Egyébként minden szó prefixként, ÉS kapcsolattal (ékezetek nélkül is talál).
+    None, ha nincs kereshető szó."""
+    q = (q or "").strip()
+    if _PHONE_QUERY_RE.fullmatch(q):
+        digits = phone_digits(q)
+        if len(digits) < 3:
+            return None
+        # A beírt részlet lehet „06 30 1…”, „+36 30 1…” vagy „30 1…” alakú
+        tokens = [digits] + [digits[2:] for p in ("36", "06") if digits.startswith(p) and len(digits) > 4]
+        return "phone : (" + " OR ".join(f'"{t}"*' for t in tokens) + ")"
+    # 1 betűs prefix szinte minden sort illesztene (és az index sem gyorsítja) – kihagyjuk
+    words = [w for w in re.findall(r"\w+", q) if len(w) >= 2]
+    if not words:
+        return None
+    return " ".join(f'"{w}"*' for w in words[:8])
+
+
+# A slot id-k (YYYYMMDDHHMM) 12 jegyűek, így az id sorrendje az időpont sorrendje; az id-migráció
+# előtti (AUTOINCREMENT) id-k ennél kisebbek, és az időponttól függetlenek
+SLOT_KEY_MIN = 10 ** 11
+
+_SEARCH_COLUMNS = {
+    True: """h.id,
+        COALESCE(s.date, a.date) AS date, COALESCE(s.time, a.time) AS time,
+        COALESCE(s.status, a.status) AS status, COALESCE(s.booking_name, a.booking_name) AS booking_name,
+        COALESCE(s.phone, a.phone) AS phone, COALESCE(s.email, a.email) AS email,
+        s.id IS NULL AS archived""",
+    False: "h.id, s.date, s.time, s.status, s.booking_name, s.phone, s.email, 0 AS archived",
+}
+_SEARCH_JOINS = {
+    True: "LEFT JOIN slots s ON s.id = h.id LEFT JOIN slots_archive a ON a.id = h.id",
+    False: "JOIN slots s ON s.id = h.id",
+}
+
+
+@timed_db
+def search_bookings(
+    q: str,
+    limit: int = 20,
+    before: tuple[str, str, int] | None = None,
+    include_archive: bool = True,
+) -> tuple[list[dict], tuple[str, str, int] | None]:
+    """Foglalások keresése név, e-mail vagy telefonszám(részlet) alapján a bookings_fts indexen.
+    Sorrend: időpont szerint csökkenő (date, time, id), a legújabb elöl; relevancia-rangsor nincs
+    (a bm25-höz minden találatot pontozni kellene, gyakori névnél 1M foglalásban ~0,2–1 mp).
+    A slot id-jű foglalásokat az FTS5 rowid szerint csökkenően járja be és egy lap után megáll;
+    a régi id-jűeket (< SLOT_KEY_MIN) külön, időpont szerint rendezi, és a kettőt összefésüli.
+    before: az előző lap utolsó sorának (date, time, id) kulcsa (keyset lapozás).
+    Visszaad: (sorok, következő lap kulcsa vagy None); a sorokban archived = 1 az archív foglalás."""
+    match = _search_match(q)
+    if match is None:
+        return [], None
+    limit = max(1, min(limit, SEARCH_PAGE_MAX))
+    columns, joins = _SEARCH_COLUMNS[include_archive], _SEARCH_JOINS[include_archive]
+    # Slot id-nél (date, time, id) < before  ⇔  id < slot_key(date, time) a before-ból
+    upper = schedule_engine.slot_key(*before[:2]) if before is not None else 2 ** 62
+    # Élő táblánál az archivált találatok kiesnek a JOIN-nál: ott a LIMIT a JOIN után jön
+    if include_archive:
+        keyed_sql = f"""
+            SELECT {columns}
+            FROM (SELECT rowid AS id FROM bookings_fts
+                  WHERE bookings_fts MATCH ? AND rowid >= ? AND rowid < ? ORDER BY rowid DESC LIMIT ?) h
+            {joins} ORDER BY h.id DESC
+        """
+    else:
+        keyed_sql = f"""
+            SELECT {columns}
+            FROM (SELECT rowid AS id FROM bookings_fts WHERE bookings_fts MATCH ? AND rowid >= ? AND rowid < ?) h
+            {joins} ORDER BY h.id DESC LIMIT ?
+        """
+    legacy_sql = f"""
+        SELECT * FROM (
+            SELECT {columns}
+            FROM (SELECT rowid AS id FROM bookings_fts WHERE bookings_fts MATCH ? AND rowid < ?) h {joins}
         )
-        return cur.rowcount > 0
+        {"WHERE (date, time, id) < (?, ?, ?)" if before is not None else ""}
+        ORDER BY date DESC, time DESC, id DESC LIMIT ?
+    """
+    with get_connection() as conn:
+        try:
+            keyed = conn.execute(keyed_sql, (match, SLOT_KEY_MIN, upper, limit + 1)).fetchall()
+            legacy = conn.execute(legacy_sql, (match, SLOT_KEY_MIN, *(before or ()), limit + 1)).fetchall()
+        except sqlite3.OperationalError as e:
+            # Az FTS5 szintaxishibát jelez pl. egy fenntartott szóra – üres találat, nem 500-as
+            print(f"[DB] Keresési hiba ({q!r}): {e}")
+            return [], None
+    order = lambda row: (row["date"], row["time"], row["id"])  # noqa: E731
+    rows = list(heapq.merge(keyed, legacy, key=order, reverse=True))[:limit + 1]
+    items = [dict(row) for row in rows[:limit]]
+    if len(rows) <= limit:
+        return items, None
+    last = items[-1]
+    return items, (last["date"], last["time"], last["id"])
+
+
+@_notifies_changes
+@timed_db
+def update_booking(slot_id: int, booking_name: str, phone: str = "", email: str = "") -> bool:
+    """Foglalás módosítása. A státusz nem változik, így verzióemelés nincs; a változás-értesítés
+    viszont kimegy (pl. új e-mail címnél az emlékeztető-ütemező ebből veszi fel a foglalást)."""
+    with write_transaction() as conn:
+        ok = _update_booking(conn, slot_id, booking_name, phone, email)
+    if ok:
+        _queue_changes([(slot_id, "booked")])
+    return ok
+
+
+REMINDER_SQL = """
+    SELECT id, starts_at, booked_at
+    FROM slots
+    WHERE reminder_sent = 0
+      AND starts_at BETWEEN ? AND ?
+      AND status = 'booked'
+      AND email IS NOT NULL AND email != ''
+    ORDER BY starts_at
+"""
 
 
-def get_bookings_needing_reminder() -> list[dict]:
-    """Lefoglalt időpontok, amelyek ~1 óra múlva kezdődnek és még nem kaptak emlékeztetőt."""
+def _local_epoch(dt: datetime) -> int:
+    """Naiv helyi idő → epoch másodperc, ugyanúgy, ahogy a starts_at oszlop tárolja."""
+    return calendar.timegm(dt.timetuple())
+
+
+def local_now() -> float:
+    """A jelen a starts_at időskáláján (tört másodperccel)."""
+    now = datetime.now()
+    return _local_epoch(now) + now.microsecond / 1e6
+
+
+@timed_db
+def get_pending_reminders(slot_ids: list[int] | None = None) -> list[tuple[int, int, int | None]]:
+    """(slot_id, starts_at, booked_at) a még el nem kezdődött, e-mail címmel foglalt és
+    emlékeztetőt még nem kapott időpontokra (az emlékeztető-ütemező ebből tölti fel a kupacát).
+    slot_ids: csak ezek közül (foglalás utáni növekményes frissítéshez).
+    Tartomány-lekérdezés az idx_slots_reminder indexen."""
+    now = int(local_now())
     with get_connection() as conn:
-        now = datetime.now()
-        # 50–70 perc múlva kezdődő időpontok (ablak a cron hibák elkerülésére)
-        margin_start = now + timedelta(minutes=50)
-        margin_end = now + timedelta(minutes=70)
+        if slot_ids is None:
+            rows = conn.execute(REMINDER_SQL, (now, 2 ** 62)).fetchall()
+        elif not slot_ids:
+            return []
+        else:
+            rows = conn.execute(
+                f"""SELECT id, starts_at, booked_at FROM slots
+                    WHERE id IN ({",".join("?" * len(slot_ids))}) AND reminder_sent = 0 AND starts_at > ?
+                      AND status = 'booked' AND email IS NOT NULL AND email != ''""",
+                (*slot_ids, now),
+            ).fetchall()
+    return [(row["id"], row["starts_at"], row["booked_at"]) for row in rows]
+
+
+@timed_db
+def enqueue_reminders(slot_ids: list[int]) -> int:
+    """A megadott foglalások emlékeztetőit az outboxba teszi, és ugyanabban a tranzakcióban
+    reminder_sent = 1-re állítja őket (a jelző jelentése: „sorba állítva”; a kézbesítés
+    állapota az outboxban van). A közben lemondott, áthelyezett, már elkezdődött vagy már
+    sorba állított foglalásokat kihagyja. Visszaadja a sorba állított emlékeztetők számát."""
+    if not slot_ids:
+        return 0
+    marks = ",".join("?" * len(slot_ids))
+    with write_transaction() as conn:
         rows = conn.execute(
-            """
-            SELECT id, date, time, booking_name, email
-            FROM slots
-            WHERE (status = 'booked' OR COALESCE(booking_name, '') != '')
-              AND COALESCE(reminder_sent, 0) = 0
-              AND email IS NOT NULL AND email != ''
-            """
+            f"""SELECT id, date, time, booking_name, phone, email FROM slots
+                WHERE id IN ({marks}) AND status = 'booked' AND reminder_sent = 0
+                  AND email IS NOT NULL AND email != '' AND starts_at > ?""",
+            (*slot_ids, int(local_now())),
         ).fetchall()
-        result = []
         for row in rows:
-            d = dict(row)
-            try:
-                dt = datetime.strptime(f"{d['date']} {d['time']}", "%Y-%m-%d %H:%M")
-                if margin_start <= dt <= margin_end:
-                    result.append(d)
-            except (ValueError, TypeError):
-                pass
-        return result
+            _enqueue_notifications(conn, "reminder", dict(row))
+        conn.executemany("UPDATE slots SET reminder_sent = 1 WHERE id = ?", [(row["id"],) for row in rows])
+    return len(rows)
 
 
-def mark_reminder_sent(slot_id: int) -> bool:
-    """Emlékeztető kiküldve jelölés."""
-    with get_connection() as conn:
-        cur = conn.execute(
-            "UPDATE slots SET reminder_sent = 1 WHERE id = ?",
-            (slot_id,),
-        )
-        return cur.rowcount > 0
-
-
-def cancel_booking(slot_id: int) -> bool:
-    """Foglalás törlése: status='free', adatok törlése."""
-    with get_connection() as conn:
-        cur = conn.execute(
-            "UPDATE slots SET status = 'free', booking_name = NULL, phone = NULL, email = NULL WHERE id = ?",
-            (slot_id,),
-        )
-        return cur.rowcount > 0
+@_bumps_version
+@timed_db
+def cancel_booking(slot_id: int, messenger_id: str | None = None) -> bool:
+    """Foglalás törlése: status='free', adatok törlése. Az értesítés az outboxba kerül,
+    a függő emlékeztető törlődik."""
+    with write_transaction() as conn:
+        ok = _cancel(conn, slot_id, messenger_id)
+    if ok:
+        _queue_changes([(slot_id, "free")])
+    return ok
 
 
+@_bumps_version
+@timed_db
 def move_booking(
     old_slot_id: int,
     new_slot_id: int,
@@ -261,18 +1294,529 @@ def move_booking(
     phone: str = "",
     email: str = "",
 ) -> bool:
-    """Foglalás áthelyezése egyik időpontból a másikba."""
+    """Foglalás áthelyezése egyik időpontból a másikba – egyetlen írási tranzakcióban:
+    vagy mindkét slot változik, vagy egyik sem."""
     if old_slot_id == new_slot_id:
         return update_booking(old_slot_id, booking_name, phone, email)
-    with get_connection() as conn:
-        cur = conn.execute(
-            "UPDATE slots SET booking_name = ?, phone = ?, email = ?, status = 'booked' WHERE id = ? AND status = 'free'",
-            (booking_name or "", phone or "", email or "", new_slot_id),
+    with write_transaction() as conn:
+        ok = _move(conn, old_slot_id, new_slot_id, booking_name, phone, email)
+    if ok:
+        _queue_changes([(old_slot_id, "free"), (new_slot_id, "booked")])
+    return ok
+
+
+# --- Ideiglenes foglalás (hold) ---
+# A Messenger beszélgetésben a slot kiválasztásakor jön létre, a foglalással (book_slot holder=...)
+# szűnik meg. Amíg érvényes, a listában 'held' státuszú, más nem foglalhatja le és nem tarthatja.
+# Az adatverziót nem emelik (lásd _bumps_holds_version). A lejártakat nem kell azonnal törölni
+# (minden ellenőrzés a lejáratot is nézi): a 'free' változás a get_held_slot_ids-ből megy ki,
+# a sorokat a napi karbantartás törli (sweep_expired_holds).
+
+def _hold_holder(conn: sqlite3.Connection, slot_id: int, now: float) -> str | None:
+    """Az érvényes hold tulajdonosa (None, ha nincs)."""
+    row = conn.execute(
+        "SELECT holder FROM slot_holds WHERE slot_id = ? AND expires_at > ?", (slot_id, now),
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _held_by_other(conn: sqlite3.Connection, slot_id: int, holder: str | None, operation: str) -> bool:
+    other = _hold_holder(conn, slot_id, time.time())
+    if other is None or other == holder:
+        return False
+    SLOT_HOLD_CONFLICTS.inc(operation=operation)
+    return True
+
+
+def _slot_status(conn: sqlite3.Connection, slot_id: int) -> str:
+    """A tárolt státusz; sor nélküli (virtuális) slotnál 'free'."""
+    row = conn.execute("SELECT status FROM slots WHERE id = ?", (slot_id,)).fetchone()
+    return row[0] if row else "free"
+
+
+def _is_free(conn: sqlite3.Connection, slot_id: int) -> bool:
+    """Foglalható-e: a tárolt sor szabad ÉS a nyitvatartás szerint még létezik (a lemondás után
+    bezárt nap / időpont szabad sora nem foglalható), ill. érvényes virtuális slot."""
+    row = conn.execute("SELECT status, date, time FROM slots WHERE id = ?", (slot_id,)).fetchone()
+    if row:
+        return row[0] == "free" and _load_schedule(conn).contains(row[1], row[2])
+    return _virtual_slot(conn, slot_id) is not None
+
+
+@_bumps_holds_version
+@timed_db
+def hold_slot(slot_id: int, holder: str, ttl: float | None = None) -> bool:
+    """Ideiglenes foglalás ttl mp-re (alap: SLOT_HOLD_SECONDS). Ugyanazon holder újabb hívása
+    meghosszabbítja; a holder korábbi holdja egy másik sloton felszabadul (egyszerre egy).
+    False, ha a slot nem szabad, vagy másnak van rá érvényes holdja."""
+    now = time.time()
+    expires_at = now + (SLOT_HOLD_SECONDS if ttl is None else ttl)
+    with write_transaction() as conn:
+        row = conn.execute("SELECT holder, expires_at FROM slot_holds WHERE slot_id = ?", (slot_id,)).fetchone()
+        if row is not None and row[0] != holder and row[1] > now:
+            SLOT_HOLD_CONFLICTS.inc(operation="hold")
+            return False
+        if not _is_free(conn, slot_id):
+            SLOT_HOLDS.inc(result="unavailable")
+            return False
+        released = [
+            r[0] for r in conn.execute(
+                "SELECT slot_id FROM slot_holds WHERE holder = ? AND slot_id != ?", (holder, slot_id),
+            )
+        ]
+        if released:
+            conn.execute("DELETE FROM slot_holds WHERE holder = ? AND slot_id != ?", (holder, slot_id))
+        conn.execute(
+            """INSERT INTO slot_holds (slot_id, holder, expires_at, created_at) VALUES (?, ?, ?, ?)
+               ON CONFLICT(slot_id) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at,
+                   created_at = excluded.created_at""",
+            (slot_id, holder, expires_at, now),
         )
+        _touch_holds(conn)
+        changes = [(i, _slot_status(conn, i)) for i in released] + [(slot_id, "held")]
+    if row is not None and row[0] != holder:
+        SLOT_HOLDS.inc(result="expired")
+    SLOT_HOLDS.inc(result="extended" if row is not None and row[0] == holder else "created")
+    if released:
+        SLOT_HOLDS.inc(len(released), result="released")
+    _queue_changes(changes)
+    return True
+
+
+@_bumps_holds_version
+@timed_db
+def release_hold(slot_id: int, holder: str | None = None) -> bool:
+    """Hold feloldása (pl. a felhasználó másik napot választ). holder megadásakor csak a sajátját."""
+    with write_transaction() as conn:
+        if holder is None:
+            cur = conn.execute("DELETE FROM slot_holds WHERE slot_id = ?", (slot_id,))
+        else:
+            cur = conn.execute("DELETE FROM slot_holds WHERE slot_id = ? AND holder = ?", (slot_id, holder))
         if cur.rowcount == 0:
             return False
-        conn.execute(
-            "UPDATE slots SET status = 'free', booking_name = NULL, phone = NULL, email = NULL WHERE id = ?",
-            (old_slot_id,),
+        _touch_holds(conn)
+        status = _slot_status(conn, slot_id)
+    SLOT_HOLDS.inc(result="released")
+    _queue_changes([(slot_id, status)])
+    return True
+
+
+@timed_db
+def sweep_expired_holds() -> int:
+    """Lejárt holdok sorainak törlése (napi karbantartás); visszaadja a számukat. A listát nem
+    érinti: a lejárt hold már addig sem számít, a 'free' változás a get_held_slot_ids-ből ment ki."""
+    with write_transaction() as conn:
+        removed = conn.execute("DELETE FROM slot_holds WHERE expires_at <= ?", (time.time(),)).rowcount
+    if removed:
+        SLOT_HOLDS.inc(removed, result="expired")
+    return removed
+
+
+@timed_db
+def count_active_holds() -> int:
+    with get_connection() as conn:
+        return conn.execute("SELECT count(*) FROM slot_holds WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+
+# --- Írási lépések egy már megnyitott tranzakción belül (egyedi és kötegelt műveletekhez) ---
+
+def _set_status(conn: sqlite3.Connection, slot_id: int, status: str) -> bool:
+    _ensure_row(conn, slot_id)
+    cur = conn.execute("UPDATE slots SET status = ? WHERE id = ?", (status, slot_id))
+    return cur.rowcount > 0
+
+
+def _book(
+    conn: sqlite3.Connection,
+    slot_id: int,
+    booking_name: str,
+    phone: str = "",
+    email: str = "",
+    messenger_id: str | None = None,
+    holder: str | None = None,
+) -> bool:
+    if _held_by_other(conn, slot_id, holder, "book") or not _is_free(conn, slot_id):
+        return False
+    _ensure_row(conn, slot_id)
+    cur = conn.execute(
+        """UPDATE slots SET booking_name = ?, phone = ?, email = ?, status = 'booked', reminder_sent = 0,
+                  booked_at = ?
+           WHERE id = ? AND status = 'free'""",
+        (booking_name, phone or "", email or "", int(local_now()), slot_id),
+    )
+    if cur.rowcount == 0:
+        return False
+    if holder is not None and conn.execute(
+        "DELETE FROM slot_holds WHERE slot_id = ? AND holder = ?", (slot_id, holder),
+    ).rowcount:
+        _touch_holds(conn)
+        SLOT_HOLDS.inc(result="converted")
+    _enqueue_notifications(conn, "booked", _booking_row(conn, slot_id), messenger_id)
+    return True
+
+
+def _update_booking(conn: sqlite3.Connection, slot_id: int, booking_name: str, phone: str = "", email: str = "") -> bool:
+    cur = conn.execute(
+        "UPDATE slots SET booking_name = ?, phone = ?, email = ? WHERE id = ? AND status = 'booked'",
+        (booking_name, phone or "", email or "", slot_id),
+    )
+    return cur.rowcount > 0
+
+
+def _cancel(conn: sqlite3.Connection, slot_id: int, messenger_id: str | None = None, notify: bool = True) -> bool:
+    """notify=False: áthelyezés része, ott a „moved” értesítés megy ki helyette."""
+    old = _booking_row(conn, slot_id)
+    if old is None:
+        return False
+    conn.execute(
+        "UPDATE slots SET status = 'free', booking_name = NULL, phone = NULL, email = NULL WHERE id = ?",
+        (slot_id,),
+    )
+    if old["status"] == "booked":
+        _cancel_pending_notifications(conn, slot_id)
+        if notify:
+            _enqueue_notifications(conn, "cancelled", old, messenger_id)
+    return True
+
+
+def _move(
+    conn: sqlite3.Connection,
+    old_slot_id: int,
+    new_slot_id: int,
+    booking_name: str | None = None,
+    phone: str | None = None,
+    email: str | None = None,
+) -> bool:
+    """Áthelyezés; a meg nem adott (None) adatokat a régi foglalásból veszi át."""
+    old = conn.execute(
+        "SELECT booking_name, phone, email FROM slots WHERE id = ? AND status = 'booked'",
+        (old_slot_id,),
+    ).fetchone()
+    if not old:
+        return False
+    if old_slot_id == new_slot_id:
+        return True
+    if _held_by_other(conn, new_slot_id, None, "move") or not _is_free(conn, new_slot_id):
+        return False
+    _ensure_row(conn, new_slot_id)
+    cur = conn.execute(
+        """UPDATE slots SET booking_name = ?, phone = ?, email = ?, status = 'booked', reminder_sent = 0,
+                  booked_at = ?
+           WHERE id = ? AND status = 'free'""",
+        (
+            booking_name if booking_name is not None else old["booking_name"] or "",
+            phone if phone is not None else old["phone"] or "",
+            email if email is not None else old["email"] or "",
+            int(local_now()),
+            new_slot_id,
+        ),
+    )
+    if cur.rowcount == 0:
+        return False
+    old_at = _booking_row(conn, old_slot_id)
+    _cancel(conn, old_slot_id, notify=False)
+    _enqueue_notifications(
+        conn, "moved", {**_booking_row(conn, new_slot_id), "old_date": old_at["date"], "old_time": old_at["time"]},
+    )
+    return True
+
+
+def _booking_row(conn: sqlite3.Connection, slot_id: int) -> dict | None:
+    row = conn.execute(
+        "SELECT id, date, time, status, booking_name, phone, email FROM slots WHERE id = ?",
+        (slot_id,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+# --- Értesítési outbox ---
+# A feladatokat a slot írással egy tranzakcióban rögzítjük; a kiküldést a notifier.py
+# munkaszálai végzik (felvétel bérlettel, újrapróbálás visszalépéssel), így a kérés
+# késleltetése nem függ az SMTP / Send API-tól, és összeomlás után sem vész el értesítés.
+
+def _enqueue_notifications(conn: sqlite3.Connection, kind: str, booking: dict, messenger_id: str | None = None) -> int:
+    """kind: booked | cancelled | moved | reminder. booking: a slot sor (áthelyezésnél old_date/old_time is)."""
+    payload = {
+        "slot_id": booking["id"],
+        "date": booking["date"],
+        "time": booking["time"],
+        "name": booking.get("booking_name") or "",
+        "phone": booking.get("phone") or "",
+        "email": (booking.get("email") or "").strip(),
+    }
+    if "old_date" in booking:
+        payload["old_date"], payload["old_time"] = booking["old_date"], booking["old_time"]
+    jobs = []
+    if payload["email"] and kind in OUTBOX_EMAIL_KINDS:
+        jobs.append(("email", payload["email"]))
+    if messenger_id:
+        jobs.append(("messenger", messenger_id))
+    now = time.time()
+    body = json.dumps(payload, ensure_ascii=False)
+    conn.executemany(
+        """INSERT INTO outbox (channel, kind, recipient, slot_id, payload, available_at, created_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [(channel, kind, recipient, booking["id"], body, now, now) for channel, recipient in jobs],
+    )
+    return len(jobs)
+
+
+def _cancel_pending_notifications(conn: sqlite3.Connection, slot_id: int) -> None:
+    """Lemondott / áthelyezett foglalás még ki nem ment emlékeztetője már nem aktuális."""
+    conn.execute(
+        """UPDATE outbox SET status = 'cancelled', finished_at = ?
+           WHERE slot_id = ? AND status = 'pending' AND kind = 'reminder'""",
+        (time.time(), slot_id),
+    )
+
+
+@timed_db
+def claim_outbox_jobs(limit: int, lease_seconds: float) -> list[dict]:
+    """Legfeljebb `limit` esedékes feladat felvétele: status → 'sending', attempts + 1, és
+    available_at = most + lease_seconds. Ha a felvevő a bérlet alatt nem jelent vissza
+    (összeomlás, leállítás), a feladat a bérlet lejárta után újra felvehető."""
+    now = time.time()
+    with write_transaction() as conn:
+        rows = conn.execute(
+            """SELECT id, channel, kind, recipient, slot_id, payload, attempts, sent_parts FROM outbox
+               WHERE status IN ('pending', 'sending') AND available_at <= ?
+               ORDER BY available_at, id LIMIT ?""",
+            (now, limit),
+        ).fetchall()
+        if not rows:
+            return []
+        conn.executemany(
+            "UPDATE outbox SET status = 'sending', attempts = attempts + 1, available_at = ? WHERE id = ?",
+            [(now + lease_seconds, row["id"]) for row in rows],
         )
+    return [{**dict(row), "payload": json.loads(row["payload"]), "attempts": row["attempts"] + 1} for row in rows]
+
+
+@timed_db
+def finish_outbox_jobs(results: list[tuple[int, str | None, float | None, int]]) -> None:
+    """Kiküldési eredmények rögzítése egy tranzakcióban: (job_id, hiba, újrapróbálás ideje,
+    kézbesített részek bitmaszkja). hiba = None → 'sent'; hiba + időpont → vissza 'pending'-be
+    addig (a kézbesített részeket az újrapróbálás kihagyja); hiba, időpont nélkül → 'failed'."""
+    if not results:
+        return
+    now = time.time()
+    with write_transaction() as conn:
+        for job_id, error, retry_at, sent_parts in results:
+            if error is None:
+                conn.execute(
+                    "UPDATE outbox SET status = 'sent', last_error = NULL, finished_at = ?, sent_parts = ? WHERE id = ?",
+                    (now, sent_parts, job_id),
+                )
+            elif retry_at is not None:
+                conn.execute(
+                    """UPDATE outbox SET status = 'pending', last_error = ?, available_at = ?, sent_parts = ?
+                       WHERE id = ? AND status = 'sending'""",
+                    (error, retry_at, sent_parts, job_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE outbox SET status = 'failed', last_error = ?, finished_at = ?, sent_parts = ? WHERE id = ?",
+                    (error, now, sent_parts, job_id),
+                )
+
+
+@timed_db
+def get_outbox_stats() -> dict[str, int]:
+    """Feladatok száma állapot szerint (pending, sending, sent, failed, cancelled)."""
+    with get_connection() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+    return {status: n for status, n in rows}
+
+
+@timed_db
+def purge_outbox(retention_days: int | None = None) -> int:
+    """A lezárt (sent, failed, cancelled) feladatok törlése retention_days nap után."""
+    days = OUTBOX_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = time.time() - max(0, days) * 86400
+    with write_transaction() as conn:
+        return conn.execute(
+            "DELETE FROM outbox WHERE status IN ('sent', 'failed', 'cancelled') AND finished_at < ?",
+            (cutoff,),
+        ).rowcount
+
+
+# --- Kötegelt admin műveletek ---
+
+BATCH_OPERATIONS = ("cancel", "move", "update", "block", "unblock")
+
+
+class _BatchAbort(Exception):
+    """Belső: „mindent vagy semmit” módban a teljes tranzakció visszagörgetéséhez."""
+
+
+def _apply_operation(conn: sqlite3.Connection, op: dict) -> tuple[bool, str | None]:
+    kind = op.get("op")
+    slot_id = op.get("slot_id")
+    if kind == "cancel":
+        return _cancel(conn, slot_id), "nincs ilyen időpont"
+    if kind == "move":
+        if op.get("new_slot_id") is None:
+            return False, "hiányzó new_slot_id"
+        ok = _move(conn, slot_id, op["new_slot_id"], op.get("booking_name"), op.get("phone"), op.get("email"))
+        return ok, "a régi időpont nem foglalt vagy az új nem szabad"
+    if kind == "update":
+        ok = _update_booking(conn, slot_id, op.get("booking_name") or "", op.get("phone") or "", op.get("email") or "")
+        return ok, "az időpont nem foglalt"
+    if kind == "block":
+        _ensure_row(conn, slot_id)
+        cur = conn.execute("UPDATE slots SET status = 'blocked' WHERE id = ? AND status = 'free'", (slot_id,))
+        return cur.rowcount > 0, "az időpont nem szabad"
+    if kind == "unblock":
+        cur = conn.execute("UPDATE slots SET status = 'free' WHERE id = ? AND status = 'blocked'", (slot_id,))
+        return cur.rowcount > 0, "az időpont nincs letiltva"
+    return False, f"ismeretlen művelet: {kind!r}"
+
+
+def _operation_changes(op: dict) -> list[tuple[int, str]]:
+    """Egy sikeres kötegelt művelet slot-változásai. Az update nem változtat státuszt, de az
+    értesítés kell (pl. az emlékeztető-ütemezőnek az új e-mail cím miatt)."""
+    kind, slot_id = op.get("op"), op.get("slot_id")
+    if kind == "move":
+        return [(slot_id, "free"), (op["new_slot_id"], "booked")] if slot_id != op["new_slot_id"] else []
+    return {
+        "cancel": [(slot_id, "free")], "update": [(slot_id, "booked")],
+        "block": [(slot_id, "blocked")], "unblock": [(slot_id, "free")],
+    }.get(kind, [])
+
+
+@timed_db
+def apply_batch(operations: list[dict], atomic: bool = True) -> dict:
+    """Admin műveletek (cancel, move, update, block, unblock) egyetlen írási tranzakcióban.
+    atomic=True: bármely hibánál semmi sem változik. atomic=False: minden művelet saját
+    SAVEPOINT-ban fut, a sikertelenek nem érintik a többit. A végén egyetlen verzióemelés.
+    Visszaad: {"ok", "applied", "results": [{index, op, slot_id, ok, error}, ...]}."""
+    results = [
+        {"index": i, "op": op.get("op"), "slot_id": op.get("slot_id"), "ok": False, "error": None}
+        for i, op in enumerate(operations)
+    ]
+    applied = 0
+    changes: list[tuple[int, str]] = []
+    try:
+        with write_transaction() as conn:
+            for i, op in enumerate(operations):
+                conn.execute("SAVEPOINT batch_op")
+                try:
+                    ok, error = _apply_operation(conn, op)
+                except sqlite3.DatabaseError as e:
+                    ok, error = False, str(e)
+                if ok:
+                    conn.execute("RELEASE batch_op")
+                    results[i]["ok"] = True
+                    applied += 1
+                    changes.extend(_operation_changes(op))
+                    continue
+                conn.execute("ROLLBACK TO batch_op")
+                conn.execute("RELEASE batch_op")
+                results[i]["error"] = error
+                if atomic:
+                    raise _BatchAbort()
+    except _BatchAbort:
+        for r in results:
+            if r["ok"]:
+                r["ok"] = False
+                r["error"] = "visszagörgetve"
+            elif r["error"] is None:
+                r["error"] = "kihagyva"
+        applied = 0
+    if applied:
+        bump_data_version()
+        if changes:
+            _notify_changes(changes)
+    return {"ok": applied == len(operations), "applied": applied, "results": results}
+
+
+# --- Archiválás és karbantartás ---
+
+def _ensure_incremental_vacuum() -> bool:
+    """auto_vacuum=INCREMENTAL bekapcsolása. Meglévő adatbázisnál ez egyszeri teljes VACUUM-mal
+    jár (a beállítás csak így lép életbe); utána elég az olcsó incremental_vacuum.
+    Visszaad: True, ha most történt az átállás."""
+    with get_connection() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
         return True
+
+
+@timed_db
+def archive_past_slots(retention_days: int | None = None) -> dict:
+    """A retention_days napnál régebbi slotokat kiveszi a slots táblából: a foglaltak a
+    slots_archive táblába kerülnek (ugyanazzal az id-vel), a szabad és letiltott slotok törlődnek.
+    Kötegenként (ARCHIVE_BATCH_SIZE) külön tranzakció, így a többi író nem vár sokáig.
+    Végül incremental_vacuum-mal visszaadja a felszabadult lapokat (legfeljebb DB_VACUUM_PAGES).
+    Az élő lista (mától) nem változik, ezért nincs verzióemelés."""
+    days = SLOTS_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = (date.today() - timedelta(days=max(0, days))).isoformat()
+    archived = deleted = 0
+    while True:
+        with write_transaction() as conn:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM slots WHERE date < ? ORDER BY date, time LIMIT ?",
+                (cutoff, ARCHIVE_BATCH_SIZE),
+            )]
+            if not ids:
+                break
+            marks = ",".join("?" * len(ids))
+            cur = conn.execute(
+                f"""INSERT OR REPLACE INTO slots_archive
+                        (id, date, time, status, booking_name, phone, email, reminder_sent, starts_at, archived_at)
+                    SELECT id, date, time, status, booking_name, phone, email, COALESCE(reminder_sent, 0), starts_at, ?
+                    FROM slots WHERE id IN ({marks}) AND status = 'booked'""",
+                (time.time(), *ids),
+            )
+            archived += cur.rowcount
+            conn.execute(f"DELETE FROM slots WHERE id IN ({marks})", ids)
+            deleted += len(ids)
+        if len(ids) < ARCHIVE_BATCH_SIZE:
+            break
+    converted = _ensure_incremental_vacuum()
+    freed = 0
+    if not converted:
+        with get_connection() as conn:
+            before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            # execute() csak egy lépést futtat (= egy lap); executescript végigviszi
+            conn.executescript(f"PRAGMA incremental_vacuum({max(0, DB_VACUUM_PAGES)});")
+            freed = before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"archived": archived, "removed": deleted - archived, "freed_pages": freed, "cutoff": cutoff}
+
+
+# --- Messenger beszélgetés-állapot ---
+
+@timed_db
+def get_session(sender_id: str, min_updated_at: float) -> str | None:
+    """A tárolt állapot (JSON), ha min_updated_at óta frissült; különben None."""
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT state FROM sessions WHERE sender_id = ? AND updated_at >= ?",
+            (sender_id, min_updated_at),
+        ).fetchone()
+        return row[0] if row else None
+
+
+@timed_db
+def save_session(sender_id: str, state: str, updated_at: float) -> None:
+    with get_connection() as conn:
+        conn.execute(
+            """INSERT INTO sessions (sender_id, state, updated_at) VALUES (?, ?, ?)
+               ON CONFLICT(sender_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at""",
+            (sender_id, state, updated_at),
+        )
+
+
+@timed_db
+def delete_session(sender_id: str) -> None:
+    with get_connection() as conn:
+        conn.execute("DELETE FROM sessions WHERE sender_id = ?", (sender_id,))
+
+
+@timed_db
+def purge_sessions(older_than: float) -> int:
+    """Lejárt állapotok törlése. Visszaadja a törölt sorok számát."""
+    with get_connection() as conn:
+        return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (older_than,)).rowcount
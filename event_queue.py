@@ -0,0 +1,115 @@
+"""
+Belső eseménysor a Messenger webhookhoz.
+A webhook csak sorba állítja az eseményeket és azonnal 200-at ad; a feldolgozást
+N munkatask végzi egy saját szálkészleten (a kezelők blokkoló SQLite hívásokat tartalmaznak).
+- Sorrend: ugyanazon kulcs (sender_id) eseményei mindig ugyanahhoz a workerhez kerülnek.
+- Duplikátum szűrés: a már látott üzenet-azonosítók (mid) korlátos LRU halmazban.
+- Metrikák: sor mélység, várakozási idő (lag), feldolgozott / kiszűrt / hibás darabszám.
+"""
+import asyncio
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class OrderedEventQueue:
+    """Kulcs szerint sorrendtartó, több workeres eseményfeldolgozó. start()/stop() az
+    eseményhurokban hívandó; submit() is a hurok szálából (pl. async route-ból)."""
+
+    def __init__(self, handler: Callable[[dict], None], workers: int = 4, dedup_size: int = 10_000):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.dedup_size = dedup_size
+        self._queues: list[asyncio.Queue] = []
+        self._tasks: list[asyncio.Task] = []
+        self._executor: ThreadPoolExecutor | None = None
+        self._seen: OrderedDict[str, None] = OrderedDict()
+        self.processed = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._lag_total = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="webhook")
+        self._queues = [asyncio.Queue() for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(q)) for q in self._queues]
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        """Megvárja a sorban lévő eseményeket (legfeljebb drain_timeout mp), majd leáll."""
+        if self._queues:
+            try:
+                await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)), drain_timeout)
+            except asyncio.TimeoutError:
+                print(f"[Webhook] Leállítás: {self.depth()} esemény feldolgozatlan maradt")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queues = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _is_duplicate(self, mid: str | None) -> bool:
+        if not mid:
+            return False
+        if mid in self._seen:
+            self._seen.move_to_end(mid)
+            return True
+        self._seen[mid] = None
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        return False
+
+    def submit(self, key: str, event: dict, mid: str | None = None) -> bool:
+        """Esemény sorba állítása. False, ha duplikátum (már láttuk a mid-et) vagy nem fut a sor."""
+        if not self._queues:
+            return False
+        if self._is_duplicate(mid):
+            self.duplicates += 1
+            return False
+        shard = zlib.crc32(key.encode("utf-8")) % len(self._queues)
+        self._queues[shard].put_nowait((time.monotonic(), event))
+        return True
+
+    async def join(self) -> None:
+        await asyncio.gather(*(q.join() for q in self._queues))
+
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.depth(),
+            "workers": self.workers,
+            "processed": self.processed,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+            "lag_last_ms": round(self.last_lag * 1000, 3),
+            "lag_max_ms": round(self.max_lag * 1000, 3),
+            "lag_avg_ms": round(self._lag_total / self.processed * 1000, 3) if self.processed else 0.0,
+        }
+
+    async def _worker(self, q: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            enqueued_at, event = await q.get()
+            lag = time.monotonic() - enqueued_at
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._lag_total += lag
+            try:
+                await loop.run_in_executor(self._executor, self.handler, event)
+            except Exception as e:
+                self.errors += 1
+                print(f"[Webhook] Feldolgozási hiba: {e}")
+            finally:
+                self.processed += 1
+                q.task_done()
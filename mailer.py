@@ -0,0 +1,213 @@
+"""
+E-mail küldés – értesítések (visszaigazolás, lemondás, áthelyezés, emlékeztető) kötegelt kiküldése SMTP-n.
+Kötegenként legfeljebb SMTP_WORKERS párhuzamos, bejelentkezett SMTP kapcsolat él;
+egy munkaszál a saját kapcsolatán küldi egymás után a leveleit (egy STARTTLS + LOGIN
+kötegenként és szálanként, nem levelenként). Megszakadt kapcsolatnál újracsatlakozik.
+
+Környezeti változók: SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, REMINDER_FROM_EMAIL,
+SMTP_STARTTLS (alap: 1), SMTP_WORKERS (alap: 4), SMTP_TIMEOUT (mp, alap: 30).
+Az smtplib és az email.mime csak az első tényleges küldéskor töltődik be (gyorsabb indulás).
+"""
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import smtplib
+
+
+@dataclass
+class SmtpConfig:
+    host: str
+    port: int = 587
+    user: str = ""
+    password: str = ""
+    from_addr: str = "noreply@example.com"
+    starttls: bool = True
+    workers: int = 4
+    timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "SmtpConfig | None":
+        """None, ha nincs SMTP_HOST beállítva."""
+        host = os.environ.get("SMTP_HOST")
+        if not host:
+            return None
+        user = os.environ.get("SMTP_USER", "")
+        return cls(
+            host=host,
+            port=int(os.environ.get("SMTP_PORT", "587")),
+            user=user,
+            password=os.environ.get("SMTP_PASS", ""),
+            from_addr=os.environ.get("REMINDER_FROM_EMAIL", user or "noreply@example.com"),
+            starttls=os.environ.get("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no", "off"),
+            workers=max(1, int(os.environ.get("SMTP_WORKERS", "4"))),
+            timeout=float(os.environ.get("SMTP_TIMEOUT", "30")),
+        )
+
+
+@dataclass
+class OutgoingMail:
+    """Egy kiküldendő levél; a key visszakerül az eredménybe (pl. slot_id vagy outbox id).
+    Sikertelen küldés után az error a hiba szövegét tartalmazza."""
+    key: object
+    to_email: str
+    subject: str
+    body: str
+    error: str | None = None
+
+
+ADDRESS_LINE = "Cím: 3980 Sátoraljaújhely, Hősök tere út 2"
+
+
+def build_reminder(key: object, to_email: str, name: str, slot_date: str, slot_time: str) -> OutgoingMail:
+    body = (
+        f"Kedves {name}!\n\n"
+        f"Emlékeztetjük: várunk szeretettel az időpontodon ({slot_date} {slot_time}). Ne feledkezz el róla!\n\n"
+        f"Időpont: {slot_date} – {slot_time}\n"
+        f"{ADDRESS_LINE}\n\n"
+        f"Szolgáltatás díja: 30 € / 11 000 Ft\n\n"
+        f"Üdvözlettel,\nChiroStrong"
+    )
+    return OutgoingMail(key, to_email, f"ChiroStrong – emlékeztető: {slot_date} {slot_time}", body)
+
+
+def build_confirmation(key: object, to_email: str, name: str, slot_date: str, slot_time: str) -> OutgoingMail:
+    body = (
+        f"Kedves {name}!\n\n"
+        f"Foglalásodat rögzítettük.\n\n"
+        f"Időpont: {slot_date} – {slot_time}\n"
+        f"{ADDRESS_LINE}\n\n"
+        f"Szolgáltatás díja: 30 € / 11 000 Ft\n\n"
+        f"Kérdés esetén írj a blazsi88@gmail.com címre.\n\n"
+        f"Üdvözlettel,\nChiroStrong"
+    )
+    return OutgoingMail(key, to_email, f"ChiroStrong – foglalás visszaigazolása: {slot_date} {slot_time}", body)
+
+
+def build_move(
+    key: object, to_email: str, name: str, old_date: str, old_time: str, slot_date: str, slot_time: str,
+) -> OutgoingMail:
+    body = (
+        f"Kedves {name}!\n\n"
+        f"Időpontod módosult: {old_date} {old_time} helyett\n\n"
+        f"Új időpont: {slot_date} – {slot_time}\n"
+        f"{ADDRESS_LINE}\n\n"
+        f"Üdvözlettel,\nChiroStrong"
+    )
+    return OutgoingMail(key, to_email, f"ChiroStrong – időpont módosítva: {slot_date} {slot_time}", body)
+
+
+def build_cancellation(key: object, to_email: str, name: str, slot_date: str, slot_time: str) -> OutgoingMail:
+    body = (
+        f"Kedves {name}!\n\n"
+        f"A(z) {slot_date} {slot_time} időpontra szóló foglalásod törlésre került.\n"
+        f"Új időpontot a weboldalon vagy Messengeren foglalhatsz.\n\n"
+        f"Üdvözlettel,\nChiroStrong"
+    )
+    return OutgoingMail(key, to_email, f"ChiroStrong – foglalás törölve: {slot_date} {slot_time}", body)
+
+
+class _Session:
+    """Egy munkaszál SMTP kapcsolata – lustán nyílik, hiba után újranyílik."""
+
+    def __init__(self, config: SmtpConfig):
+        self.config = config
+        self._smtp: "smtplib.SMTP | None" = None
+
+    def _open(self) -> "smtplib.SMTP":
+        import smtplib
+
+        cfg = self.config
+        smtp = smtplib.SMTP(cfg.host, cfg.port, timeout=cfg.timeout)
+        try:
+            if cfg.starttls:
+                smtp.starttls()
+            if cfg.user and cfg.password:
+                smtp.login(cfg.user, cfg.password)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def send(self, mail: OutgoingMail) -> None:
+        import smtplib
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg["From"] = self.config.from_addr
+        msg["To"] = mail.to_email
+        msg["Subject"] = mail.subject
+        msg.attach(MIMEText(mail.body, "plain", "utf-8"))
+        raw = msg.as_string()
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._open()
+            try:
+                self._smtp.sendmail(self.config.from_addr, [mail.to_email], raw)
+                return
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError):
+                # Kapcsolat elveszett → egyszer újracsatlakozunk és újrapróbáljuk
+                self.close()
+                if attempt:
+                    raise
+            except smtplib.SMTPRecipientsRefused:
+                raise
+            except smtplib.SMTPException:
+                # Ismeretlen állapot (pl. félbeszakadt DATA) → új kapcsolat a következő levélhez
+                self.close()
+                raise
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+
+def send_batch(mails: list[OutgoingMail], config: SmtpConfig | None = None) -> list[tuple[object, bool]]:
+    """Levelek kiküldése legfeljebb config.workers párhuzamos SMTP kapcsolaton.
+    Visszaadja a (key, sikeres) párokat a bemenet sorrendjében."""
+    if not mails:
+        return []
+    config = config or SmtpConfig.from_env()
+    if config is None:
+        print("[Mail] SMTP nincs beállítva (SMTP_HOST). E-mail nem küldhető.")
+        for m in mails:
+            m.error = "SMTP nincs beállítva"
+        return [(m.key, False) for m in mails]
+
+    todo: queue.Queue[int] = queue.Queue()
+    for i in range(len(mails)):
+        todo.put(i)
+    results = [False] * len(mails)
+
+    def worker():
+        session = _Session(config)
+        try:
+            while True:
+                try:
+                    i = todo.get_nowait()
+                except queue.Empty:
+                    return
+                mail = mails[i]
+                try:
+                    session.send(mail)
+                    results[i] = True
+                except Exception as e:
+                    mail.error = str(e) or type(e).__name__
+                    print(f"[Mail] Küldési hiba ({mail.to_email}): {e}")
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(config.workers, len(mails)))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [(m.key, ok) for m, ok in zip(mails, results)]
@@ -0,0 +1,206 @@
+"""
+Messenger Send API kliens – egy hosszú életű, pool-olt httpx.AsyncClient és kimenő sor.
+- Címzettenként megtartja az üzenetek sorrendjét (címzettenként egy feldolgozó task),
+  különböző felhasználók üzenetei párhuzamosan mennek ki (MESSENGER_SEND_CONCURRENCY).
+- 429 / 5xx / hálózati hiba esetén exponenciális visszalépéssel újrapróbál
+  (Retry-After fejlécet figyelembe veszi), legfeljebb MESSENGER_SEND_RETRIES-szer.
+- submit(): ugyanabba a címzett-sorba tesz, de Future-t ad vissza a kézbesítés eredményével
+  (a tartós értesítési sor, notifier.py, ebből rögzíti az állapotot).
+- MESSENGER_GRAPH_URL-lel helyi mock Graph API-ra irányítható (méréshez, próbához).
+- A httpx betöltése és a kliens létrehozása (SSL kontextus) indulás után háttérszálon fut,
+  így sem az indulást, sem az eseményhurkot nem lassítja.
+"""
+import asyncio
+import os
+import random
+from concurrent.futures import Future
+from typing import TYPE_CHECKING
+
+import metrics
+
+if TYPE_CHECKING:
+    import httpx
+
+GRAPH_API_URL = os.environ.get("MESSENGER_GRAPH_URL", "https://graph.facebook.com/v21.0")
+SEND_CONCURRENCY = int(os.environ.get("MESSENGER_SEND_CONCURRENCY", "16"))
+SEND_RETRIES = int(os.environ.get("MESSENGER_SEND_RETRIES", "4"))
+BACKOFF_BASE = float(os.environ.get("MESSENGER_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = 30.0
+
+
+def _is_retryable(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+# --- Üzenet-formák (Send API "message" objektum) ---
+
+def text_message(text: str) -> dict:
+    return {"text": text}
+
+
+def button_message(text: str, buttons: list[dict]) -> dict:
+    """buttons: [{title, payload}, ...] max 3"""
+    btns = [{"type": "postback", "title": b["title"], "payload": b["payload"]} for b in buttons[:3]]
+    return {"attachment": {"type": "template", "payload": {"template_type": "button", "text": text, "buttons": btns}}}
+
+
+def quick_replies_message(text: str, replies: list[dict]) -> dict:
+    """replies: [{title, payload}, ...] max 13"""
+    qr = [{"content_type": "text", "title": r["title"], "payload": r["payload"]} for r in replies[:13]]
+    return {"text": text, "quick_replies": qr}
+
+
+class MessengerSender:
+    """Kimenő üzenetsor a Send API felé. start()/stop() az eseményhurokban hívandó;
+    enqueue() bármelyik szálból hívható."""
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = GRAPH_API_URL,
+        concurrency: int = SEND_CONCURRENCY,
+        retries: int = SEND_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+    ):
+        self.access_token = access_token
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self._concurrency = max(1, concurrency)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: "asyncio.Future[httpx.AsyncClient] | None" = None
+        self._sem: asyncio.Semaphore | None = None
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._sem = asyncio.Semaphore(self._concurrency)
+        self._client = self._loop.run_in_executor(None, self._create_client)
+
+    def _create_client(self) -> "httpx.AsyncClient":
+        """A pool-olt kliens létrehozása (háttérszálon: az import és az SSL kontextus ~0,2 mp)."""
+        import httpx
+
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=self._concurrency,
+                max_keepalive_connections=self._concurrency,
+                keepalive_expiry=60.0,
+            ),
+        )
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        """Megvárja a sorban álló üzeneteket (legfeljebb drain_timeout mp-ig), majd lezár."""
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=drain_timeout)
+        for task in list(self._tasks):
+            task.cancel()
+        if self._client is not None:
+            await (await self._client).aclose()
+        self._client = None
+        self._loop = None
+
+    def enqueue(self, recipient_id: str, message: dict) -> bool:
+        """Üzenet sorba állítása. False, ha a küldő nem fut."""
+        return self._enqueue(recipient_id, message, None)
+
+    def submit(self, recipient_id: str, message: dict) -> "Future[bool] | None":
+        """Mint az enqueue, de a Future eredménye a kézbesítés sikere (az újrapróbálások után).
+        None, ha a küldő nem fut."""
+        future: Future[bool] = Future()
+        return future if self._enqueue(recipient_id, message, future) else None
+
+    def _enqueue(self, recipient_id: str, message: dict, future: "Future[bool] | None") -> bool:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return False
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._put(recipient_id, message, future)
+        else:
+            loop.call_soon_threadsafe(self._put, recipient_id, message, future)
+        return True
+
+    async def join(self) -> None:
+        """Megvárja, amíg minden sorban álló üzenet kimegy (méréshez, leállításhoz)."""
+        while self._tasks:
+            await asyncio.wait(set(self._tasks))
+
+    def pending(self) -> int:
+        return sum(q.qsize() for q in self._queues.values())
+
+    def _put(self, recipient_id: str, message: dict, future: "Future[bool] | None" = None) -> None:
+        q = self._queues.get(recipient_id)
+        if q is None:
+            q = asyncio.Queue()
+            self._queues[recipient_id] = q
+            task = asyncio.get_running_loop().create_task(self._drain(recipient_id, q))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        q.put_nowait((message, future))
+
+    async def _drain(self, recipient_id: str, q: asyncio.Queue) -> None:
+        """Egy címzett üzeneteit sorban küldi; ha kiürült, a task leáll.
+        Az ürességvizsgálat és a törlés között nincs await, így új üzenet nem veszhet el."""
+        try:
+            while not q.empty():
+                message, future = q.get_nowait()
+                try:
+                    ok = await self._send_with_retry(recipient_id, message)
+                except BaseException:
+                    if future is not None:
+                        future.set_result(False)
+                    raise
+                if future is not None:
+                    future.set_result(ok)
+        finally:
+            if self._queues.get(recipient_id) is q:
+                del self._queues[recipient_id]
+
+    async def _send_with_retry(self, recipient_id: str, message: dict) -> bool:
+        import httpx
+
+        client = await self._client
+        url = f"{self.base_url}/me/messages"
+        payload = {"recipient": {"id": recipient_id}, "messaging_type": "RESPONSE", "message": message}
+        for attempt in range(self.retries + 1):
+            delay = None
+            async with self._sem:
+                try:
+                    r = await client.post(url, params={"access_token": self.access_token}, json=payload)
+                except httpx.HTTPError as e:
+                    print(f"[Messenger] Send API exception: {e}")
+                    r = None
+            metrics.MESSENGER_API_CALLS.inc(result="error" if r is None else str(r.status_code))
+            if r is not None:
+                if r.status_code == 200:
+                    self.sent += 1
+                    return True
+                if not _is_retryable(r.status_code):
+                    print(f"[Messenger] Send API hiba: {r.status_code} {r.text}")
+                    self.failed += 1
+                    return False
+                retry_after = r.headers.get("retry-after")
+                if retry_after and retry_after.isdigit():
+                    delay = float(retry_after)
+            if attempt == self.retries:
+                break
+            if delay is None:
+                delay = min(BACKOFF_MAX, self.backoff_base * (2 ** attempt)) * (0.5 + random.random() / 2)
+            self.retried += 1
+            await asyncio.sleep(delay)
+        print(f"[Messenger] Send API: feladva {self.retries + 1} próbálkozás után (címzett: {recipient_id})")
+        self.failed += 1
+        return False
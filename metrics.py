@@ -0,0 +1,193 @@
+"""
+Könnyűsúlyú metrikák Prometheus szöveges formátumban (/api/metrics).
+- Histogram: fix bucketek, címkénként egy számlálósor; egy mérés = bisect + néhány összeadás.
+- Counter: címkézett számláló.
+- Gauge: lekérdezéskor meghívott függvény (pl. sor mélység).
+Folyamatonként gyűjt; több uvicorn workernél minden worker a saját értékeit adja.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+_registry: list = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.label_names), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, v in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {v:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self.buckets = buckets
+        # címke → [bucket számlálók..., +Inf], összeg
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, seconds: float, *label_values) -> None:
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[label_values] = series
+            series[0][i] += 1
+            series[1][0] += seconds
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: (list(c), s[0]) for k, (c, s) in self._series.items()}
+        for key, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            cumulative += counts[-1]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, func: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.func = func
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        try:
+            value = float(self.func())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value:g}"]
+
+
+_scrape = 0  # render() hívások száma – a per_scrape gyorsítótár kulcsa
+
+
+def per_scrape(func: Callable[[], Any]) -> Callable[[], Any]:
+    """Lekérdezésenként (render() hívásonként) egyszer futó func: több Gauge is olvashatja
+    ugyanazt az eredményt (pl. egy GROUP BY az összes állapotra) egyetlen hívással."""
+    cached: list = [None, None]  # [scrape, eredmény]
+
+    def wrapper():
+        if cached[0] != _scrape:
+            cached[1] = func()
+            cached[0] = _scrape
+        return cached[1]
+    return wrapper
+
+
+def render() -> str:
+    global _scrape
+    _scrape += 1
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Alkalmazás metrikák ---
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP kérések feldolgozási ideje útvonal, metódus és státusz szerint",
+    ("route", "method", "status"),
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "db.py függvények futási ideje", ("function",), buckets=DB_BUCKETS,
+)
+REMINDER_EMAILS = Counter("reminder_emails_total", "Kiküldött emlékeztető e-mailek eredmény szerint", ("result",))
+MESSENGER_API_CALLS = Counter("messenger_api_calls_total", "Messenger Send API hívások eredmény szerint", ("result",))
+SLOT_HOLDS = Counter(
+    "slot_holds_total",
+    "Ideiglenes foglalások (hold) kimenetel szerint: created, extended, converted, released, expired, unavailable",
+    ("result",),
+)
+SLOT_HOLD_CONFLICTS = Counter(
+    "slot_hold_conflicts_total", "Más érvényes holdja miatt elutasított művelet (elkerült ütközés)", ("operation",),
+)
+
+
+def timed_db(func):
+    """Dekorátor: a db függvény futási idejét a függvény nevével címkézve méri."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            DB_QUERY_LATENCY.observe(time.perf_counter() - t0, name)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """Tiszta ASGI middleware: útvonal-sablon (pl. /api/admin/bookings/{slot_id}) szerint mér,
+    így a címkék száma nem nő a path paraméterekkel."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - t0, path, scope.get("method", ""), str(status))
@@ -0,0 +1,244 @@
+"""
+Értesítési outbox feldolgozó – a db.py outbox táblájából küldi ki az értesítéseket.
+- A foglalás / lemondás / áthelyezés és az emlékeztető-ütemező a slot írással egy
+  tranzakcióban teszi be a feladatot; a HTTP kérés és a Messenger beszélgetés nem vár
+  az SMTP-re vagy a Send API-ra.
+- OUTBOX_WORKERS munkaszál kötegenként (OUTBOX_BATCH_SIZE) veszi fel az esedékes
+  feladatokat, bérlettel (OUTBOX_LEASE_SECONDS): ha a folyamat a küldés közben leáll,
+  a bérlet lejárta után egy másik (vagy az újraindult) folyamat veszi fel újra.
+  A kézbesítés így „legalább egyszer” garanciájú.
+- A levelek egy kötegen belül a mailer.send_batch közös SMTP kapcsolatain mennek ki, a
+  Messenger üzenetek a MessengerSender címzettenkénti során.
+- A több üzenetből álló Messenger feladatnál a kézbesített részeket a feladat sora jegyzi
+  (sent_parts), az újrapróbálás csak a hiányzókat küldi.
+- Hiba után exponenciális visszalépés (OUTBOX_BACKOFF_BASE, legfeljebb 1 óra), legfeljebb
+  OUTBOX_MAX_ATTEMPTS próbálkozás, utána 'failed'. A már elkezdődött időpont emlékeztetője
+  nem megy ki.
+- Felébresztés: sikeres slot írás után azonnal (db változás-figyelő), egyébként
+  OUTBOX_POLL_SECONDS mp-enként (más workerek írásai, újrapróbálások). Több uvicorn workernél
+  mindegyik folyamat futtatja; a felvétel írási tranzakcióban történik, így egy feladatot
+  egyszerre csak egy folyamat küld.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Callable
+
+import db
+import mailer
+import messenger_client
+import metrics
+
+OUTBOX_WORKERS = int(os.environ.get("OUTBOX_WORKERS", "2"))
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_LEASE_SECONDS = float(os.environ.get("OUTBOX_LEASE_SECONDS", "120"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.environ.get("OUTBOX_BACKOFF_BASE", "30"))
+OUTBOX_BACKOFF_MAX = 3600.0
+
+OUTBOX_JOBS = metrics.Counter(
+    "outbox_jobs_total", "Outbox értesítések feldolgozása csatorna, fajta és eredmény szerint",
+    ("channel", "kind", "result"),
+)
+
+MessengerSubmit = Callable[[str, dict], "Future[bool] | None"]
+
+
+def render_email(job: dict) -> mailer.OutgoingMail:
+    p = job["payload"]
+    name = p.get("name") or "Kedves vendég"
+    kind = job["kind"]
+    if kind == "booked":
+        return mailer.build_confirmation(job["id"], job["recipient"], name, p["date"], p["time"])
+    if kind == "moved":
+        return mailer.build_move(job["id"], job["recipient"], name, p["old_date"], p["old_time"], p["date"], p["time"])
+    if kind == "cancelled":
+        return mailer.build_cancellation(job["id"], job["recipient"], name, p["date"], p["time"])
+    if kind == "reminder":
+        return mailer.build_reminder(job["id"], job["recipient"], name, p["date"], p["time"])
+    raise ValueError(f"ismeretlen értesítés: {kind!r}")
+
+
+def render_messenger(job: dict) -> list[dict]:
+    p = job["payload"]
+    kind = job["kind"]
+    if kind == "booked":
+        text = (
+            f"✅ Foglalás visszaigazolva!\n\n"
+            f"Időpont: {p['date']} – {p['time']}\n"
+            f"Név: {p['name']}\n"
+            f"Telefon: {p['phone']}\n"
+            f"E-mail: {p['email']}\n\n"
+            f"Várjuk a 3980 Sátoraljaújhely, Hősök tere út 2 címen.\n"
+            f"Szolgáltatás díja: 30 € / 11 000 Ft\n\n"
+            f"Kérdés esetén érdeklődjön az alábbi e-mail címen:\nblazsi88@gmail.com"
+        )
+        return [
+            messenger_client.text_message(text),
+            messenger_client.button_message(
+                "Ha meggondoltad magad, akkor:",
+                [{"title": "Időpont lemondása", "payload": f"CANCEL_SLOT:{p['slot_id']}"}],
+            ),
+        ]
+    if kind == "cancelled":
+        return [
+            messenger_client.text_message("A jelenleg lefoglalt időpontod törlésre került."),
+            messenger_client.button_message(
+                "Szeretnél új időpontot foglalni?", [{"title": "Új időpont foglalása", "payload": "BOOK_START"}],
+            ),
+        ]
+    if kind == "moved":
+        return [messenger_client.text_message(f"Időpontod módosult. Új időpont: {p['date']} – {p['time']}")]
+    if kind == "reminder":
+        return [messenger_client.text_message(f"Emlékeztető: várunk szeretettel ma {p['time']}-kor.")]
+    raise ValueError(f"ismeretlen értesítés: {kind!r}")
+
+
+def _is_expired(job: dict) -> bool:
+    """Az emlékeztető az időpont kezdete után már nem aktuális."""
+    if job["kind"] != "reminder":
+        return False
+    p = job["payload"]
+    try:
+        return datetime.fromisoformat(f"{p['date']} {p['time']}") <= datetime.now()
+    except (KeyError, ValueError):
+        return False
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1))) * (0.5 + random.random() / 2)
+
+
+class OutboxWorker:
+    """start()/stop() bármelyik szálból hívható; a munkaszálak démon szálak."""
+
+    def __init__(
+        self,
+        messenger_submit: MessengerSubmit | None = None,
+        workers: int = OUTBOX_WORKERS,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_seconds: float = OUTBOX_POLL_SECONDS,
+        lease_seconds: float = OUTBOX_LEASE_SECONDS,
+    ):
+        self.messenger_submit = messenger_submit
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        db.add_change_listener(self._on_change)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"outbox-{i}", daemon=True) for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """A folyamatban lévő köteget megvárja (legfeljebb timeout mp-ig); ami nem ért véget,
+        az a bérlet lejárta után újra felvehető."""
+        db.remove_change_listener(self._on_change)
+        self._stop.set()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _on_change(self, changes) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                jobs = db.claim_outbox_jobs(self.batch_size, self.lease_seconds)
+            except Exception as e:
+                print(f"[Outbox] Felvételi hiba: {e}")
+                jobs = []
+            if jobs:
+                try:
+                    db.finish_outbox_jobs(self.process(jobs))
+                except Exception as e:
+                    print(f"[Outbox] Feldolgozási hiba: {e}")
+                continue
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def process(self, jobs: list[dict]) -> list[tuple[int, str | None, float | None, int]]:
+        """Egy felvett köteg kiküldése. Visszaad: (job_id, hiba, újrapróbálás ideje, kézbesített
+        részek bitmaszkja) a db.finish_outbox_jobs számára."""
+        results: list[tuple[int, str | None, float | None, int]] = []
+        mails: list[tuple[dict, mailer.OutgoingMail]] = []
+        pending: list[tuple[dict, list[tuple[int, "Future[bool] | None"]]]] = []
+        for job in jobs:
+            if _is_expired(job):
+                self._record(job, "expired")
+                results.append((job["id"], "lejárt: az időpont már elkezdődött", None, job["sent_parts"]))
+                continue
+            try:
+                if job["channel"] == "email":
+                    mails.append((job, render_email(job)))
+                else:
+                    # A korábbi próbálkozásnál már kézbesített részek kimaradnak
+                    messages = [(i, m) for i, m in enumerate(render_messenger(job)) if not job["sent_parts"] >> i & 1]
+                    submit = self.messenger_submit
+                    pending.append((job, [(i, submit(job["recipient"], m) if submit else None) for i, m in messages]))
+            except (KeyError, ValueError) as e:
+                self._record(job, "failed")
+                results.append((job["id"], f"hibás feladat: {e}", None, job["sent_parts"]))
+
+        for (job, mail), (_, ok) in zip(mails, mailer.send_batch([m for _, m in mails])):
+            results.append(self._result(job, None if ok else mail.error or "küldési hiba"))
+
+        deadline = time.monotonic() + self.lease_seconds * 0.8
+        for job, parts in pending:
+            # Minden részt megvár (a hiba utániak is kimehettek), hogy a kézbesítettek rögzüljenek
+            error, sent = None, job["sent_parts"]
+            for i, future in parts:
+                if future is None:
+                    error = error or "a Messenger küldő nem fut"
+                    continue
+                try:
+                    if future.result(timeout=max(0.0, deadline - time.monotonic())):
+                        sent |= 1 << i
+                    else:
+                        error = error or "Send API hiba"
+                except FutureTimeoutError:
+                    error = error or "időtúllépés"
+            results.append(self._result(job, error, sent))
+        return results
+
+    def _result(self, job: dict, error: str | None, sent_parts: int = 0) -> tuple[int, str | None, float | None, int]:
+        if error is None:
+            self._record(job, "sent")
+            return job["id"], None, None, sent_parts
+        if job["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+            self._record(job, "failed")
+            print(f"[Outbox] Feladva #{job['id']} ({job['channel']}/{job['kind']}) {job['attempts']} próbálkozás után: {error}")
+            return job["id"], error, None, sent_parts
+        self._record(job, "retry")
+        return job["id"], error, time.time() + _retry_delay(job["attempts"]), sent_parts
+
+    @staticmethod
+    def _record(job: dict, result: str) -> None:
+        OUTBOX_JOBS.inc(channel=job["channel"], kind=job["kind"], result=result)
+        if job["kind"] == "reminder" and job["channel"] == "email" and result in ("sent", "failed"):
+            metrics.REMINDER_EMAILS.inc(result=result)
@@ -0,0 +1,159 @@
+"""
+Eseményvezérelt emlékeztető-ütemező – a 15 percenkénti táblaolvasás helyett.
+- Induláskor egyszer betölti a függő emlékeztetőket (db.get_pending_reminders) egy
+  kupacba: (esedékesség = starts_at − REMINDER_LEAD_MINUTES, slot_id).
+- Utána növekményesen frissül: a db változás-figyelője a sikeres foglalás / áthelyezés /
+  adatmódosítás (pl. utólag megadott e-mail cím) után a „booked” slotokat adja át; ezeket a
+  szál egy indexelt lekérdezéssel beteszi.
+  A lemondott / áthelyezett foglalás bejegyzése a kupacban marad, esedékességkor a
+  db.enqueue_reminders újraellenőrzi és kihagyja (lusta törlés).
+- A szál pontosan a következő esedékességig alszik (legfeljebb REMINDER_MAX_SLEEP mp-ig, hogy
+  a falióra ugrásait is kövesse); üresjáratban nincs lekérdezés.
+- Újraindítás után a betöltés a lemaradt (esedékes, de még el nem kezdődött) emlékeztetőket
+  azonnal sorba állítja. Ha viszont a foglalás (booked_at) már az esedékesség után jött létre
+  (az időpont REMINDER_LEAD_MINUTES-en belül kezdődik), nem megy emlékeztető: a visszaigazolás
+  elég. A döntés a foglalás idején múlik, nem azon, mikor vette észre az ütemező.
+- Több uvicorn workernél csak a háttérfeladatokat futtató folyamatban fut; a többi folyamat
+  foglalásait a közös adatverzió figyelésével (REMINDER_SYNC_SECONDS) észleli, és újratölt.
+Az esedékes emlékeztető az outboxba kerül (lásd notifier.py), a kiküldés ott történik.
+"""
+import heapq
+import os
+import threading
+from typing import Callable
+
+import db
+
+REMINDER_LEAD_MINUTES = float(os.environ.get("REMINDER_LEAD_MINUTES", "60"))
+REMINDER_MAX_SLEEP = 3600.0
+REMINDER_SYNC_SECONDS = float(os.environ.get("REMINDER_SYNC_SECONDS", "5"))
+
+
+class ReminderScheduler:
+    """start()/stop() bármelyik szálból hívható. on_enqueued(n): sorba állítás után (pl. az
+    outbox felébresztése)."""
+
+    def __init__(
+        self,
+        lead_minutes: float = REMINDER_LEAD_MINUTES,
+        on_enqueued: Callable[[int], None] | None = None,
+        sync_seconds: float | None = REMINDER_SYNC_SECONDS if db.DB_SHARED_VERSION else None,
+    ):
+        self.lead = lead_minutes * 60
+        self.on_enqueued = on_enqueued
+        self.sync_seconds = sync_seconds
+        self._heap: list[tuple[float, int]] = []
+        self._lock = threading.Lock()
+        self._booked: list[int] = []
+        self._reload = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.enqueued = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        db.add_change_listener(self._on_change)
+        self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        db.remove_change_listener(self._on_change)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def next_due_in(self) -> float | None:
+        """Másodperc a következő esedékességig (None, ha nincs függő emlékeztető)."""
+        heap = self._heap
+        return max(0.0, heap[0][0] - db.local_now()) if heap else None
+
+    def _on_change(self, changes: list[tuple[int, str]] | None) -> None:
+        """db változás-figyelő (az író szálán fut): csak feljegyzi, a lekérdezés az ütemező szálán."""
+        with self._lock:
+            if changes is None:
+                self._reload = True
+            else:
+                self._booked.extend(slot_id for slot_id, status in changes if status == "booked")
+        self._wake.set()
+
+    @staticmethod
+    def _is_new(due: float, booked_at: int | None) -> bool:
+        """Csak az esedékesség előtt létrejött foglalás kap emlékeztetőt (a leállás alatt
+        lemaradtak is); a lead időn belül foglaltra nem megy. booked_at = None: régi foglalás."""
+        return booked_at is None or booked_at < due
+
+    def _load(self) -> None:
+        heap = [
+            (due, slot_id)
+            for slot_id, starts_at, booked_at in db.get_pending_reminders()
+            if self._is_new(due := starts_at - self.lead, booked_at)
+        ]
+        heapq.heapify(heap)
+        self._heap = heap
+
+    def _add_booked(self, slot_ids: list[int]) -> None:
+        for slot_id, starts_at, booked_at in db.get_pending_reminders(slot_ids):
+            due = starts_at - self.lead
+            if self._is_new(due, booked_at):
+                heapq.heappush(self._heap, (due, slot_id))
+
+    def _fire_due(self) -> None:
+        now = db.local_now()
+        due: set[int] = set()
+        while self._heap and self._heap[0][0] <= now:
+            due.add(heapq.heappop(self._heap)[1])
+        n = db.enqueue_reminders(sorted(due))
+        if n:
+            self.enqueued += n
+            print(f"[Reminder] Emlékeztető sorba állítva: {n}")
+            if self.on_enqueued is not None:
+                self.on_enqueued(n)
+
+    def _foreign_writes(self, base: tuple[int, int]) -> int:
+        """Más worker folyamatok írásainak száma a base = (közös, saját) verzió óta."""
+        return (db.get_shared_version() - base[0]) - (db.get_data_version() - base[1])
+
+    def _run(self) -> None:
+        loaded = False
+        base, foreign_seen = (0, 0), 0
+        while not self._stop.is_set():
+            try:
+                if not loaded:
+                    if self.sync_seconds is not None:
+                        base, foreign_seen = (db.get_shared_version(), db.get_data_version()), 0
+                    self._load()
+                    loaded = True
+                with self._lock:
+                    booked, self._booked = self._booked, []
+                    reload, self._reload = self._reload, False
+                if reload:
+                    self._load()
+                elif booked:
+                    self._add_booked(booked)
+                if self.sync_seconds is not None:
+                    foreign = self._foreign_writes(base)
+                    if foreign > foreign_seen:
+                        foreign_seen = foreign
+                        self._load()
+                self._fire_due()
+            except Exception as e:
+                print(f"[Reminder] Hiba: {e}")
+                loaded = False  # következő körben teljes újratöltés
+                if self._stop.wait(min(60.0, self.sync_seconds or 60.0)):
+                    return
+                continue
+            timeout = REMINDER_MAX_SLEEP
+            if self._heap:
+                timeout = min(timeout, max(0.0, self._heap[0][0] - db.local_now()))
+            if self.sync_seconds is not None:
+                timeout = min(timeout, self.sync_seconds)
+            self._wake.wait(timeout)
+            self._wake.clear()
@@ -0,0 +1,107 @@
+"""
+Nyitvatartási szabályok → időpontok, előre legenerált sorok nélkül.
+- Heti szabály: a hét egy napja + időpontok, opcionális érvényességi intervallummal (valid_from / valid_to).
+- Kivétel: 'closed' – zárva egész nap (time nélkül) vagy egy időpont; 'extra' – egyszeri plusz időpont.
+A slots táblában csak a ténylegesen érintett időpontok (foglalás, letiltás) vannak; a többi
+„virtuális” slot, amelyet ez a modul számol ki tetszőleges dátumtartományra.
+Virtuális slot azonosító: a dátum és az idő egész számként (YYYYMMDDHHMM) – minden workerben
+ugyanaz, tárolás nélkül is; a foglaláskor létrejövő sor is ezt az id-t kapja.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterator
+
+_TIME_RE = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+
+
+def is_valid_time(value: str) -> bool:
+    return bool(value) and bool(_TIME_RE.match(value))
+
+
+def slot_key(slot_date: str, slot_time: str) -> int:
+    """('2025-03-14', '15:15') → 202503141515"""
+    return int(slot_date.replace("-", "") + slot_time.replace(":", ""))
+
+
+def parse_slot_key(slot_id: int) -> tuple[str, str] | None:
+    """202503141515 → ('2025-03-14', '15:15'); None, ha nem virtuális slot azonosító."""
+    digits = str(slot_id)
+    if len(digits) != 12 or not digits.isdigit():
+        return None
+    d = f"{digits[0:4]}-{digits[4:6]}-{digits[6:8]}"
+    t = f"{digits[8:10]}:{digits[10:12]}"
+    try:
+        date.fromisoformat(d)
+    except ValueError:
+        return None
+    return (d, t) if is_valid_time(t) else None
+
+
+@dataclass(frozen=True)
+class WeeklyRule:
+    id: int
+    weekday: int  # 0 = hétfő … 6 = vasárnap
+    times: tuple[str, ...]
+    valid_from: str | None = None
+    valid_to: str | None = None
+
+    def applies(self, day: str) -> bool:
+        return (self.valid_from is None or day >= self.valid_from) and (self.valid_to is None or day <= self.valid_to)
+
+
+@dataclass(frozen=True)
+class ScheduleException:
+    id: int
+    date: str
+    kind: str  # 'closed' | 'extra'
+    time: str | None = None
+    note: str = ""
+
+
+class Schedule:
+    """Szabályok és kivételek egy pillanatképe; napra vagy intervallumra adja az időpontokat."""
+
+    def __init__(self, rules: list[WeeklyRule], exceptions: list[ScheduleException]):
+        self.rules = rules
+        self.exceptions = exceptions
+        self._by_weekday: dict[int, list[WeeklyRule]] = {}
+        for rule in rules:
+            self._by_weekday.setdefault(rule.weekday, []).append(rule)
+        self._closed_days: set[str] = set()
+        self._closed_times: dict[str, set[str]] = {}
+        self._extra: dict[str, set[str]] = {}
+        for exc in exceptions:
+            if exc.kind == "closed" and exc.time is None:
+                self._closed_days.add(exc.date)
+            elif exc.kind == "closed":
+                self._closed_times.setdefault(exc.date, set()).add(exc.time)
+            elif exc.kind == "extra" and exc.time:
+                self._extra.setdefault(exc.date, set()).add(exc.time)
+
+    def times_for(self, day: date) -> list[str]:
+        """Az adott nap időpontjai (rendezve): heti szabályok ∪ extra − zárva."""
+        ds = day.isoformat()
+        if ds in self._closed_days:
+            return []
+        times: set[str] = set(self._extra.get(ds, ()))
+        for rule in self._by_weekday.get(day.weekday(), ()):
+            if rule.applies(ds):
+                times.update(rule.times)
+        times.difference_update(self._closed_times.get(ds, ()))
+        return sorted(times)
+
+    def contains(self, slot_date: str, slot_time: str) -> bool:
+        try:
+            return slot_time in self.times_for(date.fromisoformat(slot_date))
+        except ValueError:
+            return False
+
+    def slots(self, start: date, end: date) -> Iterator[tuple[str, str]]:
+        """(date, time) párok a [start, end] zárt intervallumban, időrendben."""
+        d = start
+        while d <= end:
+            ds = d.isoformat()
+            for t in self.times_for(d):
+                yield ds, t
+            d += timedelta(days=1)
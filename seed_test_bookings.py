@@ -11,6 +11,7 @@ TEST_BOOKINGS = [
 ]
 
 if __name__ == "__main__":
+    db.init_db()
     slots = db.get_slots()
     free_ids = [s["id"] for s in slots if s.get("status") == "free"][:6]
     if len(free_ids) < 6:
@@ -7,24 +7,34 @@ Indítás (EBBA a projekt mappába, ahol a server.py van):
 Ha a böngészőben nem ez a szöveg jelenik meg → a 8000-es porton MÁS fut.
 Állítsd le (Ctrl+C), majd indítsd ezt a server.py-t a fenti paranccsal.
 
-Emlékeztető e-mail: SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, REMINDER_FROM_EMAIL env.
+Emlékeztető e-mail: SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS, REMINDER_FROM_EMAIL env (részletek: mailer.py).
+Értesítések (visszaigazolás, lemondás, áthelyezés, emlékeztető): tartós outbox, lásd notifier.py.
 """
+import asyncio
+import base64
+import binascii
+import json
 import os
 import re
-import smtplib
 import threading
-import time
-from collections import defaultdict
 from datetime import date, datetime, timedelta
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse
-from pydantic import BaseModel
-import httpx
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
+import adb
+import calendar_index
 import db
+import event_queue
+import messenger_client
+import metrics
+import notifier
+import reminder_scheduler
+import schedule_engine
+import session_store
+import slot_events
+import slot_format
 
 # Validáció: magyar telefon (min. 9 számjegy), e-mail (xxx@yyy.zz)
 def _is_valid_phone(s: str) -> bool:
@@ -39,14 +49,20 @@ def _is_valid_email(s: str) -> bool:
         return False
     return bool(re.match(r"^[^\s@]+@[^\s@]+\.[^\s@]+$", s.strip()))
 
+def _is_valid_date(s: str | None) -> bool:
+    if s is None:
+        return True
+    try:
+        date.fromisoformat(s)
+        return True
+    except ValueError:
+        return False
+
 MESSENGER_VERIFY_TOKEN = os.environ.get("MESSENGER_VERIFY_TOKEN", "chirostrong_webhook_2025")
 MESSENGER_PAGE_ACCESS_TOKEN = os.environ.get("MESSENGER_PAGE_ACCESS_TOKEN", "")
 
-HONAPOK = {"01": "január", "02": "február", "03": "március", "04": "április", "05": "május",
-           "06": "június", "07": "július", "08": "augusztus", "09": "szeptember",
-           "10": "október", "11": "november", "12": "december"}
-
-USER_STATE: dict[str, dict] = defaultdict(dict)
+# Beszélgetés-állapot: SESSION_STORE=memory|sqlite (lásd session_store.py)
+SESSIONS = session_store.create_store()
 
 
 class BookRequest(BaseModel):
@@ -62,7 +78,9 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Link"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 
@@ -70,72 +88,109 @@ app.add_middleware(
 
 
 
-REMINDER_INTERVAL_MIN = 15
 _scheduler_stop = threading.Event()
 
+# Emlékeztetők: pontosan REMINDER_LEAD_MINUTES perccel a kezdés előtt kerülnek az outboxba
+_reminders = reminder_scheduler.ReminderScheduler(on_enqueued=lambda n: _outbox.wake())
 
-def _send_reminder_email(to_email: str, name: str, slot_date: str, slot_time: str) -> bool:
-    """Emlékeztető e-mail küldése."""
-    host = os.environ.get("SMTP_HOST")
-    port = int(os.environ.get("SMTP_PORT", "587"))
-    user = os.environ.get("SMTP_USER")
-    password = os.environ.get("SMTP_PASS")
-    from_addr = os.environ.get("REMINDER_FROM_EMAIL", user or "noreply@example.com")
-    if not host or not user or not password:
-        print("[Reminder] SMTP nincs beállítva (SMTP_HOST, SMTP_USER, SMTP_PASS). E-mail nem küldhető.")
-        return False
-    body = (
-        f"Kedves {name}!\n\n"
-        f"Emlékeztetjük: várunk szeretettel az időpontodon ({slot_date} {slot_time}). Ne feledkezz el róla!\n\n"
-        f"Időpont: {slot_date} – {slot_time}\n"
-        f"Cím: 3980 Sátoraljaújhely, Hősök tere út 2\n\n"
-        f"Szolgáltatás díja: 30 € / 11 000 Ft\n\n"
-        f"Üdvözlettel,\nChiroStrong"
-    )
-    msg = MIMEMultipart()
-    msg["From"] = from_addr
-    msg["To"] = to_email
-    msg["Subject"] = f"ChiroStrong – emlékeztető: {slot_date} {slot_time}"
-    msg.attach(MIMEText(body, "plain", "utf-8"))
+
+def _seconds_until_next_day() -> float:
+    now = datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - now).total_seconds() + 60
+
+
+def _purge_outbox():
     try:
-        with smtplib.SMTP(host, port) as s:
-            s.starttls()
-            s.login(user, password)
-            s.sendmail(from_addr, [to_email], msg.as_string())
-        print(f"[Reminder] E-mail küldve: {to_email} ({slot_date} {slot_time})")
-        return True
+        removed = db.purge_outbox()
+        if removed:
+            print(f"[Outbox] {removed} lezárt értesítés törölve ({db.OUTBOX_RETENTION_DAYS} napnál régebbi).")
     except Exception as e:
-        print(f"[Reminder] E-mail hiba: {e}")
-        return False
+        print(f"[Outbox] Törlési hiba: {e}")
 
 
-def _run_reminders():
-    """Emlékeztetők ellenőrzése és küldése."""
-    while not _scheduler_stop.is_set():
-        try:
-            for booking in db.get_bookings_needing_reminder():
-                email = (booking.get("email") or "").strip()
-                name = booking.get("booking_name") or "Kedves vendég"
-                slot_date = booking.get("date", "")
-                slot_time = booking.get("time", "")
-                slot_id = booking.get("id")
-                if email and slot_id:
-                    if _send_reminder_email(email, name, slot_date, slot_time):
-                        db.mark_reminder_sent(slot_id)
-        except Exception as e:
-            print(f"[Reminder] Hiba: {e}")
-        _scheduler_stop.wait(timeout=REMINDER_INTERVAL_MIN * 60)
+def _sweep_expired_holds():
+    try:
+        db.sweep_expired_holds()
+    except Exception as e:
+        print(f"[Hold] Lejárt holdok törlése sikertelen: {e}")
+
+
+def _archive_past_slots():
+    try:
+        result = db.archive_past_slots()
+        if result["archived"] or result["removed"] or result["freed_pages"]:
+            print(
+                f"[Archív] {result['archived']} foglalás archiválva, {result['removed']} üres slot törölve "
+                f"({result['cutoff']} előtt), {result['freed_pages']} lap felszabadítva."
+            )
+    except Exception as e:
+        print(f"[Archív] Hiba: {e}")
+
+
+# Az indulás utáni első karbantartás késleltetése (mp): az archiválás / egyszeri VACUUM ne
+# versenyezzen az újraindítás utáni első kérésekkel
+MAINTENANCE_START_DELAY = float(os.environ.get("MAINTENANCE_START_DELAY", "30"))
+
+
+def _run_daily_maintenance():
+    """Indulás után (MAINTENANCE_START_DELAY mp-cel) és minden éjfél után kiveszi a megőrzési időn
+    túli múltbeli slotokat a slots táblából, és törli a régi, lezárt outbox feladatokat és a
+    lejárt holdokat.
+    (Új napokat nem kell generálni: az időpontok a nyitvatartási szabályokból számolódnak.)"""
+    if _scheduler_stop.wait(timeout=MAINTENANCE_START_DELAY):
+        return
+    _archive_past_slots()
+    _purge_outbox()
+    _sweep_expired_holds()
+    while not _scheduler_stop.wait(timeout=_seconds_until_next_day()):
+        _archive_past_slots()
+        _purge_outbox()
+        _sweep_expired_holds()
+
+
+_scheduler_lock_file = None
+
+
+def _acquire_scheduler_lock() -> bool:
+    """Több uvicorn worker közül csak egy futtatja a háttérfeladatokat (emlékeztető, archiválás).
+    Fájlzár az adatbázis mellett; a zár a folyamat végéig él."""
+    global _scheduler_lock_file
+    try:
+        import fcntl
+    except ImportError:  # Windows: egy folyamat fut
+        return True
+    f = open(f"{db.DB_PATH}.scheduler.lock", "w")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _scheduler_lock_file = f
+    return True
 
 
 @app.on_event("startup")
 def startup():
+    """Naprakész sémánál az init_db csak a user_version-t olvassa; minden más (emlékeztető,
+    archiválás) háttérszálon fut, így az első kérés azonnal kiszolgálható."""
     db.init_db()
-    t = threading.Thread(target=_run_reminders, daemon=True)
-    t.start()
+    if _acquire_scheduler_lock():
+        _reminders.start()
+        threading.Thread(target=_run_daily_maintenance, daemon=True).start()
+    else:
+        print(f"[Scheduler] Másik worker futtatja a háttérfeladatokat (pid={os.getpid()}).")
     print("\n>>> PROJECT1 server.py fut a 8000-es porton <<<")
     print(">>> Ha a böngészőben nem ezt látod, más szerver fut 8000-en – állítsd le. <<<\n")
 
 
+@app.on_event("shutdown")
+def _stop_db_executor():
+    _scheduler_stop.set()
+    _reminders.stop()
+    adb.shutdown()
+
+
 @app.get("/api/health")
 def health():
     return {
@@ -151,32 +206,218 @@ def which():
     return {"app": "project1", "file": "server.py", "message": "Helyes szerver."}
 
 
+# Verziónként egyszer kódolt (és gzip-elt) válaszok: (kulcs, {(formátum, gzip): bájtok})
+_slots_body_cache: tuple[str, dict[tuple[str, bool], bytes]] = ("", {})
+
+
+def _slots_body(key: str, rows: list[tuple[int, str, str, str]], fmt: str = "json", gz: bool = False) -> bytes:
+    """A választ verziónként és formátumonként egyszer szerializáljuk (és tömörítjük)."""
+    global _slots_body_cache
+    if _slots_body_cache[0] != key:
+        _slots_body_cache = (key, {})
+    bodies = _slots_body_cache[1]
+    body = bodies.get((fmt, gz))
+    if body is None:
+        if gz:
+            body = slot_format.gzip_body(_slots_body(key, rows, fmt))
+        else:
+            body = slot_format.encode_compact(rows) if fmt == "compact" else slot_format.encode_json(rows)
+        bodies[(fmt, gz)] = body
+    return body
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    return header.strip() == "*" or etag in (t.strip() for t in header.split(","))
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
 @app.get("/api/slots")
 @app.get("/slots")
-def get_slots():
-    """Időpontok az adatbázisból – a scedule_appointment.tsx ezt várja: id, date, time, status."""
-    return db.get_slots()
+async def get_slots(
+    request: Request,
+    date_from: str | None = Query(None, alias="from"),
+    date_to: str | None = Query(None, alias="to"),
+    fmt: str = Query("json", alias="format"),
+):
+    """Időpontok az adatbázisból – a scedule_appointment.tsx ezt várja: id, date, time, status.
+    Memóriából szolgál ki; ETag + If-None-Match esetén 304 (nincs változás az utolsó lekérés óta).
+    format=compact (vagy Accept: application/vnd.slots.compact+json): napok szerint csoportosított,
+    szótárkódolt forma (lásd slot_format.py). Gzip-et elfogadó kliens előre tömörített választ kap.
+    from / to (YYYY-MM-DD): tetszőleges, legfeljebb egyéves tartomány (nem cache-elt). A mai nap
+    előtti részt levágja: a múltbeli időpontok nem foglalhatók, a foglaltak pedig már archiválva
+    lehetnek (a slots táblában nincsenek), így szabadnak látszanának."""
+    compact = fmt == "compact" or slot_format.COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+    media_type = slot_format.COMPACT_MEDIA_TYPE if compact else "application/json"
+    if date_from or date_to:
+        if not (date_from and date_to and _is_valid_date(date_from) and _is_valid_date(date_to)):
+            return JSONResponse({"ok": False, "error": "from és to kell, formátum: YYYY-MM-DD"}, status_code=400)
+        start, end = date.fromisoformat(date_from), date.fromisoformat(date_to)
+        if end < start or (end - start).days >= db.SLOTS_RANGE_MAX_DAYS:
+            return JSONResponse({"ok": False, "error": f"A tartomány legfeljebb {db.SLOTS_RANGE_MAX_DAYS} nap."}, status_code=400)
+        start = max(start, date.today())
+        rows = await adb.get_slot_rows_range(start, end) if start <= end else []
+        body = slot_format.encode_compact(rows) if compact else slot_format.encode_json(rows)
+        return Response(content=body, media_type=media_type)
+    key, rows = await adb.get_slot_rows_snapshot()
+    gz = _accepts_gzip(request)
+    etag = f'"slots-{key}{"-c" if compact else ""}{"-gz" if gz else ""}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if gz:
+        headers["Content-Encoding"] = "gzip"
+    body = _slots_body(key, rows, "compact" if compact else "json", gz)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# --- Élő slot-változások (SSE) ---
+
+_slot_events = slot_events.SlotBroadcaster()
+SSE_KEEPALIVE = float(os.environ.get("SSE_KEEPALIVE", "15"))
+metrics.Gauge("sse_clients", "Nyitott /api/slots/stream kapcsolatok", _slot_events.clients)
+
+
+@app.on_event("startup")
+async def _start_slot_events():
+    await _slot_events.start()
+
+
+@app.on_event("shutdown")
+async def _stop_slot_events():
+    await _slot_events.stop()
+
+
+def _sse_message(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode("ascii") + b"\ndata: " + data + b"\n\n"
+
+
+@app.get("/api/slots/stream")
+@app.get("/slots/stream")
+async def stream_slots(request: Request):
+    """SSE: először a teljes lista (event: snapshot, ugyanaz, mint a /api/slots), utána minden
+    sikeres foglalás / lemondás / áthelyezés / státuszváltás után egy kis esemény
+    (event: slots, data: [{"id": .., "status": ..}]). Ha a kliens lemaradt, új snapshot jön."""
+    sub = _slot_events.subscribe()
+    if sub is None:
+        return JSONResponse({"ok": False, "error": "Túl sok élő kapcsolat."}, status_code=503, headers={"Retry-After": "10"})
+
+    async def events():
+        try:
+            # Előbb feliratkozunk, utána olvasunk: a kettő közti írás eseményként is megjön
+            key, rows = await adb.get_slot_rows_snapshot()
+            yield b"retry: 3000\n" + _sse_message("snapshot", _slots_body(key, rows))
+            while True:
+                try:
+                    changes = await sub.next(SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": keepalive\n\n"
+                    continue
+                if changes is None:
+                    key, rows = await adb.get_slot_rows_snapshot()
+                    slot_events.SSE_EVENTS.inc(kind="snapshot")
+                    yield _sse_message("snapshot", _slots_body(key, rows))
+                else:
+                    data = json.dumps([{"id": i, "status": st} for i, st in changes], separators=(",", ":"))
+                    slot_events.SSE_EVENTS.inc(kind="change")
+                    yield _sse_message("slots", data.encode("utf-8"))
+        finally:
+            _slot_events.unsubscribe(sub)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
 
 
 @app.post("/api/book")
 @app.post("/book")
-def book_appointment(data: BookRequest):
+async def book_appointment(data: BookRequest):
     """Időpont foglalása. A foglaló neve, telefonszám és e-mail a kliensből jön."""
     if not _is_valid_phone(data.phone):
         return {"ok": False, "error": "Érvényes telefonszámot adj meg (pl. +36 30 123 4567 vagy 06 30 123 4567)."}
     if not _is_valid_email(data.email):
         return {"ok": False, "error": "Érvényes e-mail címet adj meg (pl. pelda@email.hu)."}
-    ok = db.book_slot(data.slot_id, data.booking_name, data.phone, data.email)
+    ok = await adb.book_slot(data.slot_id, data.booking_name, data.phone, data.email)
     return {"ok": ok, "slot_id": data.slot_id}
 
 
 # --- Admin API ---
 
+ADMIN_PAGE_DEFAULT = 200
+
+
+def _encode_cursor(key: tuple[str, str, int]) -> str:
+    return base64.urlsafe_b64encode("|".join(map(str, key)).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str, int] | None:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        d, t, slot_id = raw.split("|")
+        date.fromisoformat(d)
+        return d, t, int(slot_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
 @app.get("/api/admin/bookings")
 @app.get("/admin/bookings")
-def get_admin_bookings():
-    """Csak a lefoglalt időpontok listája."""
-    return db.get_booked_slots()
+async def get_admin_bookings(
+    request: Request,
+    date_from: str | None = Query(None, alias="from"),
+    date_to: str | None = Query(None, alias="to"),
+    status: str = "booked",
+    cursor: str | None = None,
+    limit: int = ADMIN_PAGE_DEFAULT,
+    archive: bool = False,
+):
+    """Foglalások listája lapozva (alapból a lefoglalt időpontok).
+    Szűrés: from / to (YYYY-MM-DD, zárt intervallum), status (booked|blocked|free|all).
+    archive=1: az archivált (múltbeli) foglalások is.
+    A válasz JSON tömb; ha van következő lap, annak kulcsa az X-Next-Cursor fejlécben
+    (és Link: rel="next") jön – ezt kell ?cursor=-ként visszaküldeni."""
+    if status not in db.ADMIN_STATUSES:
+        return JSONResponse({"ok": False, "error": f"status: {', '.join(db.ADMIN_STATUSES)}"}, status_code=400)
+    if not (_is_valid_date(date_from) and _is_valid_date(date_to)):
+        return JSONResponse({"ok": False, "error": "Dátum formátuma: YYYY-MM-DD"}, status_code=400)
+    after = None
+    if cursor:
+        after = _decode_cursor(cursor)
+        if after is None:
+            return JSONResponse({"ok": False, "error": "Érvénytelen cursor."}, status_code=400)
+    items, next_key = await adb.get_bookings_page(date_from, date_to, status, after, limit, archive)
+    headers = {"Cache-Control": "no-store"}
+    if next_key is not None:
+        next_cursor = _encode_cursor(next_key)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return JSONResponse(items, headers=headers)
+
+
+@app.get("/api/admin/bookings/search")
+@app.get("/admin/bookings/search")
+async def search_admin_bookings(request: Request, q: str = "", cursor: str | None = None, limit: int = 20, archive: bool = True):
+    """Foglalás keresése név, e-mail vagy telefonszám(részlet) alapján, ékezet- és
+    kisbetű-függetlenül, szó eleji egyezéssel (pl. q=kovacs, q=zsuzs, q=30 123).
+    archive=0: csak az élő (nem archivált) foglalások. A válasz JSON tömb időpont szerint
+    csökkenő sorrendben (date, time, id – a legújabb elöl, relevancia-rangsor nincs); a lapozás
+    a /api/admin/bookings-hoz hasonlóan X-Next-Cursor / Link fejléccel."""
+    before = None
+    if cursor:
+        before = _decode_cursor(cursor)
+        if before is None:
+            return JSONResponse({"ok": False, "error": "Érvénytelen cursor."}, status_code=400)
+    items, next_key = await adb.search_bookings(q, limit, before, archive)
+    headers = {"Cache-Control": "no-store"}
+    if next_key is not None:
+        next_cursor = _encode_cursor(next_key)
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+    return JSONResponse(items, headers=headers)
 
 
 class UpdateBookingRequest(BaseModel):
@@ -186,140 +427,240 @@ class UpdateBookingRequest(BaseModel):
     new_slot_id: int | None = None
 
 
+class BatchOperation(BaseModel):
+    op: str  # cancel | move | update | block | unblock
+    slot_id: int
+    new_slot_id: int | None = None
+    booking_name: str | None = None
+    phone: str | None = None
+    email: str | None = None
+
+
+class BatchRequest(BaseModel):
+    mode: str = "atomic"  # atomic (mindent vagy semmit) | best_effort
+    operations: list[BatchOperation]
+
+
+BATCH_MAX_OPERATIONS = 500
+
+
+def _batch_item_error(op: BatchOperation) -> str | None:
+    """Kérésszintű ellenőrzés, mielőtt bármi az adatbázishoz érne."""
+    if op.op not in db.BATCH_OPERATIONS:
+        return f"ismeretlen művelet: {op.op!r}"
+    if op.op == "move" and op.new_slot_id is None:
+        return "hiányzó new_slot_id"
+    if op.op == "update" or op.phone is not None:
+        if not _is_valid_phone(op.phone or ""):
+            return "Érvényes telefonszámot adj meg."
+    if op.op == "update" or op.email is not None:
+        if not _is_valid_email(op.email or ""):
+            return "Érvényes e-mail címet adj meg."
+    return None
+
+
+@app.post("/api/admin/bookings/batch")
+@app.post("/admin/bookings/batch")
+async def batch_admin_bookings(data: BatchRequest):
+    """Több admin művelet (lemondás, áthelyezés, módosítás, letiltás/feloldás) egyetlen
+    tranzakcióban, műveletenkénti eredménnyel. mode=atomic: hiba esetén semmi sem változik;
+    mode=best_effort: a sikeres műveletek megmaradnak."""
+    if data.mode not in ("atomic", "best_effort"):
+        return {"ok": False, "error": "mode: atomic vagy best_effort"}
+    if not data.operations:
+        return {"ok": True, "applied": 0, "results": []}
+    if len(data.operations) > BATCH_MAX_OPERATIONS:
+        return {"ok": False, "error": f"Legfeljebb {BATCH_MAX_OPERATIONS} művelet küldhető egyszerre."}
+    atomic = data.mode == "atomic"
+    errors = [_batch_item_error(op) for op in data.operations]
+    if atomic and any(errors):
+        results = [
+            {"index": i, "op": op.op, "slot_id": op.slot_id, "ok": False, "error": err or "kihagyva"}
+            for i, (op, err) in enumerate(zip(data.operations, errors))
+        ]
+        return {"ok": False, "applied": 0, "results": results}
+    valid = [(i, op) for i, (op, err) in enumerate(zip(data.operations, errors)) if not err]
+    outcome = await adb.apply_batch([op.model_dump() for _, op in valid], atomic=atomic)
+    results = [
+        {"index": i, "op": op.op, "slot_id": op.slot_id, "ok": False, "error": err}
+        for i, (op, err) in enumerate(zip(data.operations, errors))
+    ]
+    for (i, _), r in zip(valid, outcome["results"]):
+        results[i] = {**r, "index": i}
+    return {"ok": all(r["ok"] for r in results), "applied": outcome["applied"], "results": results}
+
+
+# --- Nyitvatartási szabályok (admin) ---
+
+class ScheduleRuleRequest(BaseModel):
+    weekday: int  # 0 = hétfő … 6 = vasárnap
+    times: list[str]
+    valid_from: str | None = None
+    valid_to: str | None = None
+
+
+class ScheduleExceptionRequest(BaseModel):
+    date: str
+    kind: str = "closed"  # closed | extra
+    exc_time: str | None = Field(None, alias="time")  # closed esetén üresen: egész nap zárva
+    note: str = ""
+
+
+@app.get("/api/admin/schedule")
+@app.get("/admin/schedule")
+async def get_admin_schedule():
+    """Heti szabályok és kivételek (zárva / extra időpont)."""
+    return await adb.get_schedule_config()
+
+
+@app.post("/api/admin/schedule/rules")
+@app.post("/admin/schedule/rules")
+async def add_admin_schedule_rule(data: ScheduleRuleRequest):
+    """Heti szabály: a hét adott napján ezek az időpontok, opcionálisan valid_from–valid_to között."""
+    if not 0 <= data.weekday <= 6:
+        return {"ok": False, "error": "weekday: 0 (hétfő) … 6 (vasárnap)"}
+    if not data.times or not all(schedule_engine.is_valid_time(t) for t in data.times):
+        return {"ok": False, "error": "Időpontok formátuma: HH:MM"}
+    if not (_is_valid_date(data.valid_from) and _is_valid_date(data.valid_to)):
+        return {"ok": False, "error": "Dátum formátuma: YYYY-MM-DD"}
+    rule_id = await adb.add_schedule_rule(data.weekday, data.times, data.valid_from, data.valid_to)
+    return {"ok": True, "id": rule_id}
+
+
+@app.delete("/api/admin/schedule/rules/{rule_id}")
+@app.delete("/admin/schedule/rules/{rule_id}")
+async def delete_admin_schedule_rule(rule_id: int):
+    return {"ok": await adb.delete_schedule_rule(rule_id)}
+
+
+@app.post("/api/admin/schedule/exceptions")
+@app.post("/admin/schedule/exceptions")
+async def add_admin_schedule_exception(data: ScheduleExceptionRequest):
+    """Zárva (egész nap vagy egy időpont) vagy egyszeri extra időpont. Bezárásnál a már
+    meglévő foglalások megmaradnak; a válasz „conflicts” mezője sorolja fel őket."""
+    if data.kind not in ("closed", "extra"):
+        return {"ok": False, "error": "kind: closed vagy extra"}
+    if not data.date or not _is_valid_date(data.date):
+        return {"ok": False, "error": "Dátum formátuma: YYYY-MM-DD"}
+    if data.exc_time is not None and not schedule_engine.is_valid_time(data.exc_time):
+        return {"ok": False, "error": "Időpont formátuma: HH:MM"}
+    if data.kind == "extra" and data.exc_time is None:
+        return {"ok": False, "error": "Extra időponthoz a time kötelező."}
+    exc_id = await adb.add_schedule_exception(data.date, data.kind, data.exc_time, data.note)
+    conflicts = await adb.booked_slots_on(data.date, data.exc_time) if data.kind == "closed" else []
+    return {"ok": True, "id": exc_id, "conflicts": conflicts}
+
+
+@app.delete("/api/admin/schedule/exceptions/{exc_id}")
+@app.delete("/admin/schedule/exceptions/{exc_id}")
+async def delete_admin_schedule_exception(exc_id: int):
+    return {"ok": await adb.delete_schedule_exception(exc_id)}
+
+
 @app.patch("/api/admin/bookings/{slot_id}")
 @app.patch("/admin/bookings/{slot_id}")
-def update_admin_booking(slot_id: int, data: UpdateBookingRequest):
+async def update_admin_booking(slot_id: int, data: UpdateBookingRequest):
     """Foglalás módosítása (adatok és/vagy időpont)."""
     if not _is_valid_phone(data.phone):
         return {"ok": False, "error": "Érvényes telefonszámot adj meg."}
     if not _is_valid_email(data.email):
         return {"ok": False, "error": "Érvényes e-mail címet adj meg."}
     if data.new_slot_id is not None and data.new_slot_id != slot_id:
-        ok = db.move_booking(slot_id, data.new_slot_id, data.booking_name, data.phone, data.email)
+        ok = await adb.move_booking(slot_id, data.new_slot_id, data.booking_name, data.phone, data.email)
     else:
-        ok = db.update_booking(slot_id, data.booking_name, data.phone, data.email)
+        ok = await adb.update_booking(slot_id, data.booking_name, data.phone, data.email)
     return {"ok": ok}
 
 
 @app.delete("/api/admin/bookings/{slot_id}")
 @app.delete("/admin/bookings/{slot_id}")
-def delete_admin_booking(slot_id: int):
+async def delete_admin_booking(slot_id: int):
     """Foglalás törlése."""
-    ok = db.cancel_booking(slot_id)
+    ok = await adb.cancel_booking(slot_id)
     return {"ok": ok}
 
 
+@app.get("/api/admin/outbox")
+async def get_admin_outbox():
+    """Értesítési outbox állapota: feladatok száma állapot szerint (pending, sending, sent, failed, cancelled)."""
+    return await adb.get_outbox_stats()
+
+
 # --- Facebook Messenger webhook ---
 
+_messenger = messenger_client.MessengerSender(MESSENGER_PAGE_ACCESS_TOKEN)
+
+
+def _messenger_submit(recipient_id: str, message: dict):
+    """Outbox → Send API: Future a kézbesítés eredményével, None ha nem küldhető."""
+    if not MESSENGER_PAGE_ACCESS_TOKEN:
+        return None
+    return _messenger.submit(recipient_id, message)
+
+
+# Minden worker folyamat futtatja: a felvétel tranzakcionális, így egy feladat egyszer megy ki
+_outbox = notifier.OutboxWorker(_messenger_submit)
+
+
+@app.on_event("startup")
+async def _start_messenger_sender():
+    await _messenger.start()
+    _outbox.start()
+
+
+@app.on_event("shutdown")
+async def _stop_messenger_sender():
+    # Előbb az outbox álljon le (a még futó Messenger feladatai így kimehetnek), aztán a küldő
+    await asyncio.to_thread(_outbox.stop)
+    await _messenger.stop()
+
+
 def _messenger_send(recipient_id: str, message: dict) -> bool:
-    """Üzenet küldése Messenger Send API-n."""
+    """Üzenet sorba állítása a Send API felé (a címzettenkénti sorrend megmarad)."""
     if not MESSENGER_PAGE_ACCESS_TOKEN:
         print("[Messenger] HIBA: MESSENGER_PAGE_ACCESS_TOKEN nincs beállítva")
         return False
-    url = f"https://graph.facebook.com/v21.0/me/messages?access_token={MESSENGER_PAGE_ACCESS_TOKEN}"
-    payload = {"recipient": {"id": recipient_id}, "messaging_type": "RESPONSE", "message": message}
-    try:
-        with httpx.Client() as client:
-            r = client.post(url, json=payload, timeout=10)
-            if r.status_code != 200:
-                print(f"[Messenger] Send API hiba: {r.status_code} {r.text}")
-            return r.status_code == 200
-    except Exception as e:
-        print(f"[Messenger] Send API exception: {e}")
+    if not _messenger.enqueue(recipient_id, message):
+        print("[Messenger] HIBA: a küldő sor nem fut")
         return False
+    return True
 
 
 def _send_text(rid: str, text: str) -> bool:
-    return _messenger_send(rid, {"text": text})
+    return _messenger_send(rid, messenger_client.text_message(text))
 
 
 def _send_buttons(rid: str, text: str, buttons: list[dict]) -> bool:
     """buttons: [{title, payload}, ...] max 3"""
-    btns = [{"type": "postback", "title": b["title"], "payload": b["payload"]} for b in buttons[:3]]
-    msg = {"attachment": {"type": "template", "payload": {"template_type": "button", "text": text, "buttons": btns}}}
-    return _messenger_send(rid, msg)
+    return _messenger_send(rid, messenger_client.button_message(text, buttons))
 
 
 def _send_quick_replies(rid: str, text: str, replies: list[dict]) -> bool:
     """replies: [{title, payload}, ...] max 13"""
-    qr = [{"content_type": "text", "title": r["title"], "payload": r["payload"]} for r in replies[:13]]
-    return _messenger_send(rid, {"text": text, "quick_replies": qr})
+    return _messenger_send(rid, messenger_client.quick_replies_message(text, replies))
 
 
 def _send_greeting_with_button(rid: str) -> bool:
     return _send_buttons(rid, "Szia! ChiroStrong időpontfoglaló bot vagyok. Üdvözöllek! Foglalj időpontot az alábbi gombbal.", [{"title": "Időpont foglalása", "payload": "BOOK_START"}])
 
 
-def _get_free_slots():
-    return [s for s in db.get_slots() if s.get("status") == "free"]
-
-
-def _months_from_slots(slots: list) -> list[tuple[str, str]]:
-    """(yyyy-mm, megjelenített név) párok"""
-    seen = set()
-    out = []
-    for s in slots:
-        d = s.get("date", "")
-        if len(d) >= 7:
-            ym = d[:7]
-            if ym not in seen:
-                seen.add(ym)
-                mn = d[5:7]
-                out.append((ym, HONAPOK.get(mn, mn)))
-    return sorted(out)[:3]
-
-
-def _weeks_in_month(slots: list, yyyy_mm: str) -> list[tuple[str, str]]:
-    """(week_key, megjelenített név) - hét kezdő dátuma"""
-    out = []
-    seen = set()
-    for s in slots:
-        d = s.get("date", "")
-        if d.startswith(yyyy_mm):
-            try:
-                dt = date.fromisoformat(d)
-                wk_start = dt - timedelta(days=dt.weekday())
-                wk_end = wk_start + timedelta(days=6)
-                key = wk_start.isoformat()
-                if key not in seen:
-                    seen.add(key)
-                    mn = HONAPOK.get(wk_start.strftime("%m"), "")
-                    out.append((key, f"{wk_start.day}.–{wk_end.day}. {mn}"))
-            except (ValueError, AttributeError):
-                pass
-    return sorted(out)
-
-
-def _days_in_week(slots: list, week_start: str) -> list[tuple[str, str]]:
-    """(date, megjelenített név)"""
-    out = []
-    try:
-        start = date.fromisoformat(week_start)
-        for i in range(7):
-            d = start + timedelta(days=i)
-            ds = d.isoformat()
-            if any(s.get("date") == ds for s in slots):
-                day_names = ["Hétfő", "Kedd", "Szerda", "Csütörtök", "Péntek", "Szombat", "Vasárnap"]
-                out.append((ds, f"{day_names[d.weekday()]} {d.day}."))
-    except ValueError:
-        pass
-    return out
-
+def _release_hold(sender_id: str, state: dict) -> None:
+    """A beszélgetésben tartott slot felszabadítása, ha a felhasználó a foglalás helyett visszalép."""
+    if state.get("held_slot_id"):
+        db.release_hold(state.pop("held_slot_id"), sender_id)
 
-def _slots_for_day(slots: list, day: str) -> list[dict]:
-    return [s for s in slots if s.get("date") == day and s.get("status") == "free"]
 
-
-def _handle_postback(sender_id: str, payload: str) -> None:
-    state = USER_STATE[sender_id]
-    slots = _get_free_slots()
+def _handle_postback(sender_id: str, payload: str, state: dict) -> None:
+    if not payload.startswith("slot:"):
+        _release_hold(sender_id, state)
+    index = calendar_index.get_index()
 
     if payload in ("GET_STARTED_PAYLOAD", "GET_STARTED"):
         _send_greeting_with_button(sender_id)
     elif payload == "BOOK_START":
         state.clear()
         state["step"] = "month"
-        months = _months_from_slots(slots)
+        months = index.months()
         if not months:
             _send_text(sender_id, "Jelenleg nincs szabad időpont. Nézd meg az oldalunkat: https://szabolcs-projektje-production.up.railway.app/idopont")
             return
@@ -337,18 +678,16 @@ def _handle_postback(sender_id: str, payload: str) -> None:
         except (ValueError, IndexError):
             _send_text(sender_id, "Hiba történt.")
             return
-        ok = db.cancel_booking(slot_id)
-        if ok:
-            _send_text(sender_id, "A jelenleg lefoglalt időpontod törlésre került.")
-            _send_buttons(sender_id, "Szeretnél új időpontot foglalni?", [{"title": "Új időpont foglalása", "payload": "BOOK_START"}])
-        else:
+        # A visszaigazolás az outboxon át megy ki (notifier.render_messenger)
+        ok = db.cancel_booking(slot_id, messenger_id=sender_id)
+        if not ok:
             _send_text(sender_id, "Az időpont törlése sikertelen. Keress minket: blazsi88@gmail.com")
 
     elif payload.startswith("month:"):
         yyyy_mm = payload[6:]
         state["month"] = yyyy_mm
         state["step"] = "week"
-        weeks = _weeks_in_month(slots, yyyy_mm)
+        weeks = index.weeks(yyyy_mm)
         if not weeks:
             _send_text(sender_id, "Ebben a hónapban nincs szabad időpont.")
             return
@@ -360,7 +699,7 @@ def _handle_postback(sender_id: str, payload: str) -> None:
         week_start = payload[5:]
         state["week"] = week_start
         state["step"] = "day"
-        days = _days_in_week(slots, week_start)
+        days = index.days(week_start)
         if not days:
             _send_text(sender_id, "Ebben a héten nincs szabad nap.")
             return
@@ -379,7 +718,8 @@ def _handle_postback(sender_id: str, payload: str) -> None:
         except ValueError:
             pass
         state["step"] = "slot"
-        day_slots = _slots_for_day(slots, day)
+        held = db.get_held_slot_ids()
+        day_slots = [s for s in index.slots_for_day(day) if s["id"] not in held]
         if not day_slots:
             _send_text(sender_id, "Ezen a napon nincs szabad időpont.")
             return
@@ -389,17 +729,26 @@ def _handle_postback(sender_id: str, payload: str) -> None:
 
     elif payload.startswith("slot:"):
         slot_id = int(payload[5:])
+        slot = index.slot(slot_id)
+        # A slot a beszélgetés végéig (legfeljebb db.SLOT_HOLD_SECONDS-ig) másnak nem foglalható;
+        # ha közben elvitték, már itt derül ki, nem a név / telefon / e-mail megadása után
+        if not db.hold_slot(slot_id, sender_id):
+            _send_text(sender_id, "Sajnos ezt az időpontot közben lefoglalták. Válassz másikat.")
+            if state.get("day"):
+                _handle_postback(sender_id, f"day:{state['day']}", state)
+            else:
+                _send_greeting_with_button(sender_id)
+            return
         state["slot_id"] = slot_id
+        state["held_slot_id"] = slot_id
         state["step"] = "ask_name"
-        slot = next((s for s in slots if s.get("id") == slot_id), None)
         if slot:
             state["slot_date"] = slot.get("date", "")
             state["slot_time"] = slot.get("time", "")
         _send_text(sender_id, "Add meg a neved:")
 
 
-def _handle_message_text(sender_id: str, text: str) -> None:
-    state = USER_STATE[sender_id]
+def _handle_message_text(sender_id: str, text: str, state: dict) -> None:
     step = state.get("step", "")
 
     if step == "ask_name":
@@ -431,37 +780,27 @@ def _handle_message_text(sender_id: str, text: str) -> None:
             state.clear()
             _send_greeting_with_button(sender_id)
             return
-        ok = db.book_slot(slot_id, name, phone, email)
-        slot_date = state.get("slot_date", "")
-        slot_time = state.get("slot_time", "")
+        # A visszaigazolás a foglalással egy tranzakcióban kerül az outboxba (notifier.py küldi ki)
+        ok = db.book_slot(slot_id, name, phone, email, messenger_id=sender_id, holder=sender_id)
         day_back = state.get("day", "")
-        state.clear()
         if ok:
-            msg = (
-                f"✅ Foglalás visszaigazolva!\n\n"
-                f"Időpont: {slot_date} – {slot_time}\n"
-                f"Név: {name}\n"
-                f"Telefon: {phone}\n"
-                f"E-mail: {email}\n\n"
-                f"Várjuk a 3980 Sátoraljaújhely, Hősök tere út 2 címen.\n"
-                f"Szolgáltatás díja: 30 € / 11 000 Ft\n\n"
-                f"Kérdés esetén érdeklődjön az alábbi e-mail címen:\nblazsi88@gmail.com"
-            )
-            _send_text(sender_id, msg)
-            _send_buttons(sender_id, "Ha meggondoltad magad, akkor:", [{"title": "Időpont lemondása", "payload": f"CANCEL_SLOT:{slot_id}"}])
+            state.clear()
+            return
+        # A saját hold ne maradjon a slot_holds-ban a lejáratáig (pl. ha közben letiltották)
+        _release_hold(sender_id, state)
+        state.clear()
+        _send_text(sender_id, "Sajnos az időpont már foglalt. Válassz másik időpontot.")
+        if day_back:
+            _handle_postback(sender_id, f"day:{day_back}", state)
         else:
-            _send_text(sender_id, "Sajnos az időpont már foglalt. Válassz másik időpontot.")
-            if day_back:
-                _handle_postback(sender_id, f"day:{day_back}")
-            else:
-                _send_greeting_with_button(sender_id)
+            _send_greeting_with_button(sender_id)
         return
 
     text_lower = (text or "").strip().lower()
     if text_lower in ("szia", "hello", "helo", "üdv", "üdvözöllek", "hi", "helló", "üdvözöllek"):
         _send_greeting_with_button(sender_id)
     elif "időpont" in text_lower or "idopont" in text_lower or "foglal" in text_lower:
-        _handle_postback(sender_id, "BOOK_START")
+        _handle_postback(sender_id, "BOOK_START", state)
     else:
         _send_greeting_with_button(sender_id)
 
@@ -478,10 +817,48 @@ def messenger_webhook_verify(request: Request):
     return PlainTextResponse(content="Forbidden", status_code=403)
 
 
+def _process_messenger_event(event: dict) -> None:
+    """Egy webhook esemény feldolgozása (munkaszálon fut, az eseménysorból).
+    Az állapotot a tárolóból tölti be, és a kezelők után visszaírja."""
+    sender_id = event.get("sender", {}).get("id")
+    state = SESSIONS.load(sender_id)
+    if "postback" in event:
+        payload = event["postback"].get("payload", "")
+        print(f"[Messenger] Postback: sender={sender_id} payload={payload!r}")
+        _handle_postback(sender_id, payload, state)
+    elif "message" in event:
+        msg = event["message"]
+        qr = msg.get("quick_reply", {})
+        payload = qr.get("payload", "")
+        if payload:
+            print(f"[Messenger] Quick reply: sender={sender_id} payload={payload!r}")
+            _handle_postback(sender_id, payload, state)
+        else:
+            text = msg.get("text", "")
+            print(f"[Messenger] Üzenet: sender={sender_id} text={text!r}")
+            _handle_message_text(sender_id, text, state)
+    SESSIONS.save(sender_id, state)
+
+
+MESSENGER_WORKERS = int(os.environ.get("MESSENGER_WORKERS", "4"))
+_webhook_events = event_queue.OrderedEventQueue(_process_messenger_event, workers=MESSENGER_WORKERS)
+
+
+@app.on_event("startup")
+async def _start_webhook_workers():
+    await _webhook_events.start()
+
+
+@app.on_event("shutdown")
+async def _stop_webhook_workers():
+    await _webhook_events.stop()
+
+
 @app.post("/api/messenger/webhook")
 @app.post("/messenger/webhook")
 async def messenger_webhook_post(request: Request):
-    """Facebook webhook – bejövő üzenetek feldolgozása."""
+    """Facebook webhook – az eseményeket sorba állítja és azonnal válaszol;
+    a feldolgozás háttér workereken fut (küldőnként sorrendben, mid szerint duplikátum szűréssel)."""
     try:
         body = await request.json()
     except Exception:
@@ -496,24 +873,41 @@ async def messenger_webhook_post(request: Request):
             sender_id = event.get("sender", {}).get("id")
             if not sender_id:
                 continue
-            if "postback" in event:
-                payload = event["postback"].get("payload", "")
-                print(f"[Messenger] Postback: sender={sender_id} payload={payload!r}")
-                _handle_postback(sender_id, payload)
-            elif "message" in event:
-                msg = event["message"]
-                qr = msg.get("quick_reply", {})
-                payload = qr.get("payload", "")
-                if payload:
-                    print(f"[Messenger] Quick reply: sender={sender_id} payload={payload!r}")
-                    _handle_postback(sender_id, payload)
-                else:
-                    text = msg.get("text", "")
-                    print(f"[Messenger] Üzenet: sender={sender_id} text={text!r}")
-                    _handle_message_text(sender_id, text)
+            mid = event.get("message", {}).get("mid") or event.get("postback", {}).get("mid")
+            _webhook_events.submit(sender_id, event, mid)
     return {"ok": True}
 
 
+metrics.Gauge("messenger_webhook_queue_depth", "Feldolgozásra váró webhook események", _webhook_events.depth)
+metrics.Gauge("messenger_webhook_lag_seconds", "Az utolsó esemény várakozási ideje a sorban", lambda: _webhook_events.last_lag)
+metrics.Gauge("messenger_send_queue_pending", "Kiküldésre váró Messenger üzenetek", _messenger.pending)
+metrics.Gauge("reminders_scheduled", "Ütemezett (kupacban lévő) emlékeztetők", _reminders.pending)
+_outbox_stats = metrics.per_scrape(db.get_outbox_stats)  # egy lekérdezés a két gauge-hoz
+metrics.Gauge("outbox_pending_jobs", "Kiküldésre váró outbox értesítések", lambda: _outbox_stats().get("pending", 0))
+metrics.Gauge("outbox_failed_jobs", "Véglegesen sikertelen outbox értesítések", lambda: _outbox_stats().get("failed", 0))
+metrics.Gauge("slot_holds_active", "Érvényes ideiglenes foglalások (hold)", db.count_active_holds)
+
+
+@app.get("/api/metrics")
+def prometheus_metrics():
+    """Prometheus szöveges formátum: útvonal-késleltetés, db függvény idők, számlálók, sorok."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/messenger/metrics")
+def messenger_metrics():
+    """Webhook eseménysor és Send API sor állapota."""
+    return {
+        "webhook": _webhook_events.stats(),
+        "send_api": {
+            "pending": _messenger.pending(),
+            "sent": _messenger.sent,
+            "failed": _messenger.failed,
+            "retried": _messenger.retried,
+        },
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,99 @@
+"""
+Messenger beszélgetés-állapot tárolók.
+- MemorySessionStore: folyamaton belüli, TTL-es, méretkorlátos (LRU kiszorítás).
+- SqliteSessionStore: a sessions táblában, így több uvicorn worker is kiszolgálhatja
+  ugyanazt a beszélgetést, és újraindítás után sem vész el.
+Mindkettő ugyanazt adja: load() → dict (üres, ha nincs vagy lejárt), save(), clear().
+Választás: SESSION_STORE=memory|sqlite (alap: memory, több workernél – WEB_CONCURRENCY > 1 – sqlite),
+SESSION_TTL_SEC, SESSION_MAX_SIZE.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import db
+
+SESSION_TTL_SEC = float(os.environ.get("SESSION_TTL_SEC", "3600"))
+SESSION_MAX_SIZE = int(os.environ.get("SESSION_MAX_SIZE", "10000"))
+
+
+class MemorySessionStore:
+    def __init__(self, ttl: float = SESSION_TTL_SEC, max_size: int = SESSION_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def load(self, sender_id: str) -> dict:
+        with self._lock:
+            item = self._data.get(sender_id)
+            if item is None:
+                return {}
+            updated_at, state = item
+            if time.time() - updated_at > self.ttl:
+                del self._data[sender_id]
+                return {}
+            self._data.move_to_end(sender_id)
+            return dict(state)
+
+    def save(self, sender_id: str, state: dict) -> None:
+        if not state:
+            self.clear(sender_id)
+            return
+        with self._lock:
+            self._data[sender_id] = (time.time(), dict(state))
+            self._data.move_to_end(sender_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self, sender_id: str) -> None:
+        with self._lock:
+            self._data.pop(sender_id, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteSessionStore:
+    """A lejárt sorokat lustán takarítja: minden purge_every-edik mentéskor."""
+
+    def __init__(self, ttl: float = SESSION_TTL_SEC, purge_every: int = 200):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._saves = 0
+
+    def load(self, sender_id: str) -> dict:
+        raw = db.get_session(sender_id, time.time() - self.ttl)
+        if not raw:
+            return {}
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return {}
+
+    def save(self, sender_id: str, state: dict) -> None:
+        if not state:
+            self.clear(sender_id)
+            return
+        now = time.time()
+        db.save_session(sender_id, json.dumps(state, ensure_ascii=False), now)
+        self._saves += 1
+        if self._saves % self.purge_every == 0:
+            db.purge_sessions(now - self.ttl)
+
+    def clear(self, sender_id: str) -> None:
+        db.delete_session(sender_id)
+
+
+def create_store(kind: str | None = None):
+    default = "sqlite" if db.WEB_CONCURRENCY > 1 else "memory"
+    kind = (kind or os.environ.get("SESSION_STORE", default)).lower()
+    if kind == "sqlite":
+        return SqliteSessionStore()
+    if kind != "memory":
+        print(f"[Session] Ismeretlen SESSION_STORE={kind!r}, memória tároló lesz használva")
+    return MemorySessionStore()
@@ -0,0 +1,143 @@
+"""
+Élő slot-változások (Server-Sent Events) – folyamaton belüli szétosztás.
+- A db.py sikeres írás (commit + verzióemelés) után értesít: [(slot_id, új státusz), ...];
+  az értesítés a db executor szálán jön, a szétosztás az eseményhurokban történik.
+- Minden feliratkozó saját, korlátos sort kap (SSE_QUEUE_SIZE). Lassú kliens nem lassít
+  másokat és nem halmoz fel memóriát: ha betelt a sora, az elmaradt eseményeket eldobjuk,
+  és a kliens a következő körben friss teljes pillanatképet kap (resync).
+- Több workernél a másik folyamat írásai nem jönnek eseményként: a közös adatverziót
+  folyamatonként egy task figyeli (SSE_VERSION_POLL mp), idegen írásnál mindenki resync-et kap.
+"""
+import asyncio
+import os
+
+import db
+import metrics
+
+SSE_QUEUE_SIZE = int(os.environ.get("SSE_QUEUE_SIZE", "64"))
+SSE_MAX_CLIENTS = int(os.environ.get("SSE_MAX_CLIENTS", "1000"))
+SSE_VERSION_POLL = float(os.environ.get("SSE_VERSION_POLL", "1.0"))
+
+SSE_EVENTS = metrics.Counter("sse_events_total", "Slot SSE: kiküldött változás-események és resync-ek", ("kind",))
+
+
+class Subscription:
+    """Egy SSE kliens sora. A resync jelző a teljes pillanatkép újraküldését kéri."""
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.resync = False
+        self.dropped = 0
+
+    def _offer(self, changes: list[tuple[int, str]] | None) -> None:
+        if changes is None:
+            self._overflow()
+            return
+        try:
+            self.queue.put_nowait(changes)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self._overflow()
+
+    def _overflow(self) -> None:
+        """Az elmaradt eseményeket eldobja; a kliens pillanatképet kap helyettük."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.resync = True
+        self.queue.put_nowait(None)  # ébresztés
+
+    async def next(self, timeout: float) -> list[tuple[int, str]] | None:
+        """Következő változás-csomag; None, ha resync kell; TimeoutError, ha nem jött semmi."""
+        changes = await asyncio.wait_for(self.queue.get(), timeout)
+        if self.resync:
+            self.resync = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return None
+        return changes
+
+
+class SlotBroadcaster:
+    """start()/stop() az eseményhurokban hívandó; publish() bármelyik szálból hívható."""
+
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE, max_clients: int = SSE_MAX_CLIENTS):
+        self.queue_size = max(1, queue_size)
+        self.max_clients = max_clients
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._subscribers: set[Subscription] = set()
+        self._watcher: asyncio.Task | None = None
+        self.published = 0
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        db.add_change_listener(self.publish)
+        if db.DB_SHARED_VERSION:
+            self._watcher = asyncio.create_task(self._watch_shared_version())
+
+    async def stop(self) -> None:
+        db.remove_change_listener(self.publish)
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        self._loop = None
+        for sub in list(self._subscribers):
+            sub._overflow()
+        self._subscribers.clear()
+
+    def subscribe(self) -> Subscription | None:
+        """Új feliratkozó; None, ha elértük a SSE_MAX_CLIENTS korlátot."""
+        if len(self._subscribers) >= self.max_clients:
+            return None
+        sub = Subscription(self.queue_size)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.discard(sub)
+
+    def clients(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, changes: list[tuple[int, str]] | None) -> None:
+        """db változás-figyelő: changes = [(slot_id, státusz), ...] vagy None (teljes újratöltés)."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(changes)
+        else:
+            loop.call_soon_threadsafe(self._fanout, changes)
+
+    def _fanout(self, changes: list[tuple[int, str]] | None) -> None:
+        self.published += 1
+        for sub in list(self._subscribers):
+            sub._offer(changes)
+
+    async def _watch_shared_version(self) -> None:
+        """Más worker írásainak észlelése: a közös verzió annyival nőtt-e, amennyit ez a
+        folyamat maga emelt. A többlet idegen írás → resync mindenkinek."""
+        loop = asyncio.get_running_loop()
+        base_shared = await loop.run_in_executor(None, db.get_shared_version)
+        base_local = db.get_data_version()
+        foreign_seen = 0
+        while True:
+            await asyncio.sleep(SSE_VERSION_POLL)
+            if not self._subscribers:
+                continue
+            try:
+                shared = await loop.run_in_executor(None, db.get_shared_version)
+            except Exception as e:
+                print(f"[SSE] Verzió lekérdezési hiba: {e}")
+                continue
+            foreign = (shared - base_shared) - (db.get_data_version() - base_local)
+            if foreign > foreign_seen:
+                foreign_seen = foreign
+                self._fanout(None)
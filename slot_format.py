@@ -0,0 +1,86 @@
+"""
+Slot lista kódolása a /api/slots válaszhoz.
+- json: [{"id", "date", "time", "status"}, ...] – a régi formátum.
+- compact (?format=compact vagy Accept: application/vnd.slots.compact+json), napok szerint csoportosítva:
+    {"format": "compact-v1",
+     "times": ["08:30", ...],           időpont-szótár
+     "statuses": ["free", "booked", ...], státusz-szótár
+     "dates": ["2025-03-14", ...],      napok
+     "t": [[0, 1, ...], ...],            naponként az időpontok szótár-indexei
+     "s": [[0, 0, ...], ...],            naponként a státuszok szótár-indexei
+     "i": [[d0, d1, ...], ...]}          naponként az id-k különbségei az előző id-hez képest
+                                         (a legelső az előző = 0-hoz), azaz id = futó összeg
+A kódolás verziónként egyszer fut (a hívó cache-eli), a gzip-elt változattal együtt.
+JSON kódoló: orjson, ha telepítve van, különben a beépített json.
+"""
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:  # opcionális gyorsítás
+    orjson = None
+
+COMPACT_MEDIA_TYPE = "application/vnd.slots.compact+json"
+GZIP_LEVEL = 6
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_json(rows: list[tuple[int, str, str, str]]) -> bytes:
+    """(id, date, time, status) sorok → a régi, objektumonkénti JSON tömb."""
+    return dumps([{"id": i, "date": d, "time": t, "status": st} for i, d, t, st in rows])
+
+
+def encode_compact(rows: list[tuple[int, str, str, str]]) -> bytes:
+    """(id, date, time, status) sorok (dátum, idő szerint rendezve) → compact-v1 JSON."""
+    times: dict[str, int] = {}
+    statuses: dict[str, int] = {}
+    dates: list[str] = []
+    t_col: list[list[int]] = []
+    s_col: list[list[int]] = []
+    i_col: list[list[int]] = []
+    prev_date = None
+    prev_id = 0
+    for slot_id, d, t, st in rows:
+        if d != prev_date:
+            dates.append(d)
+            t_day, s_day, i_day = [], [], []
+            t_col.append(t_day)
+            s_col.append(s_day)
+            i_col.append(i_day)
+            prev_date = d
+        t_day.append(times.setdefault(t, len(times)))
+        s_day.append(statuses.setdefault(st, len(statuses)))
+        i_day.append(slot_id - prev_id)
+        prev_id = slot_id
+    return dumps({
+        "format": "compact-v1",
+        "times": list(times),
+        "statuses": list(statuses),
+        "dates": dates,
+        "t": t_col,
+        "s": s_col,
+        "i": i_col,
+    })
+
+
+def decode_compact(data: dict) -> list[dict]:
+    """compact-v1 → [{"id", "date", "time", "status"}, ...] (ellenőrzéshez, Python kliensekhez)."""
+    times, statuses = data["times"], data["statuses"]
+    out = []
+    slot_id = 0
+    for d, t_day, s_day, i_day in zip(data["dates"], data["t"], data["s"], data["i"]):
+        for t, st, delta in zip(t_day, s_day, i_day):
+            slot_id += delta
+            out.append({"id": slot_id, "date": d, "time": times[t], "status": statuses[st]})
+    return out
+
+
+def gzip_body(body: bytes) -> bytes:
+    # mtime=0: azonos tartalomhoz azonos bájtok (ETag-barát)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
@@ -1,9 +1,10 @@
-import { useState, useEffect } from "react"
+import { useState, useEffect, useRef } from "react"
 import { useNavigate } from "react-router-dom"
 import styled from "@emotion/styled"
 import { isValidPhone, isValidEmail, PHONE_ERROR, EMAIL_ERROR } from "./validation"
 
 const API_BASE = "" // relatív: /api → proxy a backendre (dev és production)
+const BOOKINGS_PAGE_SIZE = 100
 const ADMIN_KEY = "admin_session"
 
 type BookedSlot = {
@@ -138,6 +139,12 @@ const ListItem = styled.li<{ selected?: boolean }>`
   }
 `
 
+const LoadMoreItem = styled.li`
+  grid-column: 1 / -1;
+  text-align: center;
+  padding: 0.5rem 0;
+`
+
 const SlotDate = styled.span`
   font-weight: 700;
   color: #333;
@@ -420,30 +427,82 @@ export default function AdminPage() {
   const [addError, setAddError] = useState("")
   const [editError, setEditError] = useState("")
 
-  const loadBookings = () => {
-    fetch(`${API_BASE}/api/admin/bookings`)
-      .then(async (r) => {
-        const text = await r.text()
-        try {
-          return JSON.parse(text)
-        } catch {
-          return []
-        }
-      })
-      .then((data) => {
-        setBookings(Array.isArray(data) ? data : [])
-        setLoading(false)
-      })
-      .catch(() => {
-        setBookings([])
-        setLoading(false)
-      })
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [showPast, setShowPast] = useState(false)
+  const loadMoreRef = useRef<HTMLLIElement | null>(null)
+
+  // Egy lap foglalás; a következő lap kulcsa az X-Next-Cursor fejlécben jön. Alapból a mai
+  // naptól, showPast esetén a korábbi (archivált) foglalásokkal együtt.
+  const fetchBookingsPage = async (cursor: string | null, past: boolean) => {
+    const now = new Date()
+    const from = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, "0")}-${String(now.getDate()).padStart(2, "0")}`
+    const params = new URLSearchParams({ limit: String(BOOKINGS_PAGE_SIZE) })
+    if (past) params.set("archive", "1")
+    else params.set("from", from)
+    if (cursor) params.set("cursor", cursor)
+    const r = await fetch(`${API_BASE}/api/admin/bookings?${params}`)
+    let data: unknown = []
+    try {
+      data = JSON.parse(await r.text())
+    } catch {
+      data = []
+    }
+    return {
+      items: Array.isArray(data) ? (data as BookedSlot[]) : [],
+      next: Array.isArray(data) ? r.headers.get("X-Next-Cursor") : null,
+    }
+  }
+
+  // Csak az első lap töltődik be; a többi görgetésre / gombra (loadMoreBookings)
+  const loadBookings = async (past: boolean = showPast) => {
+    try {
+      const page = await fetchBookingsPage(null, past)
+      setBookings(page.items)
+      setNextCursor(page.next)
+    } catch {
+      setBookings([])
+      setNextCursor(null)
+    }
+    setLoading(false)
+  }
+
+  const loadMoreBookings = async () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const page = await fetchBookingsPage(nextCursor, showPast)
+      setBookings((prev) => [...prev, ...page.items])
+      setNextCursor(page.next)
+    } catch {
+      // a gomb megmarad, újra lehet próbálni
+    }
+    setLoadingMore(false)
   }
 
   useEffect(() => {
     loadBookings()
   }, [])
 
+  // Ha a lista alja láthatóvá válik, jön a következő lap
+  useEffect(() => {
+    const el = loadMoreRef.current
+    if (!el || !nextCursor || typeof IntersectionObserver === "undefined") return
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some((e) => e.isIntersecting)) loadMoreBookings()
+    })
+    observer.observe(el)
+    return () => observer.disconnect()
+  }, [nextCursor, loadingMore, showPast])
+
+  const togglePast = () => {
+    const past = !showPast
+    setShowPast(past)
+    setSelected(null)
+    setLoading(true)
+    loadBookings(past)
+  }
+
   const openAddModal = () => {
     setShowAddModal(true)
     setAddSlotId(null)
@@ -620,6 +679,9 @@ export default function AdminPage() {
       <Header>
         <Title>Admin panel – Foglalt időpontok</Title>
         <HeaderActions>
+          <LogoutButton type="button" onClick={togglePast}>
+            {showPast ? "Csak a mai naptól" : "Korábbi foglalások is"}
+          </LogoutButton>
           <AddBookingButton type="button" onClick={openAddModal}>
             Foglalás hozzáadása manuálisan
           </AddBookingButton>
@@ -718,6 +780,13 @@ export default function AdminPage() {
                     )}
                   </ListItem>
                 ))}
+                {nextCursor && (
+                  <LoadMoreItem ref={loadMoreRef}>
+                    <ModalSecondaryButton type="button" onClick={loadMoreBookings} disabled={loadingMore}>
+                      {loadingMore ? "Betöltés…" : "Továbbiak betöltése"}
+                    </ModalSecondaryButton>
+                  </LoadMoreItem>
+                )}
               </List>
             )}
           </ListWrapper>
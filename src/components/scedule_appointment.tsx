@@ -575,6 +575,8 @@ const globalStyles = css`
 type Slot = { id: number; date: string; time: string; status: string }
 
 const API_BASE = "" // relatív: /api → proxy a backendre (dev és production)
+const SLOTS_POLL_MS = 30000 // újratöltés, ha az SSE nem érhető el
+const SSE_SNAPSHOT_TIMEOUT_MS = 10000
 const DAY_NAMES: Record<number, string> = {
   0: "vasárnap", 1: "hétfő", 2: "kedd", 3: "szerda",
   4: "csütörtök", 5: "péntek", 6: "szombat",
@@ -602,26 +604,97 @@ export default function SceduleAppointment() {
   const [confirmation, setConfirmation] = useState<ConfirmationData | null>(null)
   const [bookingError, setBookingError] = useState<string | null>(null)
 
+  // Első betöltés mindig a /api/slots-ból; utána élő frissítés SSE-n (/api/slots/stream), ahol
+  // a snapshot a teljes listát, a "slots" esemény csak a változásokat hozza. Ha az SSE nem
+  // érhető el (pl. 503 a kapcsolatkorlát felett, vagy egy proxy puffereli / bontja a
+  // folyamot), SLOTS_POLL_MS-enként újratöltés.
   useEffect(() => {
     const ctrl = new AbortController()
-    fetch(`${API_BASE}/api/slots`, { signal: ctrl.signal })
-      .then(async (r) => {
-        const text = await r.text()
+    let poll: number | undefined
+    let watchdog: number | undefined
+    let es: EventSource | null = null
+    let gotSnapshot = false // ha az SSE snapshot előbb ért ide, a (régebbi) első betöltés ne írja felül
+
+    const load = (initial: boolean) =>
+      fetch(`${API_BASE}/api/slots`, { signal: ctrl.signal })
+        .then(async (r) => {
+          const text = await r.text()
+          try {
+            return JSON.parse(text)
+          } catch {
+            return []
+          }
+        })
+        .then((data) => {
+          if (!Array.isArray(data) || (initial && gotSnapshot)) return
+          setSlots(data)
+          setError(null)
+        })
+        .catch((e) => {
+          if (initial && e.name !== "AbortError") setError(e.message || "Betöltési hiba")
+        })
+        .finally(() => {
+          if (initial) setLoading(false)
+        })
+
+    const startPolling = () => {
+      es?.close()
+      window.clearTimeout(watchdog)
+      if (poll === undefined) poll = window.setInterval(() => load(false), SLOTS_POLL_MS)
+    }
+
+    load(true)
+    if (typeof EventSource === "undefined") {
+      startPolling()
+    } else {
+      es = new EventSource(`${API_BASE}/api/slots/stream`)
+      // A snapshot a kapcsolódás után azonnal jön; ha nem, a folyamot valami visszatartja
+      watchdog = window.setTimeout(startPolling, SSE_SNAPSHOT_TIMEOUT_MS)
+      es.addEventListener("snapshot", (e) => {
+        window.clearTimeout(watchdog)
         try {
-          return JSON.parse(text)
+          const data = JSON.parse((e as MessageEvent).data)
+          if (Array.isArray(data)) {
+            gotSnapshot = true
+            setSlots(data)
+            setError(null)
+            setLoading(false)
+          }
         } catch {
-          return []
+          /* hibás üzenet – a következő snapshot javítja */
         }
       })
-      .then((data) => {
-        setSlots(Array.isArray(data) ? data : [])
-        setError(null)
+      es.addEventListener("slots", (e) => {
+        try {
+          const changes: { id: number; status: string }[] = JSON.parse((e as MessageEvent).data)
+          const byId = new Map(changes.map((c) => [c.id, c.status]))
+          setSlots((prev) => prev.map((s) => (byId.has(s.id) ? { ...s, status: byId.get(s.id)! } : s)))
+        } catch {
+          /* hibás üzenet – a következő snapshot javítja */
+        }
       })
-      .catch((e) => { if (e.name !== "AbortError") setError(e.message || "Betöltési hiba") })
-      .finally(() => setLoading(false))
-    return () => ctrl.abort()
+      // Hálózati hibánál a böngésző újrakapcsolódik (CONNECTING); HTTP hibánál (pl. 503) lezárja
+      es.onerror = () => {
+        if (es?.readyState === EventSource.CLOSED) startPolling()
+      }
+    }
+    return () => {
+      ctrl.abort()
+      es?.close()
+      window.clearTimeout(watchdog)
+      window.clearInterval(poll)
+    }
   }, [])
 
+  // Ha a kiválasztott időpontot közben más lefoglalta, azonnal jelezzük
+  useEffect(() => {
+    if (!selectedSlot || confirmation) return
+    const current = slots.find((s) => s.id === selectedSlot.id)
+    if (current && current.status !== "free") {
+      setBookingError("Ezt az időpontot közben lefoglalták. Válassz másikat.")
+    }
+  }, [slots, selectedSlot, confirmation])
+
   const byDate = (slots || []).reduce<Record<string, Slot[]>>((acc, s) => {
     if (!acc[s.date]) acc[s.date] = []
     acc[s.date].push(s)
@@ -735,7 +808,10 @@ export default function SceduleAppointment() {
                           type="button"
                           selected={selectedSlot?.id === slot.id}
                           disabled={slot.status !== "free"}
-                          onClick={() => setSelectedSlot(slot)}
+                          onClick={() => {
+                            setSelectedSlot(slot)
+                            setBookingError(null)
+                          }}
                         >
                           {slot.time}
                         </SlotButton>
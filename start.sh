@@ -3,8 +3,9 @@ set -e
 # Nix környezet betöltése (Railway Nixpacks)
 [ -f /root/.nix-profile/etc/profile.d/nix.sh ] && . /root/.nix-profile/etc/profile.d/nix.sh
 export PATH="/root/.nix-profile/bin:/nix/var/nix/profiles/default/bin:/usr/local/bin:/usr/bin:$PATH"
-# Backend belső porton (a Node proxy felé)
-python3 -m uvicorn server:app --host 0.0.0.0 --port 8000 &
+# Backend belső porton (a Node proxy felé); WEB_CONCURRENCY = uvicorn worker folyamatok száma
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-1}"
+python3 -m uvicorn server:app --host 0.0.0.0 --port 8000 --workers "$WEB_CONCURRENCY" &
 # Frontend (a $PORT-on listenel – Railway erre irányít)
 export API_BACKEND=http://127.0.0.1:8000
 exec node scripts/serve.js